@@ -1,12 +1,10 @@
-import os
 from SI_Toolkit.computation_library import TensorType
 
-import yaml
 from Control_Toolkit.Cost_Functions import cost_function_base
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters
 
-config = yaml.load(open(os.path.join("Control_Toolkit_ASF", "config_cost_function.yml"), "r"), Loader=yaml.FullLoader)
-config_default = config["GymEnvironment"]["default"]
+config_default = get_cost_parameters("GymEnvironment", "default")
 
 class default(cost_function_base):
     """Uses as cost function the get_reward method of environment provided."""
@@ -1,25 +1,21 @@
-import yaml
-import os
 
 from SI_Toolkit.computation_library import TensorType
-from Control_Toolkit.Cost_Functions import cost_function_base
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters, get_cost_weights
+from Control_Toolkit_ASF.Cost_Functions.discounted_cost import discounted_cost_function_base
 from Environments.cartpole_simulator_batched import cartpole_simulator_batched
 
-config = yaml.load(
-    open(os.path.join("Control_Toolkit_ASF", "config_cost_function.yml"), "r"),
-    Loader=yaml.FullLoader,
-)
-angle_weight = float(config["cartpole_simulator_batched"]["default"]["angle_weight"])
-position_weight = float(config["cartpole_simulator_batched"]["default"]["position_weight"])
+parameters = get_cost_parameters("cartpole_simulator_batched", "default")
 
 
-class default(cost_function_base):
-    MAX_COST = angle_weight + position_weight * 4 * (cartpole_simulator_batched.x_threshold ** 2)
+class default(discounted_cost_function_base):
+    MAX_COST = parameters["angle_weight"] + parameters["position_weight"] * 4 * (cartpole_simulator_batched.x_threshold ** 2)
+    discount_factor = parameters.get("discount_factor")
     
     def _get_stage_cost(self, states: TensorType, inputs: TensorType, previous_input: TensorType) -> TensorType:
+        w = get_cost_weights(self.lib, "cartpole_simulator_batched", "default")
         angle, angleD, angle_cos, angle_sin, position, positionD = self.lib.unstack(states, 6, -1)
         cost = (
-            - angle_weight * angle_cos
-            + position_weight * (position - self.variable_parameters.target_position) ** 2
+            - w.angle_weight * angle_cos
+            + w.position_weight * (position - self.variable_parameters.target_position) ** 2
         )
         return cost
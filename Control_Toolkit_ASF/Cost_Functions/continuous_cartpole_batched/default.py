@@ -1,31 +1,25 @@
-import yaml
-import os
 import numpy as np
 
 from SI_Toolkit.computation_library import TensorType
-from Control_Toolkit.Cost_Functions import cost_function_base
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters, get_cost_weights
+from Control_Toolkit_ASF.Cost_Functions.discounted_cost import discounted_cost_function_base
 from Environments.continuous_cartpole_batched import continuous_cartpole_batched
 
 
-config = yaml.load(
-    open(os.path.join("Control_Toolkit_ASF", "config_cost_function.yml"), "r"),
-    Loader=yaml.FullLoader,
-)
-angle_weight = float(config["continuous_cartpole_batched"]["default"]["angle_weight"])
-angleD_weight = float(config["continuous_cartpole_batched"]["default"]["angleD_weight"])
-position_weight = float(config["continuous_cartpole_batched"]["default"]["position_weight"])
-positionD_weight = float(config["continuous_cartpole_batched"]["default"]["positionD_weight"])
+parameters = get_cost_parameters("continuous_cartpole_batched", "default")
 
 
-class default(cost_function_base):
-    MAX_COST = (12 * 2 * np.pi / 360)**2 * angle_weight + 100 * angleD_weight + position_weight * continuous_cartpole_batched.x_threshold**2 + 9 * positionD_weight
+class default(discounted_cost_function_base):
+    MAX_COST = (12 * 2 * np.pi / 360)**2 * parameters["angle_weight"] + 100 * parameters["angleD_weight"] + parameters["position_weight"] * continuous_cartpole_batched.x_threshold**2 + 9 * parameters["positionD_weight"]
+    discount_factor = parameters.get("discount_factor")
     
     def _get_stage_cost(self, states: TensorType, inputs: TensorType, previous_input: TensorType) -> TensorType:
+        w = get_cost_weights(self.lib, "continuous_cartpole_batched", "default")
         x, x_dot, theta, theta_dot = self.lib.unstack(states, 4, -1)
         cost = (
-            angle_weight * (theta**2)
-            + angleD_weight * (theta_dot**2)
-            + position_weight * (x**2)
-            + positionD_weight * (x_dot**2)
+            w.angle_weight * (theta**2)
+            + w.angleD_weight * (theta_dot**2)
+            + w.position_weight * (x**2)
+            + w.positionD_weight * (x_dot**2)
         )
         return cost
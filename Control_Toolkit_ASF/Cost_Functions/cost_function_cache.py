@@ -0,0 +1,153 @@
+"""
+Process-wide cache of compiled cost functions.
+
+Controllers build a new cost function on every instantiation, so each episode or sweep point traces and compiles its cost
+again. `get_cost_function` instead returns the cost function built earlier in the process for the same
+(environment, cost function, horizon, num_rollouts, dtype, computation library), whose `get_stage_cost` and
+`get_trajectory_cost` are compiled once for this shape signature. `use_cached_cost_function` puts it into a configured
+controller, main.py calls it for every episode.
+
+The compiled graphs capture the variables in `variable_parameters` of the first cost function built for a key.
+On a hit the new values are assigned into these variables once, and the variables themselves are handed to the new
+`variable_parameters` in place of its own. The controller then writes its updates during the episode (e.g. a new target)
+into the variables the compiled cost reads. Objects holding variables, such as the contact detector of the lunar lander,
+are refreshed at lookup only. If a value cannot be taken over (not a variable or its shape changed) the entry is rebuilt
+and counted as a miss. Cost weights are variables as well (see `cost_parameters`), so a sweep over weights compiles
+the cost once instead of once per sweep point.
+
+Cost functions constructed from the environment object (GymEnvironment) are bound to that instance and never cached.
+"""
+import inspect
+from importlib import import_module
+from types import SimpleNamespace
+
+import numpy as np
+import tensorflow as tf
+from SI_Toolkit.computation_library import ComputationLibrary, TensorFlowLibrary
+from SI_Toolkit.Functions.TF.Compile import CompileTF
+
+from Utilities.utils import get_logger
+
+logger = get_logger(__name__)
+
+_cache: "dict[tuple, object]" = {}
+_cache_info = {"hits": 0, "misses": 0}
+
+
+def _shape(value) -> tuple:
+    return tuple(value.shape) if hasattr(value, "shape") else np.shape(value)
+
+
+def _assign(cached, value) -> bool:
+    """Assign value into cached in place. Returns False if that is not possible."""
+    if cached is value:
+        return True
+    if isinstance(cached, tf.Variable):
+        if tuple(cached.shape) != _shape(value):
+            return False
+        cached.assign(value)
+        return True
+    if isinstance(cached, np.ndarray):
+        if cached.shape != _shape(value):
+            return False
+        cached[...] = value
+        return True
+    if cached is None or isinstance(cached, (bool, int, float, str)):
+        return type(cached) is type(value) and cached == value
+    if type(cached) is type(value) and hasattr(cached, "__dict__") and vars(cached).keys() == vars(value).keys():
+        return all(_assign(getattr(cached, name), v) for name, v in vars(value).items())
+    return False
+
+
+def _share(cached: SimpleNamespace, new: SimpleNamespace) -> bool:
+    """Assign the values of new into the variables of cached and hand these variables to new.
+
+    Returns False if not all of them can be taken over, new is then left unchanged.
+    """
+    missing = object()
+    shared = {}
+    for name, value in vars(new).items():
+        variable = getattr(cached, name, missing)
+        if variable is missing or not _assign(variable, value):
+            return False
+        shared[name] = variable
+    for name, variable in shared.items():
+        setattr(new, name, variable)
+    return True
+
+
+def _compile(cost_function):
+    if cost_function.lib is TensorFlowLibrary:
+        cost_function.get_stage_cost = CompileTF(cost_function.get_stage_cost)
+        cost_function.get_trajectory_cost = CompileTF(cost_function.get_trajectory_cost)
+    return cost_function
+
+
+def _takes_env(cost_function_class: type) -> bool:
+    return "env" in inspect.signature(cost_function_class.__init__).parameters
+
+
+def _lookup(key: tuple, variable_parameters: SimpleNamespace):
+    cost_function = _cache.get(key)
+    if cost_function is not None and _share(cost_function.variable_parameters, variable_parameters):
+        _cache_info["hits"] += 1
+        return cost_function
+    _cache_info["misses"] += 1
+    logger.debug(f"Compiling cost function for {key}")
+    return None
+
+
+def get_cost_function(
+    environment_name: str,
+    cost_function_name: str,
+    variable_parameters: SimpleNamespace,
+    lib: "type[ComputationLibrary]",
+    horizon: int,
+    num_rollouts: int,
+    dtype: str = "float32",
+    env=None,
+):
+    """Cost function `Control_Toolkit_ASF.Cost_Functions.<environment_name>.<cost_function_name>`, reused if cached.
+
+    env is only used by cost functions constructed from the environment object, which are built anew on every call.
+    """
+    module = import_module(f"Control_Toolkit_ASF.Cost_Functions.{environment_name}.{cost_function_name}")
+    cost_function_class = getattr(module, cost_function_name)
+    if _takes_env(cost_function_class):
+        return cost_function_class(env=env)
+
+    key = (environment_name, cost_function_name, horizon, num_rollouts, dtype, lib.__name__)
+    cost_function = _lookup(key, variable_parameters)
+    if cost_function is None:
+        cost_function = _cache[key] = _compile(cost_function_class(variable_parameters=variable_parameters, ComputationLib=lib))
+    return cost_function
+
+
+def use_cached_cost_function(controller, dtype: str = "float32") -> None:
+    """Replace the cost function of a configured controller by the cached one for its shape signature.
+
+    On a miss the controller's own cost function is compiled and cached. Must be called before the controller's first step,
+    while its optimizer has not traced the cost function yet.
+    """
+    wrapper = getattr(controller, "cost_function", None)
+    cost_function = getattr(wrapper, "cost_function", None)
+    optimizer = getattr(controller, "optimizer", None)
+    if cost_function is None or optimizer is None or _takes_env(type(cost_function)):
+        return
+
+    # Cost functions live in Control_Toolkit_ASF.Cost_Functions.<environment_name>.<cost_function_name>
+    environment_name, cost_function_name = type(cost_function).__module__.split(".")[-2:]
+    key = (environment_name, cost_function_name, optimizer.mpc_horizon, optimizer.num_rollouts, dtype, cost_function.lib.__name__)
+    cached = _lookup(key, cost_function.variable_parameters)
+    if cached is None:
+        cached = _cache[key] = _compile(cost_function)
+    wrapper.cost_function = cached
+
+
+def get_cache_info() -> dict:
+    return {**_cache_info, "size": len(_cache)}
+
+
+def clear_cost_function_cache():
+    _cache.clear()
+    _cache_info.update(hits=0, misses=0)
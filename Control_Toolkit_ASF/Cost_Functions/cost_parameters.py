@@ -0,0 +1,71 @@
+"""
+Registry of cost function parameters, loaded once from `config_cost_function.yml`.
+
+`get_cost_parameters` returns the plain values, e.g. to compute the class-level `MAX_COST`.
+`get_cost_weights` returns the numeric parameters as variables of the computation library. Cost functions read
+them inside their stage cost, so compiled graphs capture the variables instead of baking in constants.
+`reload_cost_parameters` re-reads the config and assigns the new values to these variables in place:
+changing weights between episodes or sweep points does not need a re-import or retrace.
+`MAX_COST` is computed once at import and does not follow reloads.
+"""
+import os
+from types import SimpleNamespace
+
+import tensorflow as tf
+from SI_Toolkit.computation_library import ComputationLibrary
+
+CONFIG_PATH = os.path.join("Control_Toolkit_ASF", "config_cost_function.yml")
+
+_config = None
+_weights: "dict[tuple[str, str, str], SimpleNamespace]" = {}
+
+
+def _load_config() -> dict:
+    import yaml
+
+    with open(CONFIG_PATH, "r") as f:
+        return yaml.load(f, Loader=yaml.FullLoader)
+
+
+def _is_weight(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def get_cost_config() -> dict:
+    global _config
+    if _config is None:
+        _config = _load_config()
+    return _config
+
+
+def get_cost_parameters(environment_name: str, cost_function_name: str) -> dict:
+    """Parameters of a cost function as plain python values."""
+    return dict(get_cost_config()[environment_name][cost_function_name] or {})
+
+
+def get_cost_weights(lib: "type[ComputationLibrary]", environment_name: str, cost_function_name: str) -> SimpleNamespace:
+    """Numeric parameters of a cost function as variables of `lib`, created once per library."""
+    key = (lib.__name__, environment_name, cost_function_name)
+    if key not in _weights:
+        # Variables may be first requested while a tf.function is traced, create them outside of the graph
+        with tf.init_scope():
+            _weights[key] = SimpleNamespace(**{
+                name: lib.to_variable(float(value), lib.float32)
+                for name, value in get_cost_parameters(environment_name, cost_function_name).items()
+                if _is_weight(value)
+            })
+    return _weights[key]
+
+
+def reload_cost_parameters():
+    """Re-read the config file and update all weight variables in place."""
+    global _config
+    _config = _load_config()
+    for (lib_name, environment_name, cost_function_name), weights in _weights.items():
+        for name, value in get_cost_parameters(environment_name, cost_function_name).items():
+            if _is_weight(value) and hasattr(weights, name):
+                variable = getattr(weights, name)
+                if hasattr(variable, "assign"):
+                    variable.assign(float(value))
+                else:
+                    variable[...] = float(value)
@@ -0,0 +1,210 @@
+"""
+Library of cost terms from which cost functions are composed in config_cost_function.yml.
+
+A cost function deriving from `composed_cost_function_base` is the weighted sum of the terms listed in its config section:
+every key which names a term in `COST_TERMS` is a term, its value the weight. `term_masks` optionally restricts a term
+to the stages where a boolean intermediate holds, e.g. `running` (in bounds and not at the target):
+
+    dubins_car_batched:
+      default:
+        goal_bonus: 10.0
+        squared_distance_to_target: 0.0125
+        term_masks:
+          squared_distance_to_target: running
+
+Terms and the intermediates they use (`INTERMEDIATES`, e.g. distances) are evaluated lazily through a `CostTermContext`,
+so an intermediate shared by several terms is computed once, and nothing is computed for a term whose weight is zero
+when the cost is traced. Giving such a term a nonzero weight through `reload_cost_parameters` needs a retrace.
+
+The cost function supplies the geometry of its environment by overriding `get_positions`, `get_target`, `is_in_bounds`,
+`is_at_target` and, for heading terms, `get_heading`. Obstacles are read from `variable_parameters.obstacle_positions`.
+`get_term_statistics` reports the contribution of each term, for debugging.
+"""
+from typing import Callable, Optional
+
+import numpy as np
+from SI_Toolkit.computation_library import TensorType
+
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters, get_cost_weights
+from Control_Toolkit_ASF.Cost_Functions.discounted_cost import discounted_cost_function_base
+from Control_Toolkit_ASF.Cost_Functions.obstacle_cost import obstacle_proximity_cost
+
+INTERMEDIATES: "dict[str, Callable[[CostTermContext], TensorType]]" = {}
+COST_TERMS: "dict[str, Callable[[CostTermContext], TensorType]]" = {}
+
+
+def intermediate(function: Callable) -> Callable:
+    INTERMEDIATES[function.__name__] = function
+    return function
+
+
+def cost_term(function: Callable) -> Callable:
+    COST_TERMS[function.__name__] = function
+    return function
+
+
+class CostTermContext:
+    """States (B, H, S), inputs (B, H, A) and the intermediates derived from them, each computed at most once."""
+
+    def __init__(self, cost_function: "composed_cost_function_base", states: TensorType, inputs: TensorType, previous_input: TensorType):
+        self.cost_function = cost_function
+        self.lib = cost_function.lib
+        self.states = states
+        self.inputs = inputs
+        self.previous_input = previous_input
+        self._values = {}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in INTERMEDIATES:
+            raise AttributeError(name)
+        if name not in self._values:
+            self._values[name] = INTERMEDIATES[name](self)
+        return self._values[name]
+
+
+@intermediate
+def positions(ctx: CostTermContext) -> "list[TensorType]":
+    return ctx.cost_function.get_positions(ctx.states)
+
+
+@intermediate
+def target(ctx: CostTermContext) -> "list[TensorType]":
+    return ctx.cost_function.get_target()
+
+
+@intermediate
+def squared_distance(ctx: CostTermContext) -> TensorType:
+    return sum((p - t) ** 2 for p, t in zip(ctx.positions, ctx.target))
+
+
+@intermediate
+def distance(ctx: CostTermContext) -> TensorType:
+    return ctx.lib.sqrt(ctx.squared_distance)
+
+
+@intermediate
+def in_bounds(ctx: CostTermContext) -> TensorType:
+    return ctx.cost_function.is_in_bounds(ctx.positions)
+
+
+@intermediate
+def at_target(ctx: CostTermContext) -> TensorType:
+    return ctx.cost_function.is_at_target(ctx.positions, ctx.target)
+
+
+@intermediate
+def running(ctx: CostTermContext) -> TensorType:
+    return ctx.in_bounds & (~ctx.at_target)
+
+
+@intermediate
+def heading_error(ctx: CostTermContext) -> TensorType:
+    """Angle between the heading and the direction to the target."""
+    x, y = ctx.positions[:2]
+    heading_to_target = ctx.lib.atan2(ctx.target[1] - y, ctx.target[0] - x)
+    return heading_to_target - ctx.cost_function.get_heading(ctx.states)
+
+
+@cost_term
+def squared_distance_to_target(ctx: CostTermContext) -> TensorType:
+    return ctx.squared_distance
+
+
+@cost_term
+def distance_to_target(ctx: CostTermContext) -> TensorType:
+    return ctx.distance
+
+
+@cost_term
+def cross_track_error(ctx: CostTermContext) -> TensorType:
+    """Squared distance to the target perpendicular to the heading."""
+    return (ctx.lib.sin(ctx.heading_error) * ctx.distance) ** 2
+
+
+@cost_term
+def heading_error_to_target(ctx: CostTermContext) -> TensorType:
+    return ctx.heading_error**2
+
+
+@cost_term
+def obstacle_proximity(ctx: CostTermContext) -> TensorType:
+    cost_function = ctx.cost_function
+    return obstacle_proximity_cost(
+        ctx.lib, ctx.positions, cost_function.variable_parameters.obstacle_positions, cost_function.obstacle_chunk_size
+    )
+
+
+@cost_term
+def out_of_bounds(ctx: CostTermContext) -> TensorType:
+    return ctx.lib.cast(~ctx.in_bounds, ctx.lib.float32)
+
+
+@cost_term
+def goal_bonus(ctx: CostTermContext) -> TensorType:
+    return -ctx.lib.cast(ctx.in_bounds & ctx.at_target, ctx.lib.float32)
+
+
+@cost_term
+def control_effort(ctx: CostTermContext) -> TensorType:
+    return ctx.lib.sum(ctx.inputs**2, -1)
+
+
+class composed_cost_function_base(discounted_cost_function_base):
+    environment_name: str
+    cost_function_name: str
+    obstacle_chunk_size: Optional[int] = None
+
+    def get_positions(self, states: TensorType) -> "list[TensorType]":
+        raise NotImplementedError()
+
+    def get_target(self) -> "list[TensorType]":
+        raise NotImplementedError()
+
+    def is_in_bounds(self, positions: "list[TensorType]") -> TensorType:
+        raise NotImplementedError()
+
+    def is_at_target(self, positions: "list[TensorType]", target: "list[TensorType]") -> TensorType:
+        raise NotImplementedError()
+
+    def get_heading(self, states: TensorType) -> TensorType:
+        raise NotImplementedError()
+
+    def get_terms(self) -> "dict[str, Optional[str]]":
+        """Terms with nonzero weight in the config, mapped to their mask."""
+        parameters = get_cost_parameters(self.environment_name, self.cost_function_name)
+        masks = parameters.get("term_masks") or {}
+        return {name: masks.get(name) for name, weight in parameters.items() if name in COST_TERMS and weight != 0}
+
+    def get_term_contributions(self, states: TensorType, inputs: TensorType, previous_input: TensorType) -> "dict[str, TensorType]":
+        """Weighted and masked contribution (B, H) of each term."""
+        weights = get_cost_weights(self.lib, self.environment_name, self.cost_function_name)
+        ctx = CostTermContext(self, states, inputs, previous_input)
+        contributions = {}
+        for name, mask in self.get_terms().items():
+            contribution = getattr(weights, name) * COST_TERMS[name](ctx)
+            if mask is not None:
+                contribution = self.lib.cast(getattr(ctx, mask), self.lib.float32) * contribution
+            contributions[name] = contribution
+        return contributions
+
+    def _get_stage_cost(self, states: TensorType, inputs: TensorType, previous_input: TensorType) -> TensorType:
+        contributions = list(self.get_term_contributions(states, inputs, previous_input).values())
+        if len(contributions) == 0:
+            return self.lib.zeros_like(states[..., 0])
+        return sum(contributions[1:], contributions[0])
+
+    def get_term_statistics(self, state_horizon: TensorType, inputs: TensorType, previous_input: TensorType = None) -> "dict[str, dict]":
+        """Mean, min, max and share of the total of each term's contribution over the stages of a batch of trajectories."""
+        contributions = {
+            name: self.lib.to_numpy(c) for name, c in self.get_term_contributions(state_horizon[:, :-1, :], inputs, previous_input).items()
+        }
+        total = sum(np.sum(np.abs(c)) for c in contributions.values())
+        return {
+            name: {
+                "mean": float(np.mean(c)),
+                "min": float(np.min(c)),
+                "max": float(np.max(c)),
+                "share": float(np.sum(np.abs(c)) / total) if total > 0 else 0.0,
+            }
+            for name, c in contributions.items()
+        }
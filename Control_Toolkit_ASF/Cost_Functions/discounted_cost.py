@@ -0,0 +1,78 @@
+"""
+Discounted trajectory cost shared by the ASF cost functions.
+
+A cost function deriving from `discounted_cost_function_base` is discounted if its section in config_cost_function.yml
+sets `discount_factor`. Its trajectory cost is then
+    sum_k discount^(k+1) * w_k * stage_cost_k + terminal_cost
+with w_k the stage time weights (see `stage_weights`), divided by horizon + 1 if `normalize_by_horizon`.
+Without `discount_factor` the discount is 1, so the stages are only weighted by their time span.
+
+The weight vector discount^(k+1) * w_k only depends on the horizon, dtype, discount and stage durations.
+It is built once per combination and cached, and applied in one matrix-vector product (batch, horizon) @ (horizon, 1)
+instead of building a (batch, horizon) discount tensor with cumprod on every call.
+The discount is a plain value like MAX_COST: it is fixed at import and does not follow `reload_cost_parameters`.
+
+The base also defines the per-stage contract used by `RolloutMixin.rollout_with_cost`, which accumulates the trajectory cost
+inside the rollout loop: `get_weighted_single_stage_cost` of each stage, by default `get_single_stage_cost` weighted by
+`get_stage_weights`, summed and completed by `finish_trajectory_cost`. This is the same trajectory cost as above.
+A cost function whose stage cost couples the stages (e.g. sums over the horizon) overrides `get_weighted_single_stage_cost`
+to split the coupled part into per-stage contributions, or sets `supports_stagewise_cost = False`.
+"""
+from typing import Optional
+
+import numpy as np
+import tensorflow as tf
+from Control_Toolkit.Cost_Functions import cost_function_base
+from SI_Toolkit.computation_library import ComputationLibrary, TensorType
+
+from Control_Toolkit_ASF.Cost_Functions.stage_weights import get_stage_time_weights_numpy
+
+_discount_weights: "dict[tuple, TensorType]" = {}
+
+
+def get_discount_weights(lib: "type[ComputationLibrary]", horizon: int, dtype, discount_factor: float) -> TensorType:
+    """Column (horizon, 1) of discount^(k+1) times the stage time weights, cached."""
+    time_weights = get_stage_time_weights_numpy(horizon)
+    key = (lib.__name__, horizon, str(dtype), float(discount_factor), time_weights.tobytes())
+    if key not in _discount_weights:
+        weights = discount_factor ** np.arange(1, horizon + 1, dtype=np.float64) * time_weights
+        # May be first requested while a tf.function is traced, the cached tensor must not belong to that graph
+        with tf.init_scope():
+            _discount_weights[key] = lib.to_tensor(weights[:, np.newaxis], dtype)
+    return _discount_weights[key]
+
+
+class discounted_cost_function_base(cost_function_base):
+    discount_factor: Optional[float] = None  # Set from the config in the derived class, None for no discounting
+    normalize_by_horizon = False  # Divide by horizon + 1, i.e. the mean instead of the sum over stages and terminal state
+    supports_stagewise_cost = True
+
+    def get_stage_weights(self, horizon: int, dtype) -> TensorType:
+        """Column (horizon, 1) weighting the stage costs in the trajectory cost."""
+        return get_discount_weights(self.lib, horizon, dtype, 1.0 if self.discount_factor is None else self.discount_factor)
+
+    def get_single_stage_cost(self, states: TensorType, inputs: TensorType, previous_input: TensorType) -> TensorType:
+        """Stage cost (B,) of states (B, S) under inputs (B, A), evaluated as a horizon of length one."""
+        return self.get_stage_cost(states[:, self.lib.newaxis, :], inputs[:, self.lib.newaxis, :], previous_input)[:, 0]
+
+    def get_weighted_single_stage_cost(
+        self, states: TensorType, inputs: TensorType, previous_input: TensorType, stage_weight: TensorType, stage_weights_sum: TensorType
+    ) -> TensorType:
+        """Contribution (B,) of one stage to the weighted sum of stage costs. stage_weights_sum is the sum of `get_stage_weights`."""
+        return stage_weight * self.get_single_stage_cost(states, inputs, previous_input)
+
+    def finish_trajectory_cost(self, weighted_stage_costs: TensorType, terminal_states: TensorType, horizon: int) -> TensorType:
+        """Trajectory cost (B,) from the weighted sum of stage costs (B,) and the terminal states (B, S)."""
+        terminal_costs = self.get_terminal_cost(terminal_states)
+        if self.lib.ndim(terminal_costs) == 2:
+            terminal_costs = terminal_costs[:, 0]
+        total_cost = weighted_stage_costs + terminal_costs
+        if self.normalize_by_horizon:
+            total_cost = total_cost / (horizon + 1)
+        return total_cost
+
+    def get_trajectory_cost(self, state_horizon: TensorType, inputs: TensorType, previous_input: TensorType = None) -> TensorType:
+        stage_costs = self.get_stage_cost(state_horizon[:, :-1, :], inputs, previous_input)  # Select all but last state of the horizon
+        horizon = stage_costs.shape[1]
+        weighted_stage_costs = self.lib.matmul(stage_costs, self.get_stage_weights(horizon, stage_costs.dtype))[:, 0]
+        return self.finish_trajectory_cost(weighted_stage_costs, state_horizon[:, -1, :], horizon)
@@ -1,60 +1,35 @@
-import yaml
-import os
-
 from SI_Toolkit.computation_library import TensorType
-from Control_Toolkit.Cost_Functions import cost_function_base
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters
+from Control_Toolkit_ASF.Cost_Functions.cost_terms import composed_cost_function_base
 from Environments.dubins_car_batched import dubins_car_batched
 
 
-config = yaml.load(
-    open(os.path.join("Control_Toolkit_ASF", "config_cost_function.yml"), "r"),
-    Loader=yaml.FullLoader,
-)
-distance_cost_weight = 0.125
-x_cost_weight = 0.1
-y_cost_weight = 0.1
-obstacle_cost_weight = 5.0
-
-class default(cost_function_base):
-    MAX_COST = max(distance_cost_weight * (4.0 * x_cost_weight + 4.0 * y_cost_weight + 1.0 * distance_cost_weight), 1.0)
-    
-    def _distance_to_obstacle_cost(self, x: TensorType, y: TensorType) -> TensorType:
-        # x/y each have shape batch_size x mpc_horizon
-        x_obs, y_obs, radius = self.lib.unstack(self.variable_parameters.obstacle_positions[:, :, self.lib.newaxis, self.lib.newaxis], 3, 1)
-        num_obstacles = self.lib.shape(x_obs)[0]
-        # Repeat x and y to match the shape of the obstacle map
-        x_repeated = self.lib.repeat(self.lib.unsqueeze(x, 0), num_obstacles, 0)
-        y_repeated = self.lib.repeat(self.lib.unsqueeze(y, 0), num_obstacles, 0)
-        d = self.lib.sqrt(
-            (x_repeated - x_obs) ** 2 + (y_repeated - y_obs) ** 2
-        )
-        c = 1.0 - (self.lib.min(1.0, d / radius)) ** 2
-        return self.lib.reduce_max(c, 0)
-        
-    def _get_stage_cost(self, states: TensorType, inputs: TensorType, previous_input: TensorType) -> TensorType:
+parameters = get_cost_parameters("dubins_car_batched", "default")
+
+class default(composed_cost_function_base):
+    MAX_COST = max(
+        8.0 * parameters["squared_distance_to_target"] + 1.0 * parameters["obstacle_proximity"],
+        parameters["out_of_bounds"],
+    )
+    discount_factor = parameters.get("discount_factor")
+    environment_name = "dubins_car_batched"
+    cost_function_name = "default"
+    obstacle_chunk_size = parameters.get("obstacle_chunk_size", None)
+
+    def get_positions(self, states: TensorType) -> "list[TensorType]":
         x, y, yaw_car, steering_rate = self.lib.unstack(states, 4, -1)
+        return [x, y]
+
+    def get_target(self) -> "list[TensorType]":
         target = self.lib.to_tensor(self.variable_parameters.target_point, self.lib.float32)
         x_target, y_target, yaw_target = self.lib.unstack(target, 3, 0)
+        return [x_target, y_target]
+
+    def is_in_bounds(self, positions: "list[TensorType]") -> TensorType:
+        return dubins_car_batched._car_in_bounds(self.lib, *positions)
+
+    def is_at_target(self, positions: "list[TensorType]", target: "list[TensorType]") -> TensorType:
+        return dubins_car_batched._car_at_target(self.lib, *positions, *target)
 
-        head_to_target = dubins_car_batched.get_heading(self.lib, states, self.lib.unsqueeze(target, 0))
-        alpha = head_to_target - yaw_car
-        ld = dubins_car_batched.get_distance(self.lib, states, self.lib.unsqueeze(target, 0))
-        crossTrackError = self.lib.sin(alpha) * ld
-
-        car_in_bounds = dubins_car_batched._car_in_bounds(self.lib, x, y)
-        car_at_target = dubins_car_batched._car_at_target(self.lib, x, y, x_target, y_target)
-
-        cost = (
-            self.lib.cast(car_in_bounds & car_at_target, self.lib.float32) * (-10.0)
-            + self.lib.cast(car_in_bounds & (~car_at_target), self.lib.float32) * (
-                distance_cost_weight * (
-                    # 3 * crossTrackError**2
-                    x_cost_weight * (x - x_target) ** 2
-                    + y_cost_weight * (y - y_target) ** 2
-                    # + 3 * (head_to_target - yaw_car)**2 / MAX_STEER
-                    + obstacle_cost_weight * self._distance_to_obstacle_cost(x, y)
-                )
-            )
-            + self.lib.cast(~car_in_bounds, self.lib.float32)
-        )
-        return cost
+    def get_heading(self, states: TensorType) -> TensorType:
+        return states[..., 2]
@@ -1,53 +1,47 @@
-import yaml
-import os
-
 from SI_Toolkit.computation_library import TensorType
-from Control_Toolkit.Cost_Functions import cost_function_base
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters, get_cost_weights
+from Control_Toolkit_ASF.Cost_Functions.discounted_cost import discounted_cost_function_base
+from Control_Toolkit_ASF.Cost_Functions.obstacle_cost import obstacle_proximity_cost
 from Environments.obstacle_avoidance_batched import obstacle_avoidance_batched
 
 
-config = yaml.load(
-    open(os.path.join("Control_Toolkit_ASF", "config_cost_function.yml"), "r"),
-    Loader=yaml.FullLoader,
-)
-distance_to_target_weight = float(
-    config["obstacle_avoidance_batched"]["default"]["distance_to_target_weight"]
-)
-distance_to_obstacle_weight = float(
-    config["obstacle_avoidance_batched"]["default"]["distance_to_obstacle_weight"]
-)
-goal_reward = float(
-    config["obstacle_avoidance_batched"]["default"]["goal_reward"]
-)
-out_of_bounds_cost = float(
-    config["obstacle_avoidance_batched"]["default"]["out_of_bounds_cost"]
-)
+parameters = get_cost_parameters("obstacle_avoidance_batched", "default")
+obstacle_chunk_size = parameters.get("obstacle_chunk_size", None)
 
-class default(cost_function_base):
-    MAX_COST = max(12.0 * distance_to_target_weight + 1.0 * distance_to_obstacle_weight, out_of_bounds_cost)
+class default(discounted_cost_function_base):
+    MAX_COST = max(12.0 * parameters["distance_to_target_weight"] + 1.0 * parameters["distance_to_obstacle_weight"], parameters["out_of_bounds_cost"])
+    discount_factor = parameters.get("discount_factor")
     
     def _distance_to_obstacle_cost(self, x: TensorType, y: TensorType, z: TensorType) -> TensorType:
         # x/y/z each has shape batch_size x mpc_horizon
-        x_obs, y_obs, z_obs, radius = self.lib.unstack(self.variable_parameters.obstacle_positions, 4, -1)
-        x_obs = x_obs[:, self.lib.newaxis, self.lib.newaxis]
-        y_obs = y_obs[:, self.lib.newaxis, self.lib.newaxis]
-        z_obs = z_obs[:, self.lib.newaxis, self.lib.newaxis]
-        radius = radius[:, self.lib.newaxis, self.lib.newaxis]
-        
-        num_obstacles = self.lib.shape(x_obs)[0]
-        d = self.lib.sqrt(
-            (self.lib.repeat(x[self.lib.newaxis, ...], num_obstacles, 0) - x_obs) ** 2
-            + (self.lib.repeat(y[self.lib.newaxis, ...], num_obstacles, 0) - y_obs) ** 2
-            + (self.lib.repeat(z[self.lib.newaxis, ...], num_obstacles, 0) - z_obs) ** 2
+        return obstacle_proximity_cost(
+            self.lib, [x, y, z], self.variable_parameters.obstacle_positions, obstacle_chunk_size
         )
-        c = 1.0 - (self.lib.min(1.0, d / radius)) ** 2
-        return self.lib.reduce_max(c, 0)
 
     def _get_distance(self, x1, x2):
         # Squared distance between points x1 and x2
         return (x1 - x2) ** 2
 
+    def _at_goal(self, states: TensorType) -> TensorType:
+        target = self.lib.to_tensor(self.variable_parameters.target_point, self.lib.float32)
+        pos_x, pos_y, pos_z = states[..., 0], states[..., 1], states[..., 2]
+        car_in_bounds = obstacle_avoidance_batched._in_bounds(self.lib, pos_x, pos_y, pos_z)
+        car_at_target = obstacle_avoidance_batched._at_target(self.lib, pos_x, pos_y, pos_z, target)
+        return self.lib.cast(car_in_bounds & car_at_target, self.lib.float32)
+
+    def get_weighted_single_stage_cost(
+        self, states: TensorType, inputs: TensorType, previous_input: TensorType, stage_weight: TensorType, stage_weights_sum: TensorType
+    ) -> TensorType:
+        # In the trajectory cost every stage pays the goal reward of all states at the target. So a state at the target
+        # earns the goal reward with the weights of all stages, of which the single stage cost only holds stage_weight.
+        w = get_cost_weights(self.lib, "obstacle_avoidance_batched", "default")
+        return (
+            stage_weight * self.get_single_stage_cost(states, inputs, previous_input)
+            - w.goal_reward * (stage_weights_sum - stage_weight) * self._at_goal(states)
+        )
+
     def _get_stage_cost(self, states: TensorType, inputs: TensorType, previous_input: TensorType) -> TensorType:
+        w = get_cost_weights(self.lib, "obstacle_avoidance_batched", "default")
         target = self.lib.to_tensor(self.variable_parameters.target_point, self.lib.float32)
         pos_x, pos_y, pos_z, _, _, _ = self.lib.unstack(states, 6, -1)
 
@@ -61,12 +55,12 @@ class default(cost_function_base):
         car_at_target = obstacle_avoidance_batched._at_target(self.lib, pos_x, pos_y, pos_z, target)
 
         cost = (
-            - goal_reward * self.lib.sum(self.lib.cast(car_in_bounds & car_at_target, self.lib.float32), 1)[:, self.lib.newaxis]  # Sum number of horizon states at target -> optimizer will try to get as many horizon states into target area
+            - w.goal_reward * self.lib.sum(self.lib.cast(car_in_bounds & car_at_target, self.lib.float32), 1)[:, self.lib.newaxis]  # Sum number of horizon states at target -> optimizer will try to get as many horizon states into target area
             + self.lib.cast(car_in_bounds & (~car_at_target), self.lib.float32) * (
-                distance_to_target_weight * ld
-                + distance_to_obstacle_weight * self._distance_to_obstacle_cost(pos_x, pos_y, pos_z)
+                w.distance_to_target_weight * ld
+                + w.distance_to_obstacle_weight * self._distance_to_obstacle_cost(pos_x, pos_y, pos_z)
             )
-            + out_of_bounds_cost * self.lib.cast(~car_in_bounds, self.lib.float32)
+            + w.out_of_bounds_cost * self.lib.cast(~car_in_bounds, self.lib.float32)
         )
 
         return cost
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from SI_Toolkit.computation_library import ComputationLibrary, TensorType
+
+
+def obstacle_proximity_cost(
+    lib: "type[ComputationLibrary]",
+    positions: "list[TensorType]",
+    obstacle_positions: TensorType,
+    chunk_size: Optional[int] = None,
+) -> TensorType:
+    """Cost 1 - min(1, d / r)^2 of the closest obstacle, for positions inside any obstacle's radius r.
+
+    positions: one tensor per dimension, each of shape batch_size x mpc_horizon
+    obstacle_positions: num_obstacles x (dimensions + 1), the last column being the radius
+
+    The positions are broadcast against the obstacles instead of repeated, and compared by squared distance,
+    so no square root is taken. With chunk_size, obstacles are processed in chunks with a running max,
+    which bounds the largest temporary to chunk_size x batch_size x mpc_horizon for any number of obstacles.
+    """
+    num_obstacles = obstacle_positions.shape[0]
+    if num_obstacles == 0:
+        return lib.zeros_like(positions[0])
+    chunk_size = num_obstacles if chunk_size is None else chunk_size
+
+    cost = None
+    for start in range(0, num_obstacles, chunk_size):
+        obstacles = obstacle_positions[start : start + chunk_size]
+        squared_distance = 0.0
+        for k, p in enumerate(positions):
+            squared_distance = squared_distance + (p[lib.newaxis, ...] - obstacles[:, k, lib.newaxis, lib.newaxis]) ** 2
+        radius = obstacles[:, -1, lib.newaxis, lib.newaxis]
+        c = lib.reduce_max(1.0 - lib.min(1.0, squared_distance / radius**2), 0)
+        cost = c if cost is None else lib.max(cost, c)
+    return cost
@@ -0,0 +1,20 @@
+import numpy as np
+from SI_Toolkit.computation_library import ComputationLibrary, TensorType
+
+from Utilities.utils import CurrentRunMemory
+
+
+def get_stage_time_weights_numpy(horizon: int) -> np.ndarray:
+    """Weight (horizon,) of each MPC stage proportional to its time span, 1.0 for a stage of the nominal dt.
+
+    All ones unless the predictor uses non-uniform steps along the horizon (see `fine_horizon` of next_state_predictor_ODE).
+    """
+    stage_durations = CurrentRunMemory.stage_durations
+    if stage_durations is None or len(stage_durations) != horizon:
+        return np.ones(horizon, dtype=np.float32)
+    return (stage_durations / stage_durations[0]).astype(np.float32)
+
+
+def get_stage_time_weights(lib: "type[ComputationLibrary]", horizon: int) -> TensorType:
+    """`get_stage_time_weights_numpy` as a tensor of lib."""
+    return lib.to_tensor(get_stage_time_weights_numpy(horizon), lib.float32)
@@ -0,0 +1,114 @@
+"""
+Build the Forces interface functions as casadi.Function objects once, and optionally as compiled native code.
+
+`get_function` calls an interface function (e.g. `dynamics_forces_interface.pendulum_dynamics` or
+`cost_forces_interface.cartpole_simulator1`) once with symbolic SX arguments of the given sizes and wraps the result in a
+casadi.Function, which is cached for the process. Pass values which the expression depends on but which are not arguments,
+such as cost weights, as `parameters`, so they are part of the cache key.
+
+`get_compiled_function` generates C code for this function, compiles it into a shared library and loads it with
+casadi.external. Libraries are kept in `CACHE_FOLDER` under a hash of the serialized expression, so a rerun with the same
+expression and weights loads the library without generating or compiling anything. Without a working C compiler
+(`CC`, default gcc) it falls back to the symbolic function. Compiled functions evaluate numerically only:
+to embed a function in a symbolic model (e.g. for Forces code generation) use the symbolic one.
+`evaluate` picks between the two by the type of the arguments. The Forces interface functions call it, directly or
+through the `cached_interface_function` decorator.
+"""
+import functools
+import hashlib
+import os
+import subprocess
+from typing import Callable, Optional
+
+import casadi
+import numpy as np
+
+from Utilities.utils import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FOLDER = os.path.join("Output", "casadi_cache")
+
+_functions: "dict[tuple, casadi.Function]" = {}
+_compiled_functions: "dict[str, casadi.Function]" = {}
+
+
+def get_function(interface_function: Callable, sizes: "tuple[int, ...]", parameters: tuple = (), name: Optional[str] = None) -> casadi.Function:
+    """casadi.Function of interface_function with one SX argument (size, 1) per entry of sizes."""
+    key = (interface_function, tuple(sizes), tuple(parameters))
+    if key not in _functions:
+        name = name or interface_function.__name__
+        arguments = [casadi.SX.sym(f"x{k}", size, 1) for k, size in enumerate(sizes)]
+        _functions[key] = casadi.Function(name, arguments, [interface_function(*arguments)])
+    return _functions[key]
+
+
+def _compile(function: casadi.Function, library_path: str):
+    folder = os.path.dirname(library_path)
+    name = os.path.splitext(os.path.basename(library_path))[0]
+    # Generate and compile under names private to this process and rename the library into place,
+    # so concurrent runs never compile or load a partially written file
+    temporary_name = f"{name}_{os.getpid()}"
+    source_path = os.path.join(folder, f"{temporary_name}.c")
+    temporary_path = os.path.join(folder, f".{temporary_name}.so")
+    try:
+        generator = casadi.CodeGenerator(f"{temporary_name}.c", {"with_header": False})
+        generator.add(function)
+        generator.generate(folder + os.sep)
+        subprocess.run(
+            [os.environ.get("CC", "gcc"), "-fPIC", "-shared", "-O3", source_path, "-o", temporary_path],
+            check=True,
+            capture_output=True,
+        )
+        os.replace(temporary_path, library_path)
+    finally:
+        for path in [source_path, temporary_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def get_compiled_function(interface_function: Callable, sizes: "tuple[int, ...]", parameters: tuple = (), name: Optional[str] = None) -> casadi.Function:
+    """Native version of `get_function`, compiled once per expression and cached on disk."""
+    function = get_function(interface_function, sizes, parameters, name)
+    expression_hash = hashlib.sha256(f"{casadi.__version__}\n{function.serialize()}".encode()).hexdigest()[:16]
+    library_name = f"{function.name()}_{expression_hash}"
+    if library_name in _compiled_functions:
+        return _compiled_functions[library_name]
+
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    library_path = os.path.join(CACHE_FOLDER, f"{library_name}.so")
+    if not os.path.isfile(library_path):
+        logger.info(f"Compiling {function.name()} into {library_path}")
+        try:
+            _compile(function, library_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, "stderr", None)
+            logger.warning(f"Compiling {function.name()} failed, using the symbolic function. {stderr.decode() if stderr else e}")
+            return function
+
+    _compiled_functions[library_name] = casadi.external(function.name(), library_path)
+    return _compiled_functions[library_name]
+
+
+def evaluate(interface_function: Callable, arguments: tuple, parameters: tuple = (), name: Optional[str] = None):
+    """Call interface_function(*arguments) through its cached casadi.Function.
+
+    Symbolic arguments (SX, MX) get the symbolic function, so the result can be embedded in a model.
+    Numeric arguments get the compiled one.
+    """
+    sizes = tuple(a.numel() if isinstance(a, (casadi.SX, casadi.MX, casadi.DM)) else int(np.size(a)) for a in arguments)
+    if any(isinstance(a, (casadi.SX, casadi.MX)) for a in arguments):
+        function = get_function(interface_function, sizes, parameters, name)
+    else:
+        function = get_compiled_function(interface_function, sizes, parameters, name)
+    return function(*arguments)
+
+
+def cached_interface_function(interface_function: Callable) -> Callable:
+    """Decorator routing every call of an interface function through `evaluate`, so its expression is built once."""
+
+    @functools.wraps(interface_function)
+    def cached(*arguments):
+        return evaluate(interface_function, arguments, name=interface_function.__name__)
+
+    return cached
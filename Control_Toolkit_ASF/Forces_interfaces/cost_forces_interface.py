@@ -1,16 +1,15 @@
+from functools import lru_cache
+
 import casadi
-import yaml
-import os
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters
+from Control_Toolkit_ASF.Forces_interfaces.casadi_functions import evaluate
 """
 Forces requires a function of the cost in the form
 objective = f(z,p)
 to derive equality constraints
-"""
 
-config = yaml.load(
-    open(os.path.join("Control_Toolkit_ASF", "config_cost_function.yml"), "r"),
-    Loader=yaml.FullLoader,
-)
+The cartpole weights are baked into the expression, which is built once through casadi_functions.evaluate.
+"""
 
 
 def pendulum(z, p):
@@ -22,15 +21,23 @@ def continuous_mountaincar(z, p):
 def continuous_mountaincar_approximated(z, p):
     return -1.27*(z[1] + 0.4)**3 - 1.56 * (z[1] + 0.4)**2 + 0.00326758 * (z[1] + 0.4) + 0.322505
 
+@lru_cache(maxsize=None)
 def cartpole_weights():
-    cartpole_angle_weight = float(config["cartpole_simulator_batched"]["default"]["angle_weight"])
-    cartpole_position_weight = float(config["cartpole_simulator_batched"]["default"]["position_weight"])
-    return cartpole_angle_weight, cartpole_position_weight
+    # Read once from the config loaded in cost_parameters. The weights are baked into the expression
+    # and the solver generated from it, so a later reload of the config does not apply here
+    parameters = get_cost_parameters("cartpole_simulator_batched", "default")
+    return float(parameters["angle_weight"]), float(parameters["position_weight"])
 
-def cartpole_simulator1(z, p):
+def _cartpole_simulator1(z, p):
     cartpole_angle_weight, cartpole_position_weight = cartpole_weights()
     return -cartpole_angle_weight*casadi.cos(z[1]) + cartpole_position_weight*(z[3] - p[3])**2
 
-def cartpole_simulator2(z, p):
+def _cartpole_simulator2(z, p):
     cartpole_angle_weight, cartpole_position_weight = cartpole_weights()
-    return -cartpole_angle_weight*(z[1]**2) + cartpole_position_weight*(z[3] - p[3])**2
\ No newline at end of file
+    return -cartpole_angle_weight*(z[1]**2) + cartpole_position_weight*(z[3] - p[3])**2
+
+def cartpole_simulator1(z, p):
+    return evaluate(_cartpole_simulator1, (z, p), parameters=cartpole_weights(), name="cartpole_simulator1")
+
+def cartpole_simulator2(z, p):
+    return evaluate(_cartpole_simulator2, (z, p), parameters=cartpole_weights(), name="cartpole_simulator2")
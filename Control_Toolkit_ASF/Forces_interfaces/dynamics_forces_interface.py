@@ -5,13 +5,19 @@ from CartPoleSimulation.CartPole.state_utilities import (ANGLE_COS_IDX, ANGLE_ID
                                                              ANGLED_IDX, POSITION_IDX, POSITIOND_IDX)
 from CartPoleSimulation.CartPole.cartpole_jacobian import cartpole_jacobian
 from Environments.acrobot_batched import acrobot_batched
+from Control_Toolkit_ASF.Forces_interfaces.casadi_functions import cached_interface_function
 """
 Forces requires a function of the dynamics in the form
 dx/dt = f(x,u,p)
 to derive equality constraints
+
+The derivatives are assembled with casadi.vertcat instead of assigning into a new SX symbol on every call.
+Each function is built once per argument size as a casadi.Function (see casadi_functions.cached_interface_function),
+later calls evaluate the cached function.
 """
 
 
+@cached_interface_function
 def cartpole_linear_dynamics(s, u, p):
     # calculate dx/dt evaluating f(x,u) = A(x,u)*x + B(x,u)*u
     action_high = 2.62
@@ -20,27 +26,22 @@ def cartpole_linear_dynamics(s, u, p):
     B = np.reshape(jacobian[:, -1], newshape=(4, 1)) * action_high
     return A @ s + B @ u
 
+@cached_interface_function
 def cartpole_non_linear_dynamics(s, u, p: 0):
     u_max = 2.62
     ca, sa, angleD, positionD = np.cos(s[0]), np.sin(s[0]), s[1], s[3]
     angleDD, positionDD = _cartpole_ode(ca, sa, angleD, positionD, u*u_max)
-    sD = casadi.SX.sym('sD', 4, 1)
-    sD[0] = angleD
-    sD[1] = angleDD
-    sD[2] = positionD
-    sD[3] = positionDD
-    return sD
+    return casadi.vertcat(angleD, angleDD, positionD, positionDD)
 
+@cached_interface_function
 def pendulum_dynamics(s, u, p):
     # th, thD, sth, cth = s[0], s[1], s[2], s[3]
     g = 10.0
     l = 1.0
     m = 1.0
-    sD = casadi.SX.sym('sD', 2, 1)
-    sD[0] = s[1]
-    sD[1] = 3 * g / (2 * l) * np.sin(s[0]) + 3.0 / (m * l ** 2) * u
-    return sD
+    return casadi.vertcat(s[1], 3 * g / (2 * l) * np.sin(s[0]) + 3.0 / (m * l ** 2) * u)
 
+@cached_interface_function
 def acrobot_dynamics(s, u, p):
     # PDIP non linear solver are not suitable for this environment,
     # since it has continuous dynamics but discrete action space
@@ -97,14 +98,9 @@ def acrobot_dynamics(s, u, p):
     ) / (m2 * lc2**2 + I2 - d2**2 / d1)
     ddtheta1 = -(d2 * ddtheta2 + phi1) / d1
 
-    sD = casadi.SX.sym('sD', 4, 1)
-    sD[0] = dtheta1
-    sD[1] = dtheta2
-    sD[2] = ddtheta1
-    sD[3] = ddtheta2
-
-    return sD
+    return casadi.vertcat(dtheta1, dtheta2, ddtheta1, ddtheta2)
 
+@cached_interface_function
 def continuous_mountaincar(s,u,p):
     power = 0.0015
     force = u
@@ -112,9 +108,7 @@ def continuous_mountaincar(s,u,p):
 
     position = s[0]
     velocity = s[1]
-    sD = casadi.SX.sym('sD', 2, 1)
-
-    sD[0] = s[1] * casadi.logic_not(casadi.logic_and((position <= min_position), (velocity < 0)))
-    sD[1] = force * power - 0.0025 * casadi.cos(3 * position)
-
-    return sD
\ No newline at end of file
+    return casadi.vertcat(
+        s[1] * casadi.logic_not(casadi.logic_and((position <= min_position), (velocity < 0))),
+        force * power - 0.0025 * casadi.cos(3 * position),
+    )
\ No newline at end of file
@@ -1,30 +1,148 @@
-from typing import Union
-
-import numpy as np
-import tensorflow as tf
-import torch
-from gymnasium.envs.registration import register
-from numpy.random import Generator
-from Utilities.utils import get_logger
-
-log = get_logger(__name__)
-
-ENV_REGISTRY = {
-    "MountainCarContinuous-v0": "Environments.continuous_mountaincar_batched:continuous_mountaincar_batched",
-    "Acrobot-v0": "Environments.acrobot_batched:acrobot_batched",
-    "DubinsCar-v0": "Environments.dubins_car_batched:dubins_car_batched",
-    "ObstacleAvoidance-v0": "Environments.obstacle_avoidance_batched:obstacle_avoidance_batched",
-    "LunarLander-v2": "Environments.lunar_lander_batched:lunar_lander_batched",
-    "CartPoleSimulator-v0": "Environments.cartpole_simulator_batched:cartpole_simulator_batched",
-    "CartPoleContinuous-v0": "Environments.continuous_cartpole_batched:continuous_cartpole_batched",
-    "Pendulum-v0": "Environments.pendulum_batched:pendulum_batched",
-    "HalfCheetahBatched-v0": "Environments.half_cheetah_batched:half_cheetah_batched",
-    "BipedalWalkerBatched-v0": "Environments.bipedal_walker_batched:bipedal_walker_batched",
+"""
+Registry of the batched environments.
+
+Importing this package does not import any environment module. Each entry records the entry point and some
+capability metadata, so tools can list and inspect environments without loading TensorFlow, MuJoCo or Box2D.
+The environment module itself is only imported by `gym.make`.
+
+Metadata fields:
+    entry_point: "<module>:<class>" passed to gym
+    num_states / num_actions: size of state and action vectors, copies of the class attributes of the same name
+    backends: computation libraries `step_dynamics` runs with
+    batched_real_env: the environment batch is made of real simulator instances instead of an analytic model
+    compile_safe: `step_dynamics` has no Python side effects and can be traced by tf.function / XLA
+    heavy_dependencies: simulators pulled in when the environment module is imported
+"""
+from importlib import import_module
+
+ENV_METADATA = {
+    "MountainCarContinuous-v0": dict(
+        entry_point="Environments.continuous_mountaincar_batched:continuous_mountaincar_batched",
+        num_states=2,
+        num_actions=1,
+        backends=("numpy", "tensorflow", "pytorch"),
+        batched_real_env=False,
+        compile_safe=True,
+        heavy_dependencies=(),
+    ),
+    "Acrobot-v0": dict(
+        entry_point="Environments.acrobot_batched:acrobot_batched",
+        num_states=4,
+        num_actions=1,
+        backends=("numpy", "tensorflow", "pytorch"),
+        batched_real_env=False,
+        compile_safe=True,
+        heavy_dependencies=(),
+    ),
+    "DubinsCar-v0": dict(
+        entry_point="Environments.dubins_car_batched:dubins_car_batched",
+        num_states=4,
+        num_actions=2,
+        backends=("tensorflow",),
+        batched_real_env=False,
+        compile_safe=True,
+        heavy_dependencies=(),
+    ),
+    "ObstacleAvoidance-v0": dict(
+        entry_point="Environments.obstacle_avoidance_batched:obstacle_avoidance_batched",
+        num_states=6,
+        num_actions=3,
+        backends=("tensorflow",),
+        batched_real_env=False,
+        compile_safe=True,
+        heavy_dependencies=(),
+    ),
+    "LunarLander-v2": dict(
+        entry_point="Environments.lunar_lander_batched:lunar_lander_batched",
+        num_states=7,
+        num_actions=2,
+        backends=("tensorflow",),
+        batched_real_env=False,
+        compile_safe=False,  # step_dynamics advances the wind/torque indices and draws engine dispersion
+        heavy_dependencies=("box2d",),
+    ),
+    "CartPoleSimulator-v0": dict(
+        entry_point="Environments.cartpole_simulator_batched:cartpole_simulator_batched",
+        num_states=6,
+        num_actions=1,
+        backends=("tensorflow",),
+        batched_real_env=False,
+        compile_safe=True,
+        heavy_dependencies=(),
+    ),
+    "CartPoleContinuous-v0": dict(
+        entry_point="Environments.continuous_cartpole_batched:continuous_cartpole_batched",
+        num_states=4,
+        num_actions=1,
+        backends=("numpy", "tensorflow", "pytorch"),
+        batched_real_env=False,
+        compile_safe=True,
+        heavy_dependencies=(),
+    ),
+    "Pendulum-v0": dict(
+        entry_point="Environments.pendulum_batched:pendulum_batched",
+        num_states=4,
+        num_actions=1,
+        backends=("numpy", "tensorflow", "pytorch"),
+        batched_real_env=False,
+        compile_safe=True,
+        heavy_dependencies=(),
+    ),
+    "HalfCheetahBatched-v0": dict(
+        entry_point="Environments.half_cheetah_batched:half_cheetah_batched",
+        num_states=17,
+        num_actions=6,
+        backends=("numpy",),
+        batched_real_env=True,
+        compile_safe=False,
+        heavy_dependencies=("mujoco", "tf_agents"),
+    ),
+    "BipedalWalkerBatched-v0": dict(
+        entry_point="Environments.bipedal_walker_batched:bipedal_walker_batched",
+        num_states=24,
+        num_actions=4,
+        backends=("numpy",),
+        batched_real_env=True,
+        compile_safe=False,
+        heavy_dependencies=("box2d",),
+    ),
 }
 
+# Kept for scripts which only need the entry point
+ENV_REGISTRY = {identifier: metadata["entry_point"] for identifier, metadata in ENV_METADATA.items()}
+
+
+def get_env_metadata(identifier: str) -> dict:
+    if identifier not in ENV_METADATA:
+        raise ValueError(f"Environment {identifier} is not registered. Choose one of {list(ENV_METADATA.keys())}.")
+    return ENV_METADATA[identifier]
+
+
+def list_envs(**required) -> "list[str]":
+    """List registered environments, optionally filtered by metadata, e.g. `list_envs(compile_safe=True)`."""
+    return [
+        identifier
+        for identifier, metadata in ENV_METADATA.items()
+        if all(
+            value in metadata[key] if isinstance(metadata[key], tuple) else metadata[key] == value
+            for key, value in required.items()
+        )
+    ]
+
+
+def get_env_class(identifier: str):
+    """Import the environment module and return its class."""
+    module_name, class_name = get_env_metadata(identifier)["entry_point"].split(":")
+    return getattr(import_module(module_name), class_name)
+
 
 def register_envs():
+    from gymnasium.envs.registration import register, registry
+
     for identifier, entry_point in ENV_REGISTRY.items():
+        if identifier in registry:
+            continue
+        # The entry point is a string, so gym imports the module only on the first gym.make
         register(
             id=identifier,
             entry_point=entry_point,
@@ -8,10 +8,12 @@ from gymnasium.envs.classic_control import utils
 from gymnasium.envs.classic_control.acrobot import AcrobotEnv
 
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from SI_Toolkit.computation_library import ComputationLibrary, NumpyLibrary, TensorType
 
 
-class acrobot_batched(EnvironmentBatched, AcrobotEnv):
+class acrobot_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, AcrobotEnv):
     num_actions = 1
     num_states = 4
     book_or_nips = "nips"
@@ -152,6 +154,12 @@ class acrobot_batched(EnvironmentBatched, AcrobotEnv):
     def is_done(lib: "type[ComputationLibrary]", state: TensorType):
         return False
 
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward of gymnasium's Acrobot for states (..., 4): -1 until the tip is one link length above the pivot."""
+        th1, th2, th1_vel, th2_vel = self.lib.unstack(state, 4, -1)
+        reached_height = -self.lib.cos(th1) - self.lib.cos(th2 + th1) > 1.0
+        return self.lib.cast(reached_height, self.lib.float32) - 1.0
+
     def _convert_to_state(self, state):
         if self.lib.shape(state)[-1] == self.num_states:
             return state
@@ -10,7 +10,7 @@ from gymnasium.envs.box2d.bipedal_walker import *
 
 
 class bipedal_walker_batched(EnvironmentBatched, BipedalWalker):
-    """Accepts batches of data to environment"""
+    """Accepts batches of data to environment. Has no snapshots, the state of the Box2D worlds cannot be captured."""
 
     num_actions = 4
     num_states = 24
@@ -125,23 +125,16 @@ class bipedal_walker_batched(EnvironmentBatched, BipedalWalker):
     def is_done(self, state):
         return False
 
-    def get_reward(self, state, action):
-        shaping = (
-            130 * pos[:, 0] / SCALE
-        )  # moving forward is a way to receive reward (normalized to get 300 on completion)
-        shaping -= 5.0 * self.lib.abs(
-            state[0]
-        )  # keep head straight, other than that and falling, any behavior is unpunished
-
-        reward = self.lib.zeros((self._batch_size,))
-        if self.prev_shaping is not None:
-            reward = shaping - self.prev_shaping
-        self.prev_shaping = shaping
-
-        for a in action:
-            reward -= 0.00035 * MOTORS_TORQUE * self.lib.clip(self.lib.abs(a), 0, 1)
-            # normalized to about -50.0 using heuristic, more optimal agent should spend less
-
-        reward[self.game_over or pos[:, 0] < 0] = -100
-
-        return reward
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward of gymnasium's BipedalWalker for observations (..., 24) and actions (..., 4), without instance state.
+
+        Gymnasium rewards the change of the shaping 130 * hull x / SCALE - 5 * |hull angle| between steps. Both changes
+        are taken from the velocities in the observation instead of the previous step's shaping.
+        The -100 on falling needs the hull contact, which is not observed, and is left out.
+        """
+        hull_angle, hull_angular_velocity, velocity_x = state[..., 0], state[..., 1], state[..., 2]
+        # Observed as 0.3 * vel.x * (VIEWPORT_W / SCALE) / FPS and 2.0 * angularVelocity / FPS
+        forward_progress = 130.0 * velocity_x / (0.3 * VIEWPORT_W)
+        head_tilt_change = self.lib.sign(hull_angle) * 0.5 * hull_angular_velocity
+        torque_cost = 0.00035 * MOTORS_TORQUE * self.lib.sum(self.lib.clip(self.lib.abs(action), 0.0, 1.0), -1)
+        return forward_progress - 5.0 * head_tilt_change - torque_cost
@@ -6,13 +6,18 @@ from CartPoleSimulation.CartPole.cartpole_model_tf import (
     _cartpole_ode, cartpole_integration_tf)
 from CartPoleSimulation.GymlikeCartPole.CartPoleEnv_LTC import CartPoleEnv_LTC
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_weights
+from Environments.scenario_bank import load_scenario
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from SI_Toolkit.computation_library import ComputationLibrary, NumpyLibrary, TensorType
 from gymnasium.spaces import Box
 
 
-class cartpole_simulator_batched(EnvironmentBatched, CartPoleEnv_LTC):
+class cartpole_simulator_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, CartPoleEnv_LTC):
     num_actions = 1
     num_states = 6
+    snapshot_attributes = ("count", "target_position", "steps_beyond_done")
 
     def __init__(
         self,
@@ -26,6 +31,7 @@ class cartpole_simulator_batched(EnvironmentBatched, CartPoleEnv_LTC):
         self.render_mode = render_mode
 
         self.shuffle_target_every = kwargs["shuffle_target_every"]
+        self.scenario = load_scenario(kwargs)
         self.config = {
             **kwargs,
             **{"render_mode": self.render_mode},
@@ -86,7 +92,7 @@ class cartpole_simulator_batched(EnvironmentBatched, CartPoleEnv_LTC):
         self.action = None
         self.reward = None
         self.done = False
-        self.count = 0
+        self.count = 1
 
         self.steps_beyond_done = None
 
@@ -98,7 +104,10 @@ class cartpole_simulator_batched(EnvironmentBatched, CartPoleEnv_LTC):
         if seed is not None:
             self._set_up_rng(seed)
         state = options.get("state", None) if isinstance(options, dict) else None
-        self.count = 0
+        if state is None and self.scenario is not None:
+            state = self.scenario["initial_state"]
+        # Steps are counted from 1 as in the other environments (see Environments.scenario_bank)
+        self.count = 1
 
         if state is None:
             low = np.array([-self.lib.pi / 4, 1.0e-1, 1.0e-1, 1.0e-1])
@@ -136,6 +145,12 @@ class cartpole_simulator_batched(EnvironmentBatched, CartPoleEnv_LTC):
             else:
                 self.state = state
 
+        # The episode starts with its first target, later ones are set every shuffle_target_every steps
+        if self.scenario is not None and "target_position" in self.scenario:
+            self.target_position.assign(self.scenario["target_position"])
+        else:
+            self.target_position.assign(self.sample_target())
+
         if self._batch_size == 1:
             self.state = self.lib.to_numpy(self.lib.squeeze(self.state))
 
@@ -191,9 +206,10 @@ class cartpole_simulator_batched(EnvironmentBatched, CartPoleEnv_LTC):
         # Update the total time of the simulation
         # self.CartPoleInstance.step_time()
         if self.count % self.shuffle_target_every == 0:
-            new_target = self.lib.uniform(
-                self.rng, [], -self.x_threshold, self.x_threshold, self.lib.float32
-            )
+            if self.scenario is not None:
+                new_target = self.scenario["target_schedule"][self.count // self.shuffle_target_every - 1]
+            else:
+                new_target = self.sample_target()
             self.target_position.assign(new_target)
         self.count += 1
 
@@ -212,6 +228,25 @@ class cartpole_simulator_batched(EnvironmentBatched, CartPoleEnv_LTC):
             {"target": self.lib.to_numpy(self.target_position)},
         )
 
+    def sample_target(self) -> TensorType:
+        return self.lib.uniform(
+            self.rng, [], -self.x_threshold, self.x_threshold, self.lib.float32
+        )
+
+    def get_scenario(self) -> "dict[str, np.ndarray]":
+        """Randomized parts of the current episode, as stored in a scenario bank."""
+        return {
+            "initial_state": np.reshape(self.lib.to_numpy(self.state), (-1,)),
+            "target_position": self.lib.to_numpy(self.target_position),
+        }
+
     @staticmethod
     def is_done(lib: "type[ComputationLibrary]", state: TensorType):
-        return False
\ No newline at end of file
+        return False
+
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward for states (..., 6). The simulator defines no reward, this is the negative stage cost of the
+        cartpole_simulator_batched default cost function with its configured weights."""
+        w = get_cost_weights(self.lib, "cartpole_simulator_batched", "default")
+        angle, angleD, angle_cos, angle_sin, position, positionD = self.lib.unstack(state, 6, -1)
+        return w.angle_weight * angle_cos - w.position_weight * (position - self.target_position) ** 2
@@ -7,12 +7,15 @@ from gymnasium import spaces
 from gymnasium.envs.classic_control.cartpole import CartPoleEnv
 
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from SI_Toolkit.computation_library import ComputationLibrary, NumpyLibrary, TensorType
 
 
-class continuous_cartpole_batched(EnvironmentBatched, CartPoleEnv):
+class continuous_cartpole_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, CartPoleEnv):
     num_actions = 1
     num_states = 4
+    snapshot_attributes = ("steps_beyond_done",)
     
     theta_threshold_radians = 12 * 2 * np.pi / 360
     x_threshold = 2.4
@@ -148,3 +151,11 @@ class continuous_cartpole_batched(EnvironmentBatched, CartPoleEnv):
             | (theta < -continuous_cartpole_batched.theta_threshold_radians)
             | (theta > continuous_cartpole_batched.theta_threshold_radians)
         )
+
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward for states (..., 4): 1 while the pole is up and the cart on the track, 0 in a terminal state.
+
+        Gymnasium's CartPole still pays 1 on the step which terminates and 0 only on steps after that. A reward
+        of the state alone cannot tell these apart, so every terminal state gets 0, which lets a rollout see the failure.
+        """
+        return 1.0 - self.lib.cast(self.is_done(self.lib, state), self.lib.float32)
@@ -4,10 +4,12 @@ import numpy as np
 from gymnasium.envs.classic_control.continuous_mountain_car import Continuous_MountainCarEnv
 
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from SI_Toolkit.computation_library import ComputationLibrary, NumpyLibrary, TensorType
 
 
-class continuous_mountaincar_batched(EnvironmentBatched, Continuous_MountainCarEnv):
+class continuous_mountaincar_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, Continuous_MountainCarEnv):
     """Accepts batches of data to environment
 
     :param Continuous_MountainCarEnv: _description_
@@ -158,3 +160,8 @@ class continuous_mountaincar_batched(EnvironmentBatched, Continuous_MountainCarE
         position, velocity = lib.unstack(state, 2, -1)
         return (position >= goal_position) & (velocity >= goal_velocity)
 
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward of gymnasium's MountainCarContinuous for states (..., 2) and actions (..., 1)."""
+        done = self.is_done(self.lib, state, self.goal_position, self.goal_velocity)
+        return 100.0 * self.lib.cast(done, self.lib.float32) - 0.1 * action[..., 0] ** 2
+
@@ -35,6 +35,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 import tensorflow as tf
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.scenario_bank import load_scenario
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from gymnasium import spaces
 from matplotlib.patches import Circle
 from matplotlib import use
@@ -68,9 +71,10 @@ WB = 0.25  # [m]
 show_animation = True
 
 
-class dubins_car_batched(EnvironmentBatched, gym.Env):
+class dubins_car_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, gym.Env):
     num_states = 4  # [x, y, yaw, steering_rate]
     num_actions = 2
+    snapshot_attributes = ("count", "target_point", "obstacle_positions", "action", "traj_x", "traj_y", "traj_yaw")
     metadata = {"render_modes": ["console", "single_rgb_array", "rgb_array", "human"], "video.frames_per_second": 30, "render_fps": 30}
 
     def __init__(
@@ -104,11 +108,20 @@ class dubins_car_batched(EnvironmentBatched, gym.Env):
             low, high, dtype=np.float32
         )  # Observation space for [x, y, theta]
 
+        # Optionally read the episode's scenario from a precomputed scenario bank
+        self.scenario = load_scenario(kwargs)
+        if self.scenario is not None:
+            initial_state = list(self.scenario["initial_state"])
+            obstacle_positions = self.scenario["obstacle_positions"].tolist()
+
         self.target_point = tf.Variable(target_point)
         self.shuffle_target_every = shuffle_target_every
-        self.num_obstacles = 8 + math.floor(
-            float(self.lib.uniform(self.rng, (), 0, 8, self.lib.float32))
-        )
+        if self.scenario is not None:
+            self.num_obstacles = len(obstacle_positions)  # The bank holds the obstacles, nothing is drawn for them
+        else:
+            self.num_obstacles = 8 + math.floor(
+                float(self.lib.uniform(self.rng, (), 0, 8, self.lib.float32))
+            )
         self.initial_state = initial_state
         self.dt = kwargs["dt"]
 
@@ -239,6 +252,33 @@ class dubins_car_batched(EnvironmentBatched, gym.Env):
         done = ~(car_in_bounds & (~car_at_target))
         return done
 
+    def _in_obstacle(self, x: TensorType, y: TensorType) -> TensorType:
+        if self.obstacle_positions.shape[0] == 0:
+            return self.lib.zeros_like(x) > 0.0
+        obstacles = self.obstacle_positions
+        squared_distance = (x[..., self.lib.newaxis] - obstacles[:, 0]) ** 2 + (y[..., self.lib.newaxis] - obstacles[:, 1]) ** 2
+        return self.lib.reduce_max(self.lib.cast(squared_distance < obstacles[:, 2] ** 2, self.lib.float32), -1) > 0.0
+
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward for states (..., 4): negative distance to the target, 100 at the target, -100 out of bounds or inside an obstacle."""
+        x, y, yaw_car, steering_rate = self.lib.unstack(state, 4, -1)
+        target = self.lib.to_tensor(self.target_point, self.lib.float32)
+        x_target, y_target, yaw_target = self.lib.unstack(target, 3, 0)
+
+        car_in_bounds = dubins_car_batched._car_in_bounds(self.lib, x, y)
+        car_at_target = dubins_car_batched._car_at_target(self.lib, x, y, x_target, y_target)
+        failed = (~car_in_bounds) | self._in_obstacle(x, y)
+        return (
+            -self.lib.sqrt((x - x_target) ** 2 + (y - y_target) ** 2)
+            + 100.0 * self.lib.cast(car_in_bounds & car_at_target, self.lib.float32)
+            - 100.0 * self.lib.cast(failed, self.lib.float32)
+        )
+
+    def get_terminal_mask(self, states: TensorType) -> TensorType:
+        """At the target, out of bounds or inside an obstacle."""
+        x, y, yaw_car, steering_rate = self.lib.unstack(states, 4, -1)
+        return self.is_done(self.lib, states, self.target_point) | self._in_obstacle(x, y)
+
     @staticmethod
     def get_distance(lib: "type[ComputationLibrary]", x1, x2):
         # Distance between points x1 and x2
@@ -282,13 +322,10 @@ class dubins_car_batched(EnvironmentBatched, gym.Env):
     ]:
         self.action = list(np.array(action))
         if self.count % self.shuffle_target_every == 0:
-            target_new = tf.convert_to_tensor(
-                [
-                    self.target_point[0],
-                    self.lib.uniform(self.rng, [], -1.0, 1.0, self.lib.float32),
-                    self.target_point[2],
-                ]
-            )
+            if self.scenario is not None:
+                target_new = self.scenario["target_schedule"][self.count // self.shuffle_target_every - 1]
+            else:
+                target_new = self.sample_target()
             self.target_point.assign(target_new)
         self.count += 1
         self.state, action = self._expand_arrays(self.state, action)
@@ -306,6 +343,23 @@ class dubins_car_batched(EnvironmentBatched, gym.Env):
 
         return self.lib.to_numpy(self.state), float(reward), terminated, truncated, {}
 
+    def sample_target(self) -> TensorType:
+        # Only the y-coordinate of the target is shuffled
+        return tf.convert_to_tensor(
+            [
+                self.target_point[0],
+                self.lib.uniform(self.rng, [], -1.0, 1.0, self.lib.float32),
+                self.target_point[2],
+            ]
+        )
+
+    def get_scenario(self) -> "dict[str, np.ndarray]":
+        """Randomized parts of the current episode, as stored in a scenario bank."""
+        return {
+            "initial_state": np.reshape(self.lib.to_numpy(self.state), (-1,))[: self.num_states],
+            "obstacle_positions": self.lib.to_numpy(self.obstacle_positions),
+        }
+
     def render(self):
         assert self.render_mode in self.metadata["render_modes"]
         if self.render_mode in {"rgb_array", "single_rgb_array"}:
@@ -4,12 +4,13 @@ import mujoco
 import numpy as np
 import tensorflow as tf
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.snapshot import SnapshotMixin
 from SI_Toolkit.computation_library import NumpyLibrary, TensorType
 from gymnasium.envs.mujoco.half_cheetah_v3 import HalfCheetahEnv
 from tf_agents.environments import BatchedPyEnvironment, suite_gym
 
 
-class half_cheetah_batched(EnvironmentBatched, HalfCheetahEnv):
+class half_cheetah_batched(SnapshotMixin, EnvironmentBatched, HalfCheetahEnv):
     num_actions = 6
     num_states = 17
 
@@ -45,6 +46,10 @@ class half_cheetah_batched(EnvironmentBatched, HalfCheetahEnv):
 
         self._batch_size = batch_size
         self._actuator_noise = np.array(actuator_noise, dtype=np.float32)
+        self._forward_reward_weight = forward_reward_weight
+        self._ctrl_cost_weight = ctrl_cost_weight
+        # The observation holds qpos (without the x position if excluded) followed by qvel, whose first entry is the x velocity
+        self._velocity_x_index = 8 if exclude_current_positions_from_observation else 9
         self.dt = kwargs["dt"]
 
         self.set_computation_library(computation_lib)
@@ -77,6 +82,24 @@ class half_cheetah_batched(EnvironmentBatched, HalfCheetahEnv):
 
         return obs, {}
 
+    def _get_mujoco_envs(self) -> list:
+        return [env.gym.unwrapped for env in self._envs.envs]
+
+    def get_snapshot(self) -> dict:
+        # The simulators hold the state. The step counters of their time limit wrappers are not part of it.
+        snapshot = super().get_snapshot()
+        snapshot["mujoco"] = [
+            {"qpos": env.data.qpos.copy(), "qvel": env.data.qvel.copy(), "time": float(env.data.time)}
+            for env in self._get_mujoco_envs()
+        ]
+        return snapshot
+
+    def restore_snapshot(self, snapshot: dict) -> None:
+        super().restore_snapshot(snapshot)
+        for env, simulator_state in zip(self._get_mujoco_envs(), snapshot["mujoco"]):
+            env.set_state(simulator_state["qpos"], simulator_state["qvel"])
+            env.data.time = simulator_state["time"]
+
     def render(self):
         if self._batch_size == 1:
             return super().render()
@@ -84,13 +107,9 @@ class half_cheetah_batched(EnvironmentBatched, HalfCheetahEnv):
             raise NotImplementedError("Rendering not implemented for batched mode")
 
     def is_done(self, state):
-        position, velocity = self.lib.unstack(state, 2, -1)
-        return (position >= self.goal_position) & (velocity >= self.goal_velocity)
+        return self.lib.zeros_like(state[..., 0]) > 0.0
 
-    def get_reward(self, state, action):
-        position, velocity = self.lib.unstack(state, 2, -1)
-        reward = self.lib.sin(3 * position)
-        # This part is not differentiable:
-        reward += 100.0 * self.lib.cast(self.is_done(state), self.lib.float32)
-        reward -= (action[:, 0] ** 2) * 0.1
-        return reward
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward of gymnasium's HalfCheetah for observations (..., 17 or 18) and actions (..., 6): forward velocity less control cost."""
+        velocity_x = state[..., self._velocity_x_index]
+        return self._forward_reward_weight * velocity_x - self._ctrl_cost_weight * self.lib.sum(action**2, -1)
@@ -6,6 +6,9 @@ from gymnasium import spaces
 import gymnasium as gym
 
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.scenario_bank import load_scenario
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from SI_Toolkit.computation_library import ComputationLibrary, NumpyLibrary, TensorType, RandomGeneratorType
 
 try:
@@ -106,7 +109,7 @@ class GroundContactDetector:
         return self.lib.cast(self.lib.clip(touched, 0, 1), self.lib.float32)
 
 
-class lunar_lander_batched(EnvironmentBatched, LunarLander):
+class lunar_lander_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, LunarLander):
     """Accepts batches of data to environment
     
     Uses the continuous version of LunarLander as base class
@@ -120,6 +123,18 @@ class lunar_lander_batched(EnvironmentBatched, LunarLander):
     # - its angular velocity
     # - a booleans that represents whether the lander is in contact with ground
     num_states = 7
+    snapshot_attributes = (
+        "count",
+        "target_point",
+        "sky_polys",
+        "helipad_x1",
+        "helipad_x2",
+        "helipad_y",
+        "wind_idx",
+        "torque_idx",
+        "game_over",
+        "prev_shaping",
+    )
     
     def __init__(
         self,
@@ -180,6 +195,9 @@ class lunar_lander_batched(EnvironmentBatched, LunarLander):
         self.set_computation_library(computation_lib)
         self._set_up_rng(kwargs["seed"])
         
+        # Optionally read the episode's scenario from a precomputed scenario bank
+        self.scenario = load_scenario(kwargs)
+
         self.target_point = self.lib.to_variable([[0.0, 0.0]], self.lib.float32)
         self.sky_polys = self.init_sky_polys()
         self.ground_contact_detector = GroundContactDetector(self.lib, self.sky_polys)
@@ -244,12 +262,12 @@ class lunar_lander_batched(EnvironmentBatched, LunarLander):
         angleDD += SIDE_ENGINE_POWER * direction * s_power / LANDER_INERTIA
         
         # Euler integration
-        pos_x_updated = pos_x + self.dt * vel_x
-        pos_y_updated = pos_y + self.dt * vel_y
-        vel_x_updated = vel_x + self.dt * acc_x
-        vel_y_updated = vel_y + self.dt * acc_y
-        angle_updated = angle + self.dt * vel_angle
-        vel_angle_updated = vel_angle + self.dt * angleDD
+        pos_x_updated = pos_x + dt * vel_x
+        pos_y_updated = pos_y + dt * vel_y
+        vel_x_updated = vel_x + dt * acc_x
+        vel_y_updated = vel_y + dt * acc_y
+        angle_updated = angle + dt * vel_angle
+        vel_angle_updated = vel_angle + dt * angleDD
         
         contact_updated = self.ground_contact_detector.touched(pos_x, pos_y, angle)
         
@@ -316,19 +334,39 @@ class lunar_lander_batched(EnvironmentBatched, LunarLander):
             
         return sky_polys
     
+    def get_scenario(self) -> "dict[str, np.ndarray]":
+        """Randomized parts of the current episode, as stored in a scenario bank."""
+        return {
+            "initial_state": np.reshape(self.lib.to_numpy(self.state), (-1,))[: self.num_states],
+            "sky_polys": np.array(self.sky_polys, dtype=np.float32),
+            "target_point": self.lib.to_numpy(self.target_point),
+        }
+
+    def restore_snapshot(self, snapshot: dict) -> None:
+        super().restore_snapshot(snapshot)
+        # The contact detector keeps its own copy of the terrain
+        self.ground_contact_detector.set_sky_polys(self.sky_polys)
+
     def reset(self, seed: "Optional[int]" = None, options: "Optional[dict]" = None) -> "Tuple[np.ndarray, dict]":
         self.game_over = False
         self.prev_shaping = None
 
-        self.sky_polys = self.init_sky_polys()
-        self.ground_contact_detector.set_sky_polys(self.sky_polys)
-        
-        target_x = self.lib.uniform(self.rng, (1, 1), -0.8, 0.8, self.lib.float32)
-        self.lib.assign(self.target_point, self.lib.concat([target_x, self.ground_contact_detector.surface_y_at_point(target_x)], 1))
+        if self.scenario is not None:
+            self.sky_polys = self.scenario["sky_polys"].tolist()
+            self.ground_contact_detector.set_sky_polys(self.sky_polys)
+            self.lib.assign(self.target_point, self.scenario["target_point"])
+        else:
+            self.sky_polys = self.init_sky_polys()
+            self.ground_contact_detector.set_sky_polys(self.sky_polys)
+
+            target_x = self.lib.uniform(self.rng, (1, 1), -0.8, 0.8, self.lib.float32)
+            self.lib.assign(self.target_point, self.lib.concat([target_x, self.ground_contact_detector.surface_y_at_point(target_x)], 1))
     
         if seed is not None:
             self._set_up_rng(seed)
         state = options.get("state", None) if isinstance(options, dict) else None
+        if state is None and self.scenario is not None:
+            state = self.scenario["initial_state"]
         self.count = 1
 
         if state is None:
@@ -461,5 +499,31 @@ class lunar_lander_batched(EnvironmentBatched, LunarLander):
             | (self.lib.abs(pos_x) > 1.0)  # Out of bounds
             | (self.lib.abs(pos_y) > 1.0)  # Out of bounds
         )
+
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward for states (..., 7) and actions (..., 2) after gymnasium's LunarLander, relative to the target point.
+
+        Gymnasium rewards the change of a shaping potential between steps, which needs the previous state.
+        Here the potential itself is the reward. Fuel is charged per throttle, landing at the target gives 100
+        and a crash or leaving the screen -100.
+        """
+        pos_x, pos_y, vel_x, vel_y, angle, vel_angle, contact = self.lib.unstack(state, 7, -1)
+        throttle_main, throttle_lr = self.lib.unstack(action, 2, -1)
+        target_point = self.lib.to_tensor(self.target_point, self.lib.float32)
+
+        shaping = (
+            -100.0 * self.lib.sqrt((pos_x - target_point[0, 0]) ** 2 + (pos_y - target_point[0, 1]) ** 2)
+            - 100.0 * self.lib.sqrt(vel_x**2 + vel_y**2)
+            - 100.0 * self.lib.abs(angle)
+            + 10.0 * contact
+        )
+        fuel = 0.3 * self.lib.clip(throttle_main, 0.0, 1.0) + 0.03 * self.lib.clip(self.lib.abs(throttle_lr), 0.0, 1.0)
+        landed = self.lib.cast(lunar_lander_batched.is_done(self.lib, state, target_point), self.lib.float32)
+        crashed = self.lib.cast(self.is_truncated(state, target_point), self.lib.float32)
+        return shaping - fuel + 100.0 * landed - 100.0 * crashed
+
+    def get_terminal_mask(self, states: TensorType) -> TensorType:
+        """Landed at the target, crashed or out of bounds."""
+        return lunar_lander_batched.is_done(self.lib, states, self.target_point) | self.is_truncated(states, self.target_point)
+        
         
-        
\ No newline at end of file
@@ -34,6 +34,9 @@ import gymnasium as gym
 import matplotlib.pyplot as plt
 import numpy as np
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.scenario_bank import load_scenario
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from gymnasium import spaces
 from matplotlib.patches import Circle
 from matplotlib import use
@@ -64,9 +67,10 @@ TREAD = 0.07  # [m]
 WB = 0.25  # [m]
 
 
-class obstacle_avoidance_batched(EnvironmentBatched, gym.Env):
+class obstacle_avoidance_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, gym.Env):
     num_states = 6  # One position and velocity per dimension
     num_actions = 3  # One acceleration per dimension
+    snapshot_attributes = ("count", "target_point", "obstacle_positions", "traj_x", "traj_y", "traj_z")
     metadata = {"render_modes": ["console", "single_rgb_array", "rgb_array", "human"], "video.frames_per_second": 30, "render_fps": 30}
 
     def __init__(
@@ -102,13 +106,22 @@ class obstacle_avoidance_batched(EnvironmentBatched, gym.Env):
             -observation_high, observation_high, dtype=np.float32
         )
 
+        # Optionally read the episode's scenario from a precomputed scenario bank
+        self.scenario = load_scenario(kwargs)
+        if self.scenario is not None:
+            initial_state = list(self.scenario["initial_state"])
+            obstacle_positions = self.scenario["obstacle_positions"].tolist()
+
         if target_point is None:
             target_point = self.lib.uniform(self.rng, (NUM_DIMENSIONS,), -1.0, 1.0, self.lib.float32)
         self.target_point = self.lib.to_variable(target_point, self.lib.float32)
         self.shuffle_target_every = shuffle_target_every
-        self.num_obstacles = int(
-            float(self.lib.uniform(self.rng, (), float(2**NUM_DIMENSIONS), float(3**NUM_DIMENSIONS), self.lib.float32))
-        )
+        if self.scenario is not None:
+            self.num_obstacles = len(obstacle_positions)  # The bank holds the obstacles, nothing is drawn for them
+        else:
+            self.num_obstacles = int(
+                float(self.lib.uniform(self.rng, (), float(2**NUM_DIMENSIONS), float(3**NUM_DIMENSIONS), self.lib.float32))
+            )
         self.initial_state = initial_state
         self.dt = kwargs["dt"]
 
@@ -164,7 +177,10 @@ class obstacle_avoidance_batched(EnvironmentBatched, gym.Env):
         state = options.get("state", None) if isinstance(options, dict) else None
         self.count = 1
         
-        target_point = self.lib.uniform(self.rng, (NUM_DIMENSIONS,), -1.0, 1.0, self.lib.float32)
+        if self.scenario is not None:
+            target_point = self.scenario["target_point"]
+        else:
+            target_point = self.lib.uniform(self.rng, (NUM_DIMENSIONS,), -1.0, 1.0, self.lib.float32)
         self.lib.assign(self.target_point, target_point)
 
         if state is None:
@@ -228,6 +244,40 @@ class obstacle_avoidance_batched(EnvironmentBatched, gym.Env):
         car_in_bounds = obstacle_avoidance_batched._in_bounds(self.lib, pos_x, pos_y, pos_z)
         return ~car_in_bounds
 
+    def _in_obstacle(self, x: TensorType, y: TensorType, z: TensorType) -> TensorType:
+        if self.obstacle_positions.shape[0] == 0:
+            return self.lib.zeros_like(x) > 0.0
+        obstacles = self.obstacle_positions
+        squared_distance = (
+            (x[..., self.lib.newaxis] - obstacles[:, 0]) ** 2
+            + (y[..., self.lib.newaxis] - obstacles[:, 1]) ** 2
+            + (z[..., self.lib.newaxis] - obstacles[:, 2]) ** 2
+        )
+        return self.lib.reduce_max(self.lib.cast(squared_distance < obstacles[:, 3] ** 2, self.lib.float32), -1) > 0.0
+
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward for states (..., 6): negative distance to the target, 100 at the target, -100 out of bounds or inside an obstacle."""
+        target = self.lib.to_tensor(self.target_point, self.lib.float32)
+        pos_x, pos_y, pos_z, _, _, _ = self.lib.unstack(state, 6, -1)
+
+        in_bounds = obstacle_avoidance_batched._in_bounds(self.lib, pos_x, pos_y, pos_z)
+        at_target = obstacle_avoidance_batched._at_target(self.lib, pos_x, pos_y, pos_z, target)
+        failed = (~in_bounds) | self._in_obstacle(pos_x, pos_y, pos_z)
+        return (
+            -self.lib.sqrt((pos_x - target[0]) ** 2 + (pos_y - target[1]) ** 2 + (pos_z - target[2]) ** 2)
+            + 100.0 * self.lib.cast(in_bounds & at_target, self.lib.float32)
+            - 100.0 * self.lib.cast(failed, self.lib.float32)
+        )
+
+    def get_terminal_mask(self, states: TensorType) -> TensorType:
+        """At the target, out of bounds or inside an obstacle."""
+        pos_x, pos_y, pos_z, _, _, _ = self.lib.unstack(states, 6, -1)
+        return (
+            self.is_done(self.lib, states, self.target_point)
+            | self.is_truncated(states, self.target_point)
+            | self._in_obstacle(pos_x, pos_y, pos_z)
+        )
+
     @CompileTF
     def step_dynamics(
         self,
@@ -247,7 +297,10 @@ class obstacle_avoidance_batched(EnvironmentBatched, gym.Env):
         dict,
     ]:
         if self.count % self.shuffle_target_every == 0:
-            target_new = self.lib.uniform(self.rng, [NUM_DIMENSIONS,], -MAX_POSITION, MAX_POSITION, self.lib.float32)
+            if self.scenario is not None:
+                target_new = self.scenario["target_schedule"][self.count // self.shuffle_target_every - 1]
+            else:
+                target_new = self.sample_target()
             self.target_point.assign(target_new)
         self.count += 1
         self.state, action = self._expand_arrays(self.state, action)
@@ -264,6 +317,17 @@ class obstacle_avoidance_batched(EnvironmentBatched, gym.Env):
 
         return self.state, float(reward), terminated, truncated, {}
 
+    def sample_target(self) -> TensorType:
+        return self.lib.uniform(self.rng, [NUM_DIMENSIONS,], -MAX_POSITION, MAX_POSITION, self.lib.float32)
+
+    def get_scenario(self) -> "dict[str, np.ndarray]":
+        """Randomized parts of the current episode, as stored in a scenario bank."""
+        return {
+            "initial_state": np.reshape(self.lib.to_numpy(self.state), (-1,)),
+            "obstacle_positions": self.lib.to_numpy(self.obstacle_positions),
+            "target_point": self.lib.to_numpy(self.target_point),
+        }
+
     def render(self):
         if NUM_DIMENSIONS == 2:
             return self._render2d()
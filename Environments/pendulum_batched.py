@@ -7,12 +7,15 @@ from gymnasium import spaces
 from gymnasium.envs.classic_control.pendulum import PendulumEnv
 
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Environments.rollout import RolloutMixin
+from Environments.snapshot import SnapshotMixin
 from SI_Toolkit.computation_library import ComputationLibrary, NumpyLibrary, TensorType
 
 
-class pendulum_batched(EnvironmentBatched, PendulumEnv):
+class pendulum_batched(SnapshotMixin, RolloutMixin, EnvironmentBatched, PendulumEnv):
     num_actions = 1
     num_states = 4
+    snapshot_attributes = ("last_u",)
 
     def __init__(
         self,
@@ -60,14 +63,14 @@ class pendulum_batched(EnvironmentBatched, PendulumEnv):
         newthdot = (
             thdot
             + (3 * g / (2 * l) * self.lib.sin(th) + 3.0 / (m * l**2) * action[:, 0])
-            * self.dt
+            * dt
         )
         newthdot = self.lib.clip(
             newthdot,
             self.lib.to_tensor(-self.max_speed, self.lib.float32),
             self.lib.to_tensor(self.max_speed, self.lib.float32),
         )
-        newth = th + newthdot * self.dt
+        newth = th + newthdot * dt
 
         state = self.lib.stack(
             [newth, newthdot, self.lib.sin(newth), self.lib.cos(newth)], 1
@@ -148,4 +151,11 @@ class pendulum_batched(EnvironmentBatched, PendulumEnv):
 
     @staticmethod
     def is_done(lib: "type[ComputationLibrary]", state: TensorType):
-        return False
\ No newline at end of file
+        return False
+
+    def get_reward(self, state: TensorType, action: TensorType) -> TensorType:
+        """Reward of gymnasium's Pendulum for states (..., 4) and actions (..., 1)."""
+        th, thdot, sinth, costh = self.lib.unstack(state, 4, -1)
+        _pi = self.lib.to_tensor(self.lib.pi, self.lib.float32)
+        th_normalized = ((th + _pi) % (2 * _pi)) - _pi
+        return -(th_normalized**2 + 0.1 * thdot**2 + 0.001 * action[..., 0] ** 2)
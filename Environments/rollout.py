@@ -0,0 +1,211 @@
+import numpy as np
+import tensorflow as tf
+from SI_Toolkit.computation_library import NumpyLibrary, TensorFlowLibrary, TensorType
+from SI_Toolkit.Functions.TF.Compile import CompileTF
+
+from Environments import ENV_METADATA
+
+
+def _is_compile_safe(env_class: type) -> bool:
+    for metadata in ENV_METADATA.values():
+        if metadata["entry_point"].split(":")[-1] == env_class.__name__:
+            return metadata["compile_safe"]
+    return False
+
+
+class RolloutMixin:
+    """Adds `rollout`, which propagates a batch of states through a whole horizon of actions in one call.
+
+    With TensorFlow the horizon runs inside one compiled `tf.while_loop` writing into a preallocated TensorArray,
+    so there is no Python dispatch per step. Environments whose `step_dynamics` has Python side effects
+    (not `compile_safe` in the registry) and the other backends use a plain loop into a preallocated output.
+    `rollout_with_cost` runs the same loop but only keeps the running trajectory cost of a cost function.
+    """
+
+    def rollout(
+        self,
+        initial_states: TensorType,
+        actions: TensorType,
+        dt: "float | np.ndarray | None" = None,
+        intermediate_steps: int = 1,
+    ) -> TensorType:
+        """Roll out initial_states (B, S) under actions (B, H, A). Returns states (B, H+1, S), the first one being initial_states.
+
+        Each of the H steps is split into `intermediate_steps` calls of `step_dynamics` with dt / intermediate_steps.
+        `dt` is either one step size for all stages or an array of H stage durations.
+        """
+        dt = self.dt if dt is None else dt
+        horizon = int(self.lib.shape(actions)[1])
+        t_steps = np.broadcast_to(np.asarray(dt, dtype=np.float32), (horizon,)) / float(intermediate_steps)
+        if self.lib is TensorFlowLibrary and _is_compile_safe(type(self)):
+            return self._rollout_tf(initial_states, actions, tf.constant(t_steps), intermediate_steps)
+        return self._rollout_loop(initial_states, actions, t_steps, intermediate_steps)
+
+    def rollout_with_cost(
+        self,
+        initial_states: TensorType,
+        actions: TensorType,
+        cost_function,
+        previous_input: "TensorType | None" = None,
+        dt: "float | np.ndarray | None" = None,
+        intermediate_steps: int = 1,
+        top_k: int = 0,
+        compaction_threshold: "float | None" = None,
+    ):
+        """Like `rollout`, but return the trajectory costs (B,) of cost_function instead of the states.
+
+        The stage cost is added to a running (B,) cost as soon as each state is produced
+        (see `Control_Toolkit_ASF.Cost_Functions.discounted_cost`), so the (B, H+1, S) trajectory is never kept.
+        With top_k > 0, also return the indices (top_k,) of the cheapest rollouts and their states (top_k, H+1, S),
+        obtained by rolling out only these again.
+
+        With a compaction_threshold, a lane ends as soon as `get_terminal_mask` is true for its state: it is not simulated
+        further, but charged the stage costs of the remaining stages and the terminal cost as if it stayed in that state. Once the fraction of live lanes in the simulated
+        batch falls below compaction_threshold, the batch is reduced to the live lanes. This runs as a Python loop.
+        """
+        if not getattr(cost_function, "supports_stagewise_cost", False):
+            raise ValueError(f"Cost function {type(cost_function).__name__} cannot be evaluated stage by stage.")
+        dt = self.dt if dt is None else dt
+        horizon = int(self.lib.shape(actions)[1])
+        t_steps = np.broadcast_to(np.asarray(dt, dtype=np.float32), (horizon,)) / float(intermediate_steps)
+        stage_weights = cost_function.get_stage_weights(horizon, initial_states.dtype)
+        if previous_input is None:
+            previous_input = actions[:, 0, :]
+        if compaction_threshold is not None:
+            costs = self._rollout_with_cost_compacting(
+                initial_states, actions, previous_input, cost_function, stage_weights, t_steps, intermediate_steps, compaction_threshold
+            )
+        elif self.lib is TensorFlowLibrary and _is_compile_safe(type(self)):
+            costs = self._rollout_with_cost_tf(
+                initial_states, actions, previous_input, cost_function, stage_weights, tf.constant(t_steps), intermediate_steps
+            )
+        else:
+            costs = self._rollout_with_cost_loop(initial_states, actions, previous_input, cost_function, stage_weights, t_steps, intermediate_steps)
+        if top_k <= 0:
+            return costs
+
+        best = np.argsort(self.lib.to_numpy(costs))[:top_k]
+        best_indices = self.lib.to_tensor(best, self.lib.int32)
+        best_states = self.rollout(
+            self.lib.gather(initial_states, best_indices, 0), self.lib.gather(actions, best_indices, 0), dt, intermediate_steps
+        )
+        return costs, best_indices, best_states
+
+    def get_terminal_mask(self, states: TensorType) -> TensorType:
+        """Boolean (B,) marking states (B, S) at which a trajectory ends. Environments with terminal conditions override this."""
+        return self.lib.zeros_like(states[:, 0]) > 0.0
+
+    @CompileTF
+    def _rollout_tf(self, initial_states, actions, t_steps, intermediate_steps: int):
+        horizon = tf.shape(actions)[1]
+        actions_time_major = tf.transpose(actions, [1, 0, 2])
+        states = tf.TensorArray(initial_states.dtype, size=horizon + 1, element_shape=initial_states.shape)
+        states = states.write(0, initial_states)
+
+        def body(k, s, states):
+            a = actions_time_major[k]
+            for _ in range(intermediate_steps):
+                s = self.step_dynamics(s, a, t_steps[k])
+            return k + 1, s, states.write(k + 1, s)
+
+        _, _, states = tf.while_loop(
+            lambda k, s, states: k < horizon,
+            body,
+            (tf.constant(0), initial_states, states),
+        )
+        return tf.transpose(states.stack(), [1, 0, 2])
+
+    def _rollout_loop(self, initial_states, actions, t_steps: np.ndarray, intermediate_steps: int):
+        horizon = len(t_steps)
+        if self.lib is NumpyLibrary:
+            states = np.empty((initial_states.shape[0], horizon + 1, initial_states.shape[1]), dtype=initial_states.dtype)
+            states[:, 0, :] = initial_states
+        else:
+            states = [initial_states]
+        s = initial_states
+        for k in range(horizon):
+            a = actions[:, k, :]
+            for _ in range(intermediate_steps):
+                s = self.step_dynamics(s, a, float(t_steps[k]))
+            if self.lib is NumpyLibrary:
+                states[:, k + 1, :] = s
+            else:
+                states.append(s)
+        return states if self.lib is NumpyLibrary else self.lib.stack(states, 1)
+
+    @CompileTF
+    def _rollout_with_cost_tf(self, initial_states, actions, previous_input, cost_function, stage_weights, t_steps, intermediate_steps: int):
+        horizon = tf.shape(actions)[1]
+        actions_time_major = tf.transpose(actions, [1, 0, 2])
+        previous_inputs = tf.concat(
+            [tf.broadcast_to(previous_input, tf.shape(actions_time_major[:1])), actions_time_major[:-1]], 0
+        )
+
+        stage_weights_sum = tf.reduce_sum(stage_weights)
+
+        def body(k, s, cost):
+            a = actions_time_major[k]
+            cost = cost + cost_function.get_weighted_single_stage_cost(s, a, previous_inputs[k], stage_weights[k, 0], stage_weights_sum)
+            for _ in range(intermediate_steps):
+                s = self.step_dynamics(s, a, t_steps[k])
+            return k + 1, s, cost
+
+        _, s, cost = tf.while_loop(
+            lambda k, s, cost: k < horizon,
+            body,
+            (tf.constant(0), initial_states, tf.zeros_like(initial_states[:, 0])),
+        )
+        return cost_function.finish_trajectory_cost(cost, s, actions.shape[1])
+
+    def _rollout_with_cost_loop(self, initial_states, actions, previous_input, cost_function, stage_weights, t_steps: np.ndarray, intermediate_steps: int):
+        horizon = len(t_steps)
+        stage_weights_sum = self.lib.sum(stage_weights[:, 0], 0)
+        s = initial_states
+        cost = self.lib.zeros_like(initial_states[:, 0])
+        for k in range(horizon):
+            a = actions[:, k, :]
+            cost = cost + cost_function.get_weighted_single_stage_cost(
+                s, a, previous_input if k == 0 else actions[:, k - 1, :], stage_weights[k, 0], stage_weights_sum
+            )
+            for _ in range(intermediate_steps):
+                s = self.step_dynamics(s, a, float(t_steps[k]))
+        return cost_function.finish_trajectory_cost(cost, s, horizon)
+
+    def _rollout_with_cost_compacting(
+        self, initial_states, actions, previous_input, cost_function, stage_weights, t_steps: np.ndarray, intermediate_steps: int, compaction_threshold: float
+    ):
+        horizon = len(t_steps)
+        stage_weights_sum = self.lib.sum(stage_weights[:, 0], 0)
+        costs = np.zeros(initial_states.shape[0], dtype=np.float32)
+        lanes = np.arange(initial_states.shape[0])  # Original index of each simulated row
+        alive = np.ones(len(lanes), dtype=bool)
+        s = initial_states
+        cost = self.lib.zeros_like(initial_states[:, 0])
+        for k in range(horizon):
+            a = actions[:, k, :]
+            cost = cost + cost_function.get_weighted_single_stage_cost(
+                s, a, previous_input if k == 0 else actions[:, k - 1, :], stage_weights[k, 0], stage_weights_sum
+            )
+            for _ in range(intermediate_steps):
+                s = self.step_dynamics(s, a, float(t_steps[k]))
+
+            # Complete the cost of lanes which just ended. Their rows are simulated on until the next compaction, but ignored.
+            ended = alive & self.lib.to_numpy(self.get_terminal_mask(s)) if k < horizon - 1 else alive
+            if np.any(ended):
+                rows = self.lib.to_tensor(np.flatnonzero(ended), self.lib.int32)
+                ended_cost, ended_states, ended_actions = (self.lib.gather(x, rows, 0) for x in (cost, s, actions))
+                # An ended lane stays in its final state for the remaining stages and pays their stage costs,
+                # otherwise ending early, e.g. by crashing, would be cheaper than surviving
+                for j in range(k + 1, horizon):
+                    ended_cost = ended_cost + cost_function.get_weighted_single_stage_cost(
+                        ended_states, ended_actions[:, j, :], ended_actions[:, j - 1, :], stage_weights[j, 0], stage_weights_sum
+                    )
+                costs[lanes[ended]] = self.lib.to_numpy(cost_function.finish_trajectory_cost(ended_cost, ended_states, horizon))
+                alive &= ~ended
+            if not np.any(alive):
+                break
+            if np.mean(alive) < compaction_threshold:
+                rows = self.lib.to_tensor(np.flatnonzero(alive), self.lib.int32)
+                s, cost, actions = (self.lib.gather(x, rows, 0) for x in (s, cost, actions))
+                lanes, alive = lanes[alive], alive[alive]
+        return self.lib.to_tensor(costs, self.lib.float32)
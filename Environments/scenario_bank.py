@@ -0,0 +1,120 @@
+"""
+A scenario bank holds the randomized parts of N episodes (initial state, obstacles, terrain, target schedule)
+in a single structured .npy file. Environments memory-map it and read their scenario by episode index
+instead of regenerating it through many small RNG calls.
+
+Build a bank with `python -m Utilities.build_scenario_bank`, then set `scenario_bank: <path>` in the
+environment's entry of `config_environments.yml`.
+
+Environments which shuffle their target every `shuffle_target_every` steps read the targets from `target_schedule`.
+Every such environment sets the first target of an episode at reset and counts steps from 1,
+so entry k is the target set at step (k + 1) * shuffle_target_every.
+`check_scenario_bank` verifies that a bank covers the episodes and steps of a run before it starts.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+
+OBSTACLE_FIELD = "obstacle_positions"
+NUM_OBSTACLES_FIELD = "num_obstacles"
+TARGET_SCHEDULE_FIELD = "target_schedule"
+
+_open_banks: "dict[str, ScenarioBank]" = {}
+
+
+class ScenarioBank:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._records = np.load(path, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def fields(self) -> "tuple[str, ...]":
+        return tuple(f for f in self._records.dtype.names if f != NUM_OBSTACLES_FIELD)
+
+    @property
+    def target_schedule_length(self) -> int:
+        """Number of target shuffles stored per episode, 0 if the bank holds no target schedule."""
+        if TARGET_SCHEDULE_FIELD not in self.fields:
+            return 0
+        return self._records.dtype[TARGET_SCHEDULE_FIELD].shape[0]
+
+    def __getitem__(self, episode_index: int) -> "dict[str, np.ndarray]":
+        if not 0 <= episode_index < len(self):
+            raise IndexError(f"Scenario bank {self.path} holds {len(self)} episodes, requested episode {episode_index}.")
+        record = self._records[episode_index]
+        scenario = {name: np.array(record[name]) for name in self.fields}
+        if OBSTACLE_FIELD in scenario:
+            scenario[OBSTACLE_FIELD] = scenario[OBSTACLE_FIELD][: int(record[NUM_OBSTACLES_FIELD])]
+        return scenario
+
+
+def write_scenario_bank(path: str, scenarios: "list[dict[str, np.ndarray]]") -> None:
+    """Write a list of per-episode scenarios into one memory-mappable file.
+
+    All episodes need the same fields. Obstacle sets of different sizes are padded to the largest one.
+    """
+    fields = list(scenarios[0].keys())
+    max_num_obstacles = max(len(s[OBSTACLE_FIELD]) for s in scenarios) if OBSTACLE_FIELD in fields else 0
+
+    dtype = []
+    for name in fields:
+        shape = np.shape(scenarios[0][name])
+        if name == OBSTACLE_FIELD:
+            shape = (max_num_obstacles,) + shape[1:]
+            dtype.append((NUM_OBSTACLES_FIELD, np.int32))
+        dtype.append((name, np.float32, shape))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    records = np.lib.format.open_memmap(path, mode="w+", dtype=np.dtype(dtype), shape=(len(scenarios),))
+    for i, scenario in enumerate(scenarios):
+        for name in fields:
+            value = np.asarray(scenario[name], dtype=np.float32)
+            if name == OBSTACLE_FIELD:
+                records[NUM_OBSTACLES_FIELD][i] = len(value)
+                records[name][i, : len(value)] = value
+            else:
+                records[name][i] = value
+    records.flush()
+    del records
+
+
+def get_target_schedule_length(num_iterations: int, shuffle_target_every: int) -> int:
+    """Number of target shuffles in an episode of num_iterations steps."""
+    return num_iterations // shuffle_target_every
+
+
+def _open_bank(path: str) -> ScenarioBank:
+    if path not in _open_banks:
+        _open_banks[path] = ScenarioBank(path)
+    return _open_banks[path]
+
+
+def check_scenario_bank(config_environment: dict, num_episodes: int, num_iterations: int) -> None:
+    """Raise a ValueError if the configured scenario bank holds fewer episodes or target shuffles than the run needs."""
+    path = config_environment.get("scenario_bank", None)
+    if path is None:
+        return
+    bank = _open_bank(path)
+    if len(bank) < num_episodes:
+        raise ValueError(f"Scenario bank {path} holds {len(bank)} episodes, the run needs {num_episodes}. Rebuild it.")
+    shuffle_target_every = config_environment.get("shuffle_target_every", None)
+    if TARGET_SCHEDULE_FIELD in bank.fields and shuffle_target_every is not None:
+        required = get_target_schedule_length(num_iterations, shuffle_target_every)
+        if bank.target_schedule_length < required:
+            raise ValueError(
+                f"Scenario bank {path} holds {bank.target_schedule_length} target shuffles per episode, "
+                f"but {num_iterations} iterations with shuffle_target_every={shuffle_target_every} need {required}. "
+                f"Rebuild it with num_iterations >= {num_iterations}."
+            )
+
+
+def load_scenario(config: dict) -> "Optional[dict[str, np.ndarray]]":
+    """Return the scenario for the episode in `config`, or None if no scenario bank is configured."""
+    path = config.get("scenario_bank", None)
+    if path is None:
+        return None
+    return _open_bank(path)[int(config.get("episode_index", 0))]
@@ -0,0 +1,90 @@
+import copy
+from typing import Any
+
+import numpy as np
+from numpy.random import Generator
+
+
+def get_rng_state(rng) -> Any:
+    """Return a picklable copy of the state of a numpy, tensorflow or torch random generator."""
+    if isinstance(rng, Generator):
+        return copy.deepcopy(rng.bit_generator.state)
+    if hasattr(rng, "get_state"):  # torch.Generator
+        return np.array(rng.get_state(), copy=True)
+    if hasattr(rng, "reset"):  # tf.random.Generator
+        return np.array(rng.state, copy=True)
+    raise TypeError(f"Cannot read the state of random generator of type {type(rng)}.")
+
+
+def set_rng_state(rng, state: Any) -> None:
+    """Restore a random generator to a state returned by `get_rng_state`."""
+    if isinstance(rng, Generator):
+        rng.bit_generator.state = copy.deepcopy(state)
+    elif hasattr(rng, "get_state"):  # torch.Generator
+        import torch
+
+        rng.set_state(torch.from_numpy(np.array(state, dtype=np.uint8)))
+    elif hasattr(rng, "reset"):  # tf.random.Generator
+        rng.reset(state)
+    else:
+        raise TypeError(f"Cannot set the state of random generator of type {type(rng)}.")
+
+
+def _copy_value(value: Any) -> Any:
+    # Convert tensors and variables of any backend to numpy so that the snapshot can be pickled
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple, dict)):
+        return copy.deepcopy(value)
+    if hasattr(value, "detach"):  # torch.Tensor
+        value = value.detach().cpu()
+    return np.array(value, copy=True)
+
+
+class SnapshotMixin:
+    """Adds `get_snapshot` / `restore_snapshot` to batched environments.
+
+    A snapshot holds the current state, the state of the environment's random generator and every attribute
+    listed in `snapshot_attributes`. It is a plain dict of numpy arrays and python values, so it can be pickled
+    and sent to other processes. Restoring it lets an episode be branched from any step without replaying the prefix.
+
+    Attributes which are backend variables (e.g. `target_point`) are assigned in place, so that references
+    held in `environment_attributes` and by the controller stay valid. Other tensors are restored as tensors
+    of the environment's computation library with their previous dtype.
+    """
+
+    snapshot_attributes: "tuple[str, ...]" = ()
+
+    def get_snapshot(self) -> dict:
+        state = getattr(self, "state", None)
+        snapshot = {
+            "state": _copy_value(state),
+            "state_is_numpy": isinstance(state, np.ndarray),
+            "rng": get_rng_state(self.rng),
+            "attributes": {
+                name: _copy_value(getattr(self, name, None))
+                for name in self.snapshot_attributes
+            },
+        }
+        return snapshot
+
+    def restore_snapshot(self, snapshot: dict) -> None:
+        set_rng_state(self.rng, snapshot["rng"])
+
+        for name, value in snapshot["attributes"].items():
+            current = getattr(self, name, None)
+            if hasattr(current, "assign"):  # tf.Variable
+                current.assign(value)
+            elif isinstance(current, np.ndarray) and isinstance(value, np.ndarray) and current.shape == value.shape:
+                current[...] = value
+            elif not isinstance(current, np.ndarray) and hasattr(current, "dtype") and isinstance(value, np.ndarray):
+                setattr(self, name, self.lib.to_tensor(value, current.dtype))  # torch or TensorFlow tensor, stored as numpy
+            else:
+                setattr(self, name, copy.deepcopy(value))
+
+        state = snapshot["state"]
+        if snapshot["state_is_numpy"]:
+            state = np.array(state, copy=True)
+        elif state is not None:
+            state = self.lib.to_tensor(state, self.lib.float32)
+        self.state = state
@@ -0,0 +1,316 @@
+"""
+Freeze a trained neural predictor into an inference artifact for rollouts on CPU.
+
+The network is wrapped together with its normalization (the NI_*.csv of the model, corrected by
+`user_defined_normalization_correction`, with the normalization type the network was trained with), so the artifact
+maps raw inputs to raw outputs. The states of recurrent layers are explicit inputs `state_<k>` and outputs, next to
+`net_input` and `net_output`, so an exported GRU keeps its memory between calls like the stateful Keras network.
+Two formats are written:
+    - a SavedModel with one concrete, XLA-compiled (jit_compile) function with a fixed input signature
+    - TFLite models, one per entry of `tflite_quantizations` ("none", "float16" or "int8" weights)
+Ahead-of-time XLA compilation (tfcompile) needs a TensorFlow source build, so the SavedModel is JIT-compiled on first call.
+The names of the network inputs and outputs and the sizes of the recurrent states are written to features.yml.
+
+`load_exported_predictor` returns an `exported_predictor` with the predictor interface `predict(initial_state, Q)` and
+`update(Q0, s)`, for every format. A report compares accuracy and latency of every artifact against the Keras model
+and is saved next to the artifacts.
+
+Usage:
+    python -m SI_Toolkit_ASF.export_predictor
+"""
+# Specify the predictor to export. Leave as None to use neural_default from config_predictors.yml
+model_name = None
+path_to_models = None
+tflite_quantizations = ["none", "float16", "int8"]
+report_batch_sizes = [1, 32, 1024]
+report_num_repeats = 50
+time_series_length = 1  # Length of the input sequence the exported function accepts
+
+### ------------------------------------------------------------------------------------ ###
+import os
+import time
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+import numpy as np
+import tensorflow as tf
+import yaml
+from SI_Toolkit.Functions.General.Initialization import get_net, get_norm_info_for_net
+
+from SI_Toolkit_ASF.user_defined_normalization_correction import apply_user_defined_normalization_correction
+from Utilities.utils import get_logger
+
+logger = get_logger(__name__)
+
+EXPORT_FOLDER = "Exported"
+FEATURES_FILE = "features.yml"
+
+config_training = yaml.load(open(os.path.join("SI_Toolkit_ASF", "config_training.yml")), Loader=yaml.FullLoader)
+
+
+def get_normalization_type(net_info) -> Optional[str]:
+    """Normalization the network was trained with: None, "minmax_sym", "minmax_pos" or "gaussian".
+
+    Taken from the network config, falling back to config_training.yml and SI_Toolkit's default minmax_sym.
+    """
+    if not getattr(net_info, "normalize", config_training["training_default"]["NORMALIZE"]):
+        return None
+    return getattr(net_info, "normalization_type", "minmax_sym")
+
+
+def get_normalization_arrays(normalization_info, features: "list[str]", normalization_type: Optional[str]) -> "tuple[np.ndarray, np.ndarray]":
+    """Offset and scale such that x_normalized = (x - offset) / scale."""
+    normalization_info = apply_user_defined_normalization_correction(normalization_info.copy())
+
+    def row(statistic: str) -> np.ndarray:
+        return np.array([normalization_info.loc[statistic, f] for f in features], dtype=np.float32)
+
+    if normalization_type is None:
+        offset, scale = np.zeros(len(features), dtype=np.float32), np.ones(len(features), dtype=np.float32)
+    elif normalization_type == "minmax_sym":  # To [-1, 1]
+        offset, scale = 0.5 * (row("max") + row("min")), 0.5 * (row("max") - row("min"))
+    elif normalization_type == "minmax_pos":  # To [0, 1]
+        offset, scale = row("min"), row("max") - row("min")
+    elif normalization_type == "gaussian":
+        offset, scale = row("mean"), row("std")
+    else:
+        raise ValueError(f"Unknown normalization type {normalization_type}. Use minmax_sym, minmax_pos or gaussian.")
+    return offset, np.maximum(scale, 1e-8).astype(np.float32)
+
+
+class frozen_predictor(tf.Module):
+    """Network with normalization of inputs and denormalization of outputs baked in, and explicit recurrent states."""
+
+    def __init__(self, net: tf.keras.Model, net_info, normalization_info):
+        super().__init__()
+        self.net = net
+        self.num_inputs = len(net_info.inputs)
+        normalization_type = get_normalization_type(net_info)
+        self.input_offset, self.input_scale = map(tf.constant, get_normalization_arrays(normalization_info, net_info.inputs, normalization_type))
+        self.output_offset, self.output_scale = map(tf.constant, get_normalization_arrays(normalization_info, net_info.outputs, normalization_type))
+
+        # The trained cells, run from a given initial state and returning their final state
+        self.recurrent_layers = {
+            layer.name: tf.keras.layers.RNN(layer.cell, return_sequences=layer.return_sequences, return_state=True)
+            for layer in net.layers
+            if isinstance(layer, tf.keras.layers.RNN)
+        }
+        self.state_sizes = [
+            int(size) for layer in net.layers if layer.name in self.recurrent_layers for size in tf.nest.flatten(layer.cell.state_size)
+        ]
+
+    def predict(self, net_input, states):
+        """Raw outputs (B, T, outputs) and the recurrent states after the sequence, starting from states."""
+        x = (net_input - self.input_offset) / self.input_scale
+        states = list(states)
+        new_states = []
+        for layer in self.net.layers:
+            if layer.name in self.recurrent_layers:
+                num_states = len(tf.nest.flatten(layer.cell.state_size))
+                x, *layer_states = self.recurrent_layers[layer.name](x, initial_state=states[:num_states], training=False)
+                states = states[num_states:]
+                new_states.extend(layer_states)
+            else:
+                x = layer(x, training=False)
+        return x * self.output_scale + self.output_offset, new_states
+
+
+def get_serving_function(predictor: frozen_predictor, batch_size: Optional[int], jit_compile: bool):
+    input_signature = [tf.TensorSpec([batch_size, time_series_length, predictor.num_inputs], tf.float32, name="net_input")] + [
+        tf.TensorSpec([batch_size, size], tf.float32, name=f"state_{k}") for k, size in enumerate(predictor.state_sizes)
+    ]
+
+    def serve(net_input, *states):
+        net_output, new_states = predictor.predict(net_input, states)
+        return {"net_output": net_output, **{f"state_{k}": s for k, s in enumerate(new_states)}}
+
+    return tf.function(serve, input_signature=input_signature, jit_compile=jit_compile)
+
+
+def export_saved_model(predictor: frozen_predictor, path: str):
+    predictor.serve = get_serving_function(predictor, None, jit_compile=True)
+    tf.saved_model.save(predictor, path, signatures={"serving_default": predictor.serve.get_concrete_function()})
+
+
+def export_tflite(predictor: frozen_predictor, path: str, quantization: str, representative_inputs: np.ndarray):
+    concrete_function = get_serving_function(predictor, 1, jit_compile=False).get_concrete_function()
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete_function], predictor)
+    # Recurrent layers may need TF kernels which are not TFLite builtins
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: (
+            [x[np.newaxis]] + [np.zeros((1, size), dtype=np.float32) for size in predictor.state_sizes] for x in representative_inputs
+        )
+    elif quantization != "none":
+        raise ValueError(f"Unknown quantization {quantization}. Use none, float16 or int8.")
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def export_features(net_info, predictor: frozen_predictor, path: str):
+    features = {
+        "inputs": list(net_info.inputs),
+        "outputs": list(net_info.outputs),
+        "state_sizes": predictor.state_sizes,
+        "time_series_length": time_series_length,
+    }
+    with open(path, "w") as f:
+        yaml.dump(features, f)
+
+
+def load_exported_function(path: str) -> Callable:
+    """Exported artifact as a function (net_input (B, T, inputs), states) -> (net_output (B, T, outputs), states), in numpy."""
+    if path.endswith(".tflite"):
+        # The signature runner resizes the inputs when the batch size changes
+        run = tf.lite.Interpreter(model_path=path, num_threads=os.cpu_count()).get_signature_runner()
+    else:
+        serve = tf.saved_model.load(path).signatures["serving_default"]
+        run = lambda **inputs: {name: value.numpy() for name, value in serve(**{k: tf.convert_to_tensor(v) for k, v in inputs.items()}).items()}
+
+    def call(net_input, states):
+        inputs = {"net_input": np.asarray(net_input, dtype=np.float32)}
+        inputs.update({f"state_{k}": np.asarray(s, dtype=np.float32) for k, s in enumerate(states)})
+        outputs = run(**inputs)
+        return outputs["net_output"], [outputs[f"state_{k}"] for k in range(len(states))]
+
+    return call
+
+
+class exported_predictor:
+    """Exported network with the predictor interface `predict(initial_state, Q)` and `update(Q0, s)`.
+
+    Network inputs named in state_names are taken from the state, the others from the control inputs Q, in order.
+    Network outputs named in state_names are the next values of these states, the other states are kept.
+    `update` advances the recurrent state by one step from the measured state, as the stateful Keras network does
+    with `update_before_predicting`. `predict` rolls out a horizon from this recurrent state without changing it.
+    """
+
+    def __init__(self, path: str, state_names: "list[str]"):
+        self.function = load_exported_function(path)
+        with open(os.path.join(os.path.dirname(os.path.normpath(path)), FEATURES_FILE), "r") as f:
+            features = yaml.load(f, Loader=yaml.FullLoader)
+        self.state_sizes = features["state_sizes"]
+        control_inputs = [name for name in features["inputs"] if name not in state_names]
+        # (True, state index) or (False, control input index) for every network input
+        self.input_sources = [
+            (True, state_names.index(name)) if name in state_names else (False, control_inputs.index(name)) for name in features["inputs"]
+        ]
+        self.output_targets = [(k, state_names.index(name)) for k, name in enumerate(features["outputs"]) if name in state_names]
+        self.recurrent_states = self.get_initial_states(1)
+
+    def get_initial_states(self, batch_size: int) -> "list[np.ndarray]":
+        return [np.zeros((batch_size, size), dtype=np.float32) for size in self.state_sizes]
+
+    def reset(self):
+        self.recurrent_states = self.get_initial_states(1)
+
+    def _get_net_input(self, s: np.ndarray, q: np.ndarray) -> np.ndarray:
+        columns = [s[:, index] if from_state else q[:, index] for from_state, index in self.input_sources]
+        return np.stack(columns, -1)[:, np.newaxis, :]
+
+    def _step(self, s: np.ndarray, q: np.ndarray, recurrent_states: "list[np.ndarray]"):
+        net_output, recurrent_states = self.function(self._get_net_input(s, q), recurrent_states)
+        s = s.copy()
+        for output_index, state_index in self.output_targets:
+            s[:, state_index] = net_output[:, -1, output_index]
+        return s, recurrent_states
+
+    def predict(self, initial_state, Q) -> np.ndarray:
+        """Predicted states (B, H+1, S) from initial_state (B, S) or (S,) under control inputs Q (B, H, A)."""
+        Q = np.asarray(Q, dtype=np.float32)
+        batch_size, horizon = Q.shape[:2]
+        s = np.array(np.broadcast_to(np.asarray(initial_state, dtype=np.float32), (batch_size, np.shape(initial_state)[-1])))
+        recurrent_states = [np.array(np.broadcast_to(state, (batch_size, state.shape[-1]))) for state in self.recurrent_states]
+        output = np.empty((batch_size, horizon + 1, s.shape[-1]), dtype=np.float32)
+        output[:, 0, :] = s
+        for k in range(horizon):
+            s, recurrent_states = self._step(s, Q[:, k, :], recurrent_states)
+            output[:, k + 1, :] = s
+        return output
+
+    def update(self, Q0, s):
+        """Advance the recurrent state by the measured state s (S,) under the applied control input Q0 (A,)."""
+        s = np.asarray(s, dtype=np.float32).reshape(1, -1)
+        q = np.asarray(Q0, dtype=np.float32).reshape(1, -1)
+        _, self.recurrent_states = self._step(s, q, self.recurrent_states)
+
+
+def load_exported_predictor(path: str, state_names: "list[str]") -> exported_predictor:
+    """Load an exported artifact (SavedModel folder or .tflite file) as a predictor of the states named state_names."""
+    return exported_predictor(path, state_names)
+
+
+def measure(predict: Callable, inputs: np.ndarray, reference: np.ndarray) -> dict:
+    np.asarray(predict(inputs))  # Warm-up, includes compilation
+    durations = []
+    for _ in range(report_num_repeats):
+        start = time.perf_counter()
+        outputs = np.asarray(predict(inputs))
+        durations.append(time.perf_counter() - start)
+    error = outputs - reference
+    return {
+        "max_abs_error": float(np.max(np.abs(error))),
+        "rmse": float(np.sqrt(np.mean(error**2))),
+        "median_latency_ms": 1e3 * float(np.median(durations)),
+    }
+
+
+def sample_inputs(net_info, normalization_info, batch_size: int, rng: np.random.Generator) -> np.ndarray:
+    # Uniform over the range of the data, whatever the normalization of the network
+    offset, scale = get_normalization_arrays(normalization_info, net_info.inputs, "minmax_sym")
+    return (offset + scale * rng.uniform(-1.0, 1.0, (batch_size, time_series_length, len(offset)))).astype(np.float32)
+
+
+if __name__ == "__main__":
+    config_predictors = yaml.load(open(os.path.join("SI_Toolkit_ASF", "config_predictors.yml")), Loader=yaml.FullLoader)
+    model_name = model_name or config_predictors["predictors"]["neural_default"]["model_name"]
+    path_to_models = path_to_models or config_predictors["predictors"]["neural_default"]["path_to_model"]
+
+    a = SimpleNamespace(path_to_models=path_to_models, net_name=model_name)
+    net, net_info = get_net(a, time_series_length=time_series_length, batch_size=None, stateful=False)
+    normalization_info = get_norm_info_for_net(net_info)
+    predictor = frozen_predictor(net, net_info, normalization_info)
+
+    export_path = os.path.join(path_to_models, model_name, EXPORT_FOLDER)
+    os.makedirs(export_path, exist_ok=True)
+    export_features(net_info, predictor, os.path.join(export_path, FEATURES_FILE))
+    rng = np.random.default_rng(0)
+
+    artifacts = {"saved_model": os.path.join(export_path, "saved_model")}
+    export_saved_model(predictor, artifacts["saved_model"])
+    representative_inputs = sample_inputs(net_info, normalization_info, 200, rng)
+    for quantization in tflite_quantizations:
+        artifacts[f"tflite_{quantization}"] = os.path.join(export_path, f"{model_name}_{quantization}.tflite")
+        export_tflite(predictor, artifacts[f"tflite_{quantization}"], quantization, representative_inputs)
+    logger.info(f"Exported {model_name} to {export_path}")
+
+    # Compare two consecutive calls, so that the recurrent states are passed on as in a rollout
+    report = {"model_name": model_name, "artifacts": artifacts, "results": {}}
+    for batch_size in report_batch_sizes:
+        inputs = sample_inputs(net_info, normalization_info, batch_size, rng)
+        initial_states = [np.zeros((batch_size, size), dtype=np.float32) for size in predictor.state_sizes]
+
+        def two_steps(function: Callable) -> Callable:
+            def call(net_input):
+                _, states = function(net_input, initial_states)
+                return function(net_input, states)[0]
+            return call
+
+        reference_predict = two_steps(tf.function(predictor.predict))
+        reference = np.asarray(reference_predict(inputs))
+        results = {"keras": measure(reference_predict, inputs, reference)}
+        for name, path in artifacts.items():
+            results[name] = measure(two_steps(load_exported_function(path)), inputs, reference)
+        report["results"][f"batch_size={batch_size}"] = results
+        for name, r in results.items():
+            logger.info(
+                f"batch={batch_size} {name}: {r['median_latency_ms']:.3f} ms, "
+                f"max abs error {r['max_abs_error']:.2e}, rmse {r['rmse']:.2e}"
+            )
+
+    with open(os.path.join(export_path, "export_report.yml"), "w") as f:
+        yaml.dump(report, f)
@@ -1,27 +1,32 @@
-from importlib import import_module
 from typing import Callable
 
 import numpy as np
-from Environments import ENV_REGISTRY, register_envs
+import tensorflow as tf
+from Environments import get_env_class, get_env_metadata, register_envs
 from Control_Toolkit.others.environment import EnvironmentBatched
-from SI_Toolkit.computation_library import NumpyLibrary, TensorType
+from SI_Toolkit.computation_library import NumpyLibrary, TensorFlowLibrary, TensorType
+from SI_Toolkit.Functions.TF.Compile import CompileTF
 
 from Utilities.utils import CurrentRunMemory, SeedMemory
 
 
-environment_module = (
-    ENV_REGISTRY[CurrentRunMemory.current_environment_name]
-    .split(":")[0]
-    .split(".")[-1]
-)
-Environment: "type[EnvironmentBatched]" = getattr(
-    import_module(f"Environments.{environment_module}"), environment_module
-)
+# State and action sizes come from the registry metadata, so importing this module does not import the environment
+environment_metadata = get_env_metadata(CurrentRunMemory.current_environment_name)
 
 
-STATE_VARIABLES = np.array([f"x_{i}" for i in range(1, Environment.num_states)])
+def __getattr__(name: str):
+    # The environment class is only imported when `Environment` is first accessed
+    if name == "Environment":
+        Environment: "type[EnvironmentBatched]" = get_env_class(CurrentRunMemory.current_environment_name)
+        globals()["Environment"] = Environment
+        return Environment
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Named like the state columns of the recordings (see Utilities.csv_helpers.save_to_csv)
+STATE_VARIABLES = np.array([f"x_{i}" for i in range(environment_metadata["num_states"])])
 STATE_INDICES = {x: np.where(STATE_VARIABLES == x)[0][0] for x in STATE_VARIABLES}
-CONTROL_INPUTS = np.array([f"u_{i}" for i in range(Environment.num_actions)])
+CONTROL_INPUTS = np.array([f"u_{i}" for i in range(environment_metadata["num_actions"])])
 CONTROL_INDICES = {x: np.where(CONTROL_INPUTS == x)[0][0] for x in CONTROL_INPUTS}
 
 
@@ -29,19 +34,148 @@ register_envs()
 
 
 class next_state_predictor_ODE:
-    def __init__(self, dt: float, intermediate_steps: int, batch_size: int, **kwargs):
+    """Propagates states with the environment's `step_dynamics`, splitting each step of `dt` into substeps.
+
+    With TensorFlow and a compile-safe environment the substep loop is fused into one compiled call.
+
+    Set `adaptive: true` in the predictor config to choose the substep size by error control instead of
+    using `intermediate_steps` fixed substeps. The environments expose discrete update maps, not derivatives,
+    so the error is estimated by step doubling: a substep of size h is compared with two substeps of size h/2.
+    The pair plays the role of an embedded RK pair. The step size is shared by the batch and adapts between
+    `dt / max_substeps` and `dt`, starting from `dt / intermediate_steps`. Adaptive mode needs TensorFlow.
+
+    `predict_horizon` predicts a whole horizon with the environment's `rollout` (one compiled loop with TensorFlow).
+    The toolkit's ODE predictor calls `step` once per stage instead, `use_whole_horizon_rollout` makes it use
+    `predict_horizon`; main.py does so for every controller.
+
+    Set `fine_horizon: k` for a multi-fidelity horizon: the first k stages span `dt`, later stages grow by `dt_growth`
+    per stage up to `max_dt_multiplier * dt`. The stage durations are published in `CurrentRunMemory.stage_durations`
+    so that cost functions can weight stages by their time span. This needs whole-horizon prediction:
+    `step` advances by `dt` only and raises if `fine_horizon` is set.
+    """
+
+    def __init__(
+        self,
+        dt: float,
+        intermediate_steps: int,
+        batch_size: int,
+        adaptive: bool = False,
+        tolerance: float = 1e-3,
+        max_substeps: int = 32,
+        fine_horizon: "int | None" = None,
+        dt_growth: float = 1.5,
+        max_dt_multiplier: float = 4.0,
+        **kwargs,
+    ):
         self.s = None
 
         self.step_fun = CurrentRunMemory.current_environment.step_dynamics
+        # Whole-horizon rollout of the environment, if it has one (see Environments.rollout.RolloutMixin)
+        self.rollout_fun = getattr(CurrentRunMemory.current_environment.unwrapped, "rollout", None)
+        self.lib = CurrentRunMemory.current_environment.lib
 
+        self.dt = dt
         self.intermediate_steps = intermediate_steps
         self.t_step = dt / float(self.intermediate_steps)
 
+        self.adaptive = adaptive
+        if self.adaptive and self.lib is not TensorFlowLibrary:
+            raise ValueError("Adaptive substepping is only implemented for TensorFlowLibrary.")
+        self.tolerance = tolerance
+        self.min_t_step = dt / float(max_substeps)
+
+        self.fine_horizon = fine_horizon
+        self.dt_growth = dt_growth
+        self.max_dt_multiplier = max_dt_multiplier
+        if self.fine_horizon is not None and not self.can_predict_horizon:
+            raise ValueError("A multi-fidelity horizon needs an environment with rollout and fixed substeps.")
+
+        step = self._step_adaptive if self.adaptive else self._step_fixed
+        if self.lib is TensorFlowLibrary and environment_metadata["compile_safe"]:
+            step = CompileTF(step)
+        self._step = step
+
+    @property
+    def can_predict_horizon(self) -> bool:
+        return self.rollout_fun is not None and not self.adaptive
+
     def step(self, s, Q):
+        if self.fine_horizon is not None:
+            raise ValueError(
+                "fine_horizon is set, but the predictor is called stage by stage, which would run a uniform dt horizon. "
+                "Predict whole horizons with predict_horizon, see use_whole_horizon_rollout."
+            )
+        return self._step(s, Q)
+
+    def _step_fixed(self, s, Q):
         for _ in range(self.intermediate_steps):
-            next_state = self.step_fun(s, Q, self.t_step)
-            s = next_state
-        return next_state
+            s = self.step_fun(s, Q, self.t_step)
+        return s
+
+    def _step_adaptive(self, s, Q):
+        dt = tf.constant(self.dt, tf.float32)
+        t = tf.constant(0.0, tf.float32)
+        h = tf.constant(self.t_step, tf.float32)
+        while t < dt * (1.0 - 1e-6):
+            h = tf.minimum(h, dt - t)
+            s_full = self.step_fun(s, Q, h)
+            s_half = self.step_fun(self.step_fun(s, Q, 0.5 * h), Q, 0.5 * h)
+            # Mixed absolute / relative error of the coarse step, normalized such that 1.0 is the tolerance
+            error = tf.reduce_max(tf.abs(s_half - s_full) / (self.tolerance * (1.0 + tf.abs(s_half))))
+            accept = tf.logical_or(error <= 1.0, h <= self.min_t_step)
+            s = tf.cond(accept, lambda: s_half, lambda: s)
+            t = tf.cond(accept, lambda: t + h, lambda: t)
+            # Local error of the substeps is O(h^2), hence the square root
+            factor = tf.clip_by_value(0.9 * tf.math.rsqrt(tf.maximum(error, 1e-12)), 0.2, 2.0)
+            h = tf.maximum(h * factor, self.min_t_step)
+        return s
+
+    def get_stage_durations(self, horizon: int) -> np.ndarray:
+        """Time span of each of the `horizon` stages."""
+        if self.fine_horizon is None:
+            return np.full(horizon, self.dt, dtype=np.float32)
+        num_coarse = max(horizon - self.fine_horizon, 0)
+        multipliers = np.minimum(self.dt_growth ** np.arange(1, num_coarse + 1), self.max_dt_multiplier)
+        return self.dt * np.concatenate([np.ones(horizon - num_coarse), multipliers]).astype(np.float32)
+
+    def predict_horizon(self, s, Q):
+        """Predict states (B, H+1, S) from initial states s (B, S) and inputs Q (B, H, A) in a single call."""
+        horizon = int(self.lib.shape(Q)[1])
+        stage_durations = self.get_stage_durations(horizon)
+        CurrentRunMemory.stage_durations = stage_durations
+        if self.can_predict_horizon:
+            return self.rollout_fun(s, Q, stage_durations, self.intermediate_steps)
+        states = [s]
+        for k in range(horizon):
+            states.append(self._step(states[-1], Q[:, k, :]))
+        return self.lib.stack(states, 1)
+
+    def predict_horizon_with_cost(self, s, Q, cost_function, previous_input=None, top_k: int = 0, compaction_threshold: "float | None" = None):
+        """Trajectory costs (B,) of cost_function for initial states s (B, S) and inputs Q (B, H, A), without keeping the states.
+
+        Opt-in alternative to `predict_horizon` followed by `get_trajectory_cost`, see `RolloutMixin.rollout_with_cost`.
+        """
+        if not self.can_predict_horizon:
+            raise ValueError("Stagewise cost needs an environment with rollout and fixed substeps.")
+        stage_durations = self.get_stage_durations(int(self.lib.shape(Q)[1]))
+        CurrentRunMemory.stage_durations = stage_durations
+        rollout_with_cost = CurrentRunMemory.current_environment.unwrapped.rollout_with_cost
+        return rollout_with_cost(s, Q, cost_function, previous_input, stage_durations, self.intermediate_steps, top_k, compaction_threshold)
+
+
+def use_whole_horizon_rollout(controller) -> bool:
+    """Make the ODE predictor of a configured controller predict whole horizons with `next_state_predictor_ODE.predict_horizon`.
+
+    Replaces `predict_tf` of the toolkit's predictor, which otherwise loops over `step`. Returns False and leaves the
+    controller unchanged if it has no such predictor or the predictor cannot roll out whole horizons.
+    """
+    wrapper = getattr(getattr(controller, "optimizer", None), "predictor", None)
+    predictor = getattr(wrapper, "predictor", None)
+    next_step_predictor = getattr(predictor, "next_step_predictor", None)
+    if not isinstance(next_step_predictor, next_state_predictor_ODE) or not next_step_predictor.can_predict_horizon:
+        return False
+    predictor.predict_tf = next_step_predictor.predict_horizon
+    return True
 
 
 def augment_predictor_output(output_array, net_info):
@@ -1,7 +1,11 @@
+import re
+
+import numpy as np
 import tensorflow as tf
 from SI_Toolkit.Functions.TF.Compile import CompileTF
 
 from SI_Toolkit_ASF.predictors_customization import (STATE_INDICES, STATE_VARIABLES, next_state_predictor_ODE)
+from Utilities.utils import CurrentRunMemory
 
 STATE_INDICES_TF = tf.lookup.StaticHashTable(  # TF style dictionary
     initializer=tf.lookup.KeyValueTensorInitializer(
@@ -13,21 +17,162 @@ STATE_INDICES_TF = tf.lookup.StaticHashTable(  # TF style dictionary
 )
 
 
+# Derived state variables which a neural predictor does not output but which can be computed from its outputs.
+# Per environment: {state variable: expression}, with the state named by its column in the recordings (x_0, x_1, ...).
+# An expression is one of
+#   "<var>", "sin(<var>)", "cos(<var>)", "<a> + <b>", "<a> - <b>", "<a> * <b>"
+# where <var> is a network output and <a>, <b> are network outputs or numeric constants.
+FEATURE_AUGMENTATION = {
+    "Pendulum-v0": {"x_2": "sin(x_0)", "x_3": "cos(x_0)"},  # [th, thdot, sin(th), cos(th)]
+    "CartPoleSimulator-v0": {"x_2": "cos(x_0)", "x_3": "sin(x_0)"},  # [angle, angleD, cos(angle), sin(angle), ...]
+}
+
+_UNARY_EXPRESSION = re.compile(r"^(sin|cos)\((\w+)\)$")
+_BINARY_EXPRESSION = re.compile(r"^(\S+?)\s*([-+*])\s*(\S+)$")
+_UNARY_FUNCTIONS = {"sin": tf.math.sin, "cos": tf.math.cos, "id": tf.identity}
+_BINARY_FUNCTIONS = {"+": tf.math.add, "-": tf.math.subtract, "*": tf.math.multiply}
+
+
 next_state_predictor_ODE_tf = next_state_predictor_ODE
 
 
+class next_state_predictor_LTV:
+    """Linear time-varying model of `step_dynamics` along a nominal trajectory.
+
+    The nominal trajectory starts at the first initial state of the batch and follows the batch mean of the inputs.
+    It is rolled out once with the nonlinear dynamics and linearized at every stage with batched automatic Jacobians,
+    x_{k+1} - xn_{k+1} = A_k (x_k - xn_k) + B_k (u_k - un_k). All rollouts of the batch are then propagated
+    through the cached (A_k, B_k) with batched matmuls.
+    The nominal trajectory is only recomputed when the initial state or mean inputs drift further than
+    `refresh_tolerance` from the cached ones, or when the horizon changes.
+    """
+
+    def __init__(self, dt: float, intermediate_steps: int, batch_size: int, refresh_tolerance: float = 1e-2, **kwargs):
+        self.ode = next_state_predictor_ODE(dt, intermediate_steps, batch_size)
+        self.refresh_tolerance = refresh_tolerance
+
+        self.initialized = tf.Variable(False)
+        self.x_nominal = tf.Variable(tf.zeros([0, 0]), shape=tf.TensorShape(None))
+        self.u_nominal = tf.Variable(tf.zeros([0, 0]), shape=tf.TensorShape(None))
+        self.A = tf.Variable(tf.zeros([0, 0, 0]), shape=tf.TensorShape(None))
+        self.B = tf.Variable(tf.zeros([0, 0, 0]), shape=tf.TensorShape(None))
+
+    def step(self, s, Q):
+        return self.ode.step(s, Q)
+
+    def _refresh(self, x0, u_nominal):
+        x_nominal = self.ode.predict_horizon(x0[tf.newaxis, :], u_nominal[tf.newaxis, :, :])[0]
+        x = x_nominal[:-1]
+        with tf.GradientTape(persistent=True) as tape:
+            tape.watch(x)
+            tape.watch(u_nominal)
+            x_next = self.ode.step(x, u_nominal)
+        self.A.assign(tape.batch_jacobian(x_next, x))
+        self.B.assign(tape.batch_jacobian(x_next, u_nominal))
+        self.x_nominal.assign(x_nominal)
+        self.u_nominal.assign(u_nominal)
+        self.initialized.assign(True)
+        return tf.constant(True)
+
+    def _drifted(self, x0, u_nominal):
+        drift = tf.maximum(
+            tf.reduce_max(tf.abs(x0 - self.x_nominal[0])),
+            tf.reduce_max(tf.abs(u_nominal - self.u_nominal)),
+        )
+        return drift > self.refresh_tolerance
+
+    @CompileTF
+    def predict_horizon(self, s, Q):
+        """Predict states (B, H+1, S) from initial states s (B, S) and inputs Q (B, H, A)."""
+        x0 = s[0]
+        u_nominal = tf.reduce_mean(Q, axis=0)
+        horizon = tf.shape(Q)[1]
+
+        same_horizon = tf.logical_and(self.initialized, tf.equal(tf.shape(self.u_nominal)[0], horizon))
+        needs_refresh = tf.cond(same_horizon, lambda: self._drifted(x0, u_nominal), lambda: tf.constant(True))
+        tf.cond(needs_refresh, lambda: self._refresh(x0, u_nominal), lambda: tf.constant(False))
+
+        dQ = tf.transpose(Q - self.u_nominal[tf.newaxis], [1, 0, 2])  # (H, B, A)
+
+        def propagate(dx, inputs):
+            A_k, B_k, du_k = inputs
+            return tf.einsum("ij,bj->bi", A_k, dx) + tf.einsum("ij,bj->bi", B_k, du_k)
+
+        dx = tf.scan(propagate, (self.A, self.B, dQ), initializer=s - self.x_nominal[0])  # (H, B, S)
+        dx = tf.concat([(s - self.x_nominal[0])[tf.newaxis], dx], axis=0)
+        return tf.transpose(dx, [1, 0, 2]) + self.x_nominal[tf.newaxis]
+
+
 class predictor_output_augmentation_tf:
-    def __init__(self, net_info, differential_network=False):
+    """Appends the features of `FEATURE_AUGMENTATION` which the network does not output itself.
+
+    The expressions are parsed once and grouped by operation. All indices are python constants at trace time,
+    so `augment` is one gather per group followed by the elementwise operation and a single concatenation.
+    """
+
+    def __init__(self, net_info, differential_network=False, feature_augmentation: "dict[str, str] | None" = None):
         self.net_output_indices = {
             key: value for value, key in enumerate(net_info.outputs)
         }
+        if feature_augmentation is None:
+            feature_augmentation = FEATURE_AUGMENTATION.get(CurrentRunMemory.current_environment_name, {})
+
         indices_augmentation = []
         features_augmentation = []
+        # (operation, rhs is constant) -> list of (lhs index, rhs index or constant)
+        self.groups: "dict[tuple[str, bool], list[tuple[int, float]]]" = {}
+        group_positions = {}
+        for feature, expression in feature_augmentation.items():
+            if feature in self.net_output_indices or feature not in STATE_INDICES:
+                continue
+            operation, lhs, rhs, rhs_is_constant = self._parse(expression)
+            key = (operation, rhs_is_constant)
+            self.groups.setdefault(key, []).append((lhs, rhs))
+            group_positions.setdefault(key, []).append(len(features_augmentation))
+            indices_augmentation.append(STATE_INDICES[feature])
+            features_augmentation.append(feature)
+
+        # Position of each augmented feature within the concatenation of all groups
+        concatenated_positions = [p for key in self.groups for p in group_positions[key]]
+        self.output_order = list(np.argsort(concatenated_positions))
 
         self.indices_augmentation = indices_augmentation
         self.features_augmentation = features_augmentation
         self.augmentation_len = len(self.indices_augmentation)
 
+    def _parse(self, expression: str):
+        """Return (operation, lhs index, rhs index or constant, rhs is constant).
+
+        Raises a ValueError naming the expression if it cannot be parsed or uses a variable the network does not output,
+        as the network would otherwise silently be fed fewer features than configured.
+        """
+        expression = expression.strip()
+        if expression in self.net_output_indices:
+            return "id", self.net_output_indices[expression], 0.0, True
+        match = _UNARY_EXPRESSION.match(expression)
+        if match is not None:
+            function, operand = match.groups()
+            return function, self._get_output_index(operand, expression), 0.0, True
+        match = _BINARY_EXPRESSION.match(expression)
+        if match is None:
+            raise ValueError(f"Cannot parse feature augmentation expression '{expression}'.")
+        lhs, operation, rhs = match.groups()
+        lhs_index = self._get_output_index(lhs, expression)
+        if rhs in self.net_output_indices:
+            return operation, lhs_index, self.net_output_indices[rhs], False
+        try:
+            return operation, lhs_index, float(rhs), True
+        except ValueError:
+            return operation, lhs_index, self._get_output_index(rhs, expression), False
+
+    def _get_output_index(self, variable: str, expression: str) -> int:
+        if variable not in self.net_output_indices:
+            raise ValueError(
+                f"Feature augmentation expression '{expression}' uses '{variable}', "
+                f"which is not an output of the network ({', '.join(self.net_output_indices)})."
+            )
+        return self.net_output_indices[variable]
+
     def get_indices_augmentation(self):
         return self.indices_augmentation
 
@@ -36,10 +181,22 @@ class predictor_output_augmentation_tf:
 
     @CompileTF
     def augment(self, net_output):
+        if self.augmentation_len == 0:
+            return net_output
 
-        output = net_output
-        # if 'sin(x)' in self.features_augmentation:
-        #     sin_x = tf.math.sin(net_output[..., self.index_x])[:, :, tf.newaxis]
-        #     output = tf.concat([output, sin_x], axis=-1)
+        features = []
+        for (operation, rhs_is_constant), terms in self.groups.items():
+            lhs = tf.gather(net_output, [t[0] for t in terms], axis=-1)
+            if operation in _UNARY_FUNCTIONS:
+                features.append(_UNARY_FUNCTIONS[operation](lhs))
+                continue
+            if rhs_is_constant:
+                rhs = tf.constant([t[1] for t in terms], dtype=net_output.dtype)
+            else:
+                rhs = tf.gather(net_output, [t[1] for t in terms], axis=-1)
+            features.append(_BINARY_FUNCTIONS[operation](lhs, rhs))
 
-        return output
+        features = tf.concat(features, axis=-1)
+        if self.output_order != list(range(self.augmentation_len)):
+            features = tf.gather(features, self.output_order, axis=-1)
+        return tf.concat([net_output, features], axis=-1)
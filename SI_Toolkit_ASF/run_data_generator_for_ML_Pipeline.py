@@ -1,5 +1,6 @@
-from Utilities.utils import ConfigManager, CurrentRunMemory, get_logger
-from main import run_data_generator
+from Utilities.dataset_writer import make_folder_exclusive
+from Utilities.normalization_stats import write_normalization_info
+from Utilities.utils import ConfigManager, CurrentRunMemory, get_logger, get_split_name, print_output_metrics, write_output_scalars
 
 controller_names = ["controller_mpc"]
 environment_names = [
@@ -12,54 +13,31 @@ environment_names = [
     # "BipedalWalkerBatched-v0",
     # "ObstacleAvoidance-v0",
 ]
+# Episodes of each controller / environment pair are spread across this many processes. 1 runs serially.
+num_workers = 1
 
 # Automatically create new path to save everything in
 
+import multiprocessing
+import numpy as np
 import tensorflow as tf
 import yaml, os
+from numpy.random import SeedSequence
 config_SI = yaml.load(open(os.path.join('SI_Toolkit_ASF', 'config_training.yml')), Loader=yaml.FullLoader)
 config_manager = ConfigManager(".")
 
 logger = get_logger(__name__)
 
 def get_record_path():
-    experiment_index = 1
-    while True:
-        record_path = f"Experiment-{experiment_index}"
-        if os.path.exists(config_SI['paths']['PATH_TO_EXPERIMENT_FOLDERS'] + record_path):
-            experiment_index += 1
-        else:
-            record_path = os.path.join(record_path, "Recordings")
-            break
+    # Creating the Experiment-<i> folder is the reservation, so concurrent invocations get different folders
+    experiment_folder = make_folder_exclusive(config_SI['paths']['PATH_TO_EXPERIMENT_FOLDERS'])
+    return os.path.join(experiment_folder, "Recordings")
 
-    record_path = config_SI['paths']['PATH_TO_EXPERIMENT_FOLDERS'] + record_path
-    return record_path
 
-if __name__ == '__main__':
-    record_path = get_record_path()
-    
-    num_experiments = config_manager("config")["num_experiments"]
-    if isinstance(controller_names, list):
-        if len(controller_names) > 1:
-            logger.warning("Multiple controller names supplied. Only using the first one.")
-        controller_name = controller_names[0]
-    else:
-        controller_name = controller_names
-        
-    if isinstance(environment_names, list):
-        if len(environment_names) > 1:
-            logger.warning("Multiple controller names supplied. Only using the first one.")
-        environment_name = environment_names[0]
-    else:
-        environment_name = environment_names
-        
-    # Save copy of configs in experiment folder
-    if not os.path.exists(record_path):
-        os.makedirs(record_path)
-    yaml.dump(config_SI, open(record_path + "/SI_Toolkit_config_savefile.yml", "w"), default_flow_style=False)
-    yaml.dump(config_manager("config"), open(record_path + "/GymEnv_config_savefile.yml", "w"), default_flow_style=False)
-
-    # Run data generator
+def generate_shard(controller_name: str, environment_name: str, record_path: str, episode_indices: "list[int]"):
+    # Runs in a worker process: imports which depend on the current environment happen here
+    from main import run_data_generator
+
     CurrentRunMemory.current_controller_name = controller_name
     CurrentRunMemory.current_environment_name = environment_name
 
@@ -73,5 +51,86 @@ if __name__ == '__main__':
             )
 
     with tf.device(device_name):
-        run_data_generator(controller_name, environment_name, config_manager, run_for_ML_Pipeline=True, record_path=record_path)
-    
+        return run_data_generator(
+            controller_name,
+            environment_name,
+            config_manager,
+            run_for_ML_Pipeline=True,
+            record_path=record_path,
+            episode_indices=episode_indices,
+        )
+
+
+def merge_output_scalars(shard_metrics: "list[dict[str, list]]") -> "dict[str, list]":
+    """Concatenate the scalar metrics returned by the shards, ordered by episode index."""
+    order = np.argsort(np.concatenate([metrics["episode_index"] for metrics in shard_metrics]), kind="stable")
+    return {key: np.concatenate([metrics[key] for metrics in shard_metrics])[order].tolist() for key in shard_metrics[0]}
+
+
+def get_manifest(controller_name: str, environment_name: str, shards: "list[list[int]]") -> dict:
+    """Record which shard holds which episodes, their seeds and the file each episode is saved to."""
+    seed_entropy = config_manager("config")["seed_entropy"]
+    num_experiments = config_manager("config")["num_experiments"]
+    frac_train, frac_val = config_manager("config")["split"]
+    recording_format = config_manager("config").get("recording_format", "csv")
+    seed_sequences = SeedSequence(entropy=seed_entropy).spawn(num_experiments)
+    return {
+        "controller_name": controller_name,
+        "environment_name": environment_name,
+        "seed_entropy": seed_entropy,
+        "num_experiments": num_experiments,
+        "shards": [
+            {
+                "shard": k,
+                "episodes": [
+                    {
+                        "episode_index": int(i),
+                        "seeds": [int(seed) for seed in seed_sequences[i].generate_state(3)],
+                        "file": os.path.join(get_split_name(i, num_experiments, frac_train, frac_val), f"Experiment-{i}.{recording_format}"),
+                    }
+                    for i in shard
+                ],
+            }
+            for k, shard in enumerate(shards)
+        ],
+    }
+
+
+if __name__ == '__main__':
+    num_experiments = config_manager("config")["num_experiments"]
+    if not isinstance(controller_names, list):
+        controller_names = [controller_names]
+    if not isinstance(environment_names, list):
+        environment_names = [environment_names]
+
+    for controller_name in controller_names:
+        for environment_name in environment_names:
+            record_path = get_record_path()
+
+            # Save copy of configs in experiment folder
+            if not os.path.exists(record_path):
+                os.makedirs(record_path)
+            yaml.dump(config_SI, open(record_path + "/SI_Toolkit_config_savefile.yml", "w"), default_flow_style=False)
+            yaml.dump(config_manager("config"), open(record_path + "/GymEnv_config_savefile.yml", "w"), default_flow_style=False)
+
+            # Contiguous blocks of episode indices, one per worker. The split into Train/Validate/Test depends only on the index.
+            shards = [list(map(int, shard)) for shard in np.array_split(np.arange(num_experiments), num_workers) if len(shard) > 0]
+            yaml.dump(get_manifest(controller_name, environment_name, shards), open(os.path.join(record_path, "manifest.yml"), "w"), sort_keys=False)
+            logger.info(f"Generating {num_experiments} episodes of {controller_name} on {environment_name} in {len(shards)} shard(s) into {record_path}")
+
+            # Run data generator
+            if len(shards) == 1 and len(controller_names) * len(environment_names) == 1:
+                shard_metrics = [generate_shard(controller_name, environment_name, record_path, shards[0])]
+            else:
+                # spawn: workers must not inherit an initialized TensorFlow runtime, nor the predictor modules,
+                # which are set up for one environment at import time
+                with multiprocessing.get_context("spawn").Pool(len(shards)) as pool:
+                    shard_metrics = pool.starmap(generate_shard, [(controller_name, environment_name, record_path, shard) for shard in shards])
+
+            # The shards share one timestamp, so they return their metrics instead of writing them to Output
+            metrics = merge_output_scalars(shard_metrics)
+            write_output_scalars(os.path.join(record_path, "output_scalars.csv"), metrics)
+            print_output_metrics(metrics)
+
+            # Normalization info from the statistics the writers stored in the Train manifest, no pass over the recordings
+            logger.info(f"Saved normalization info to {write_normalization_info(record_path)}")
@@ -0,0 +1,146 @@
+"""
+Generate (state, action, next state) data for system identification without a controller.
+
+Large batches of trajectories are propagated at once with the environment's whole-horizon `rollout`
+(see `Environments.rollout`). Initial states are drawn uniformly from the observation space, clipped to
+`max_abs_initial_state` where it is unbounded. Actions follow one of the excitation signals below, scaled to the action space:
+    uniform: independent uniform samples
+    colored: AR(1) noise, u_t = a * u_{t-1} + sqrt(1 - a^2) * e_t, with a = colored_noise_correlation
+    chirp:   sine sweeps with random start / end frequency, phase and amplitude per trajectory
+    steps:   piecewise constant levels, held for a geometrically distributed number of steps with mean step_hold_steps
+The first `burn_in_steps` states are dropped: uniformly drawn states can be inconsistent (e.g. angle vs. its sin / cos),
+the dynamics make them consistent again.
+
+Each batch is written as one shard in the binary recording format (array of shape (trajectories, time, columns))
+into Train / Validate / Test by batch index, with the manifest statistics and normalization info of the ML pipeline.
+
+Usage:
+    python -m SI_Toolkit_ASF.run_sysid_data_generator
+"""
+environment_name = "Pendulum-v0"
+excitation = "colored"  # uniform, colored, chirp or steps
+num_batches = 10
+batch_size = 10000  # Trajectories per batch
+trajectory_length = 200  # Transitions per trajectory
+burn_in_steps = 1
+max_abs_initial_state = 10.0
+colored_noise_correlation = 0.9
+chirp_frequency_range = [0.05, 5.0]  # Hz
+step_hold_steps = 10
+seed = 1873
+
+### ------------------------------------------------------------------------------------ ###
+import os
+import time
+
+import gymnasium as gym
+import numpy as np
+import yaml
+from SI_Toolkit.computation_library import NumpyLibrary, TensorFlowLibrary
+
+from Environments import get_env_metadata, register_envs
+from Utilities.binary_recordings import write_recording
+from Utilities.dataset_writer import make_folder_exclusive, write_shard
+from Utilities.normalization_stats import write_normalization_info
+from Utilities.utils import ConfigManager, CurrentRunMemory, get_logger, get_split_name
+
+config_SI = yaml.load(open(os.path.join("SI_Toolkit_ASF", "config_training.yml")), Loader=yaml.FullLoader)
+logger = get_logger(__name__)
+
+
+def sample_initial_states(observation_space: gym.spaces.Box, num_states: int, batch_size: int, rng: np.random.Generator) -> np.ndarray:
+    low = np.clip(observation_space.low[:num_states], -max_abs_initial_state, max_abs_initial_state)
+    high = np.clip(observation_space.high[:num_states], -max_abs_initial_state, max_abs_initial_state)
+    return rng.uniform(low, high, (batch_size, num_states)).astype(np.float32)
+
+
+def sample_excitation(signal: str, shape: "tuple[int, int, int]", dt: float, rng: np.random.Generator) -> np.ndarray:
+    """Excitation in [-1, 1] of shape (trajectories, time, actions)."""
+    batch, length, num_actions = shape
+    if signal == "uniform":
+        return rng.uniform(-1.0, 1.0, shape)
+    if signal == "colored":
+        a = colored_noise_correlation
+        noise = rng.standard_normal(shape)
+        u = np.empty(shape)
+        u[:, 0] = noise[:, 0]
+        for t in range(1, length):
+            u[:, t] = a * u[:, t - 1] + np.sqrt(1.0 - a**2) * noise[:, t]
+        return np.clip(u / 2.0, -1.0, 1.0)  # Unit variance, so +-2 sigma maps to the action bounds
+    if signal == "chirp":
+        t = dt * np.arange(length)[np.newaxis, :, np.newaxis]
+        f0, f1 = (rng.uniform(*chirp_frequency_range, (batch, 1, num_actions)) for _ in range(2))
+        phase = rng.uniform(0.0, 2.0 * np.pi, (batch, 1, num_actions))
+        amplitude = rng.uniform(0.0, 1.0, (batch, 1, num_actions))
+        duration = dt * length
+        return amplitude * np.sin(2.0 * np.pi * (f0 * t + 0.5 * (f1 - f0) / duration * t**2) + phase)
+    if signal == "steps":
+        new_level = rng.random(shape) < 1.0 / step_hold_steps
+        new_level[:, 0] = True
+        levels = rng.uniform(-1.0, 1.0, shape)
+        # Index of the last step change at or before each time step
+        last_change = np.maximum.accumulate(np.where(new_level, np.arange(length)[np.newaxis, :, np.newaxis], 0), axis=1)
+        return np.take_along_axis(levels, last_change, axis=1)
+    raise ValueError(f"Unknown excitation signal {signal}. Use uniform, colored, chirp or steps.")
+
+
+def generate_batch(env, metadata: dict, rng: np.random.Generator) -> np.ndarray:
+    """Return one batch as array (trajectories, time, columns) with columns time, x_*, u_*."""
+    lib = env.lib
+    length = burn_in_steps + trajectory_length
+    initial_states = sample_initial_states(env.observation_space, metadata["num_states"], batch_size, rng)
+    excitation_signal = sample_excitation(excitation, (batch_size, length, metadata["num_actions"]), env.dt, rng)
+    low, high = env.action_space.low, env.action_space.high
+    actions = (low + 0.5 * (excitation_signal + 1.0) * (high - low)).astype(np.float32)
+
+    states = lib.to_numpy(
+        env.rollout(lib.to_tensor(initial_states, lib.float32), lib.to_tensor(actions, lib.float32))
+    )[:, burn_in_steps:]  # (trajectories, trajectory_length + 1, states)
+    actions = actions[:, burn_in_steps:]
+    actions = np.concatenate([actions, actions[:, -1:]], axis=1)  # Input of the last row is never used as a label
+
+    time_column = np.broadcast_to(env.dt * np.arange(trajectory_length + 1)[np.newaxis, :, np.newaxis], (batch_size, trajectory_length + 1, 1))
+    return np.concatenate([time_column, states, actions], axis=-1).astype(np.float32)
+
+
+if __name__ == "__main__":
+    register_envs()
+    config_manager = ConfigManager(".", "Environments")
+    CurrentRunMemory.current_environment_name = environment_name
+    metadata = get_env_metadata(environment_name)
+    if metadata["batched_real_env"]:
+        raise ValueError(f"{environment_name} is batched over simulator instances and has no analytic step_dynamics.")
+
+    config_environment = dict(config_manager("config_environments")[environment_name])
+    config_environment.update({"seed": seed, "scenario_bank": None})
+    env = gym.make(
+        environment_name,
+        **config_environment,
+        computation_lib=NumpyLibrary if "numpy" in metadata["backends"] else TensorFlowLibrary,
+        render_mode=None,
+    ).unwrapped
+    env.reset(seed=seed)
+
+    record_path = os.path.join(make_folder_exclusive(config_SI["paths"]["PATH_TO_EXPERIMENT_FOLDERS"]), "Recordings")
+    frac_train, frac_val = config_manager("config")["split"]
+    columns = ["time"] + [f"x_{k}" for k in range(metadata["num_states"])] + [f"u_{k}" for k in range(metadata["num_actions"])]
+    sidecar = {
+        "columns": columns,
+        "dt": float(env.dt),
+        "controller_name": f"sysid_{excitation}",
+        "environment_name": environment_name,
+    }
+
+    rng = np.random.default_rng(seed)
+    start_time = time.time()
+    for k in range(num_batches):
+        data = generate_batch(env, metadata, rng)
+        folder = os.path.join(record_path, get_split_name(k, num_batches, frac_train, frac_val))
+        write_shard(
+            folder, ".npy", lambda p: write_recording(p, data, {**sidecar, "episodes": batch_size}),
+            data.reshape(-1, len(columns)), columns, stats_sample_size=config_manager("config").get("normalization_sample_size", 0),
+            controller_name=sidecar["controller_name"],
+        )
+    num_transitions = num_batches * batch_size * trajectory_length
+    logger.info(f"Generated {num_transitions} transitions in {time.time() - start_time:.1f}s into {record_path}")
+    logger.info(f"Saved normalization info to {write_normalization_info(record_path)}")
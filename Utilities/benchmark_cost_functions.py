@@ -0,0 +1,231 @@
+"""
+Measure and cross-check `get_trajectory_cost` of every cost function in Control_Toolkit_ASF/Cost_Functions.
+
+Every cost function is evaluated on the same synthetic batch: states drawn uniformly from the observation space of its
+environment (clipped to `max_abs_state` where unbounded) and inputs drawn uniformly from the action space.
+It is timed on the NumPy backend and with TensorFlow in eager mode, as tf.function and as XLA-compiled tf.function.
+For TensorFlow modes the time of the cost together with its gradient with respect to the inputs is measured as well.
+Peak memory is taken from tracemalloc for NumPy and from the TensorFlow allocator on GPU (None on CPU).
+
+All modes are compared against the first one (NumPy where supported). Deviations beyond `rtol` / `atol`,
+non-finite costs, errors and calls slower than `max_nanoseconds_per_stage` are listed as issues,
+such that a slow or broken cost function is noticed before it runs in a sweep.
+
+Usage:
+    python -m Utilities.benchmark_cost_functions
+"""
+# Specify the sweep. Leave cost_function_names as None to benchmark all, otherwise e.g. ["acrobot_batched.default"]
+cost_function_names = None
+batch_sizes = [100, 1000, 10000]
+horizons = [10, 50]
+num_repeats = 5  # Median over this many timed calls, after one untimed warm-up call
+max_abs_state = 10.0
+rtol = 1e-4
+atol = 1e-3
+max_nanoseconds_per_stage = None  # Flag cost functions slower than this per rollout and stage, e.g. 100.0
+seed = 1873
+output_path = None  # Defaults to Output/benchmarks/cost_functions_<timestamp>.json
+
+### ------------------------------------------------------------------------------------ ###
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+from glob import glob
+from importlib import import_module
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+import gymnasium as gym
+import numpy as np
+import tensorflow as tf
+from SI_Toolkit.computation_library import NumpyLibrary, TensorFlowLibrary
+
+from Environments import ENV_METADATA, register_envs
+from Utilities.benchmark_dynamics import get_machine_info
+from Utilities.utils import ConfigManager, CurrentRunMemory, get_logger
+
+logger = get_logger(__name__)
+
+COST_FUNCTIONS_PATH = os.path.join("Control_Toolkit_ASF", "Cost_Functions")
+
+
+def find_cost_functions() -> "dict[str, str]":
+    """Map each `<environment module>.<cost function>` to the registered environment it belongs to."""
+    cost_functions = {}
+    for environment_name, metadata in ENV_METADATA.items():
+        if metadata["batched_real_env"]:
+            continue  # Their cost function is the reward of the simulator instances, see GymEnvironment
+        environment_module = metadata["entry_point"].split(":")[0].split(".")[-1]
+        for filename in sorted(glob(os.path.join(COST_FUNCTIONS_PATH, environment_module, "*.py"))):
+            cost_function_name = os.path.splitext(os.path.basename(filename))[0]
+            if not cost_function_name.startswith("_"):
+                cost_functions[f"{environment_module}.{cost_function_name}"] = environment_name
+    return cost_functions
+
+
+def get_modes(environment_name: str) -> "dict[str, type]":
+    metadata = ENV_METADATA[environment_name]
+    modes = {}
+    if "numpy" in metadata["backends"]:
+        modes["numpy"] = NumpyLibrary
+    if "tensorflow" in metadata["backends"]:
+        modes["tf-eager"] = TensorFlowLibrary
+        modes["tf-function"] = TensorFlowLibrary
+        modes["tf-xla"] = TensorFlowLibrary
+    return modes
+
+
+def sample_inputs(env, horizon: int, batch_size: int, rng: np.random.Generator) -> "tuple[np.ndarray, np.ndarray]":
+    """Synthetic state_horizon (B, H+1, S) and inputs (B, H, A)."""
+    num_states = ENV_METADATA[CurrentRunMemory.current_environment_name]["num_states"]
+    low = np.clip(env.observation_space.low[:num_states], -max_abs_state, max_abs_state)
+    high = np.clip(env.observation_space.high[:num_states], -max_abs_state, max_abs_state)
+    states = rng.uniform(low, high, (batch_size, horizon + 1, num_states)).astype(np.float32)
+    inputs = rng.uniform(env.action_space.low, env.action_space.high, (batch_size, horizon, env.action_space.shape[0])).astype(np.float32)
+    return states, inputs
+
+
+def make_cost_function(specification: str, environment_name: str, config_environment: dict, computation_lib: type):
+    environment_module, cost_function_name = specification.split(".")
+    env = gym.make(environment_name, **config_environment, computation_lib=computation_lib, render_mode=None).unwrapped
+    env.reset(seed=config_environment["seed"])
+    CurrentRunMemory.current_environment = env
+    module = import_module(f"Control_Toolkit_ASF.Cost_Functions.{environment_module}.{cost_function_name}")
+    cost_function = getattr(module, cost_function_name)(
+        variable_parameters=SimpleNamespace(**env.environment_attributes), ComputationLib=computation_lib
+    )
+    return env, cost_function
+
+
+def make_call(cost_function, mode: str, with_gradient: bool) -> Callable:
+    def trajectory_cost(state_horizon, inputs):
+        return cost_function.get_trajectory_cost(state_horizon, inputs, None)
+
+    def trajectory_cost_and_gradient(state_horizon, inputs):
+        with tf.GradientTape() as tape:
+            tape.watch(inputs)
+            cost = cost_function.get_trajectory_cost(state_horizon, inputs, None)
+        return cost, tape.gradient(cost, inputs)
+
+    call = trajectory_cost_and_gradient if with_gradient else trajectory_cost
+    if mode in ["tf-function", "tf-xla"]:
+        return tf.function(call, jit_compile=(mode == "tf-xla"))
+    return call
+
+
+def time_call(call: Callable, lib: type, state_horizon, inputs) -> "tuple[float, Optional[int], np.ndarray]":
+    """Median seconds, peak memory in bytes and the costs of call."""
+    output = call(state_horizon, inputs)  # Warm-up, includes tracing and compilation
+    costs = lib.to_numpy(output[0] if isinstance(output, tuple) else output)
+
+    gpu = len(tf.config.list_physical_devices("GPU")) > 0
+    if lib is NumpyLibrary:
+        tracemalloc.start()
+    elif gpu:
+        tf.config.experimental.reset_memory_stats("GPU:0")
+
+    durations = []
+    for _ in range(num_repeats):
+        start = time.perf_counter()
+        output = call(state_horizon, inputs)
+        for o in output if isinstance(output, tuple) else [output]:
+            lib.to_numpy(o)
+        durations.append(time.perf_counter() - start)
+
+    peak_memory = None
+    if lib is NumpyLibrary:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    elif gpu:
+        peak_memory = tf.config.experimental.get_memory_info("GPU:0")["peak"]
+    return float(np.median(durations)), peak_memory, costs
+
+
+def benchmark_cost_function(specification: str, environment_name: str, config_environment: dict) -> "tuple[list[dict], list[dict]]":
+    results, issues = [], []
+    rng = np.random.default_rng(seed)
+    cost_functions = {}
+    for mode, computation_lib in get_modes(environment_name).items():
+        try:
+            cost_functions[mode] = make_cost_function(specification, environment_name, config_environment, computation_lib)
+        except Exception as e:
+            issues.append({"cost_function": specification, "mode": mode, "issue": f"Construction failed: {e!r}"})
+
+    for batch_size in batch_sizes:
+        for horizon in horizons:
+            data = None
+            reference = None
+            for mode, (env, cost_function) in cost_functions.items():
+                if data is None:
+                    data = sample_inputs(env, horizon, batch_size, rng)
+                lib = env.lib
+                state_horizon, inputs = (lib.to_tensor(x, lib.float32) for x in data)
+                result = {"cost_function": specification, "mode": mode, "batch_size": batch_size, "horizon": horizon}
+                try:
+                    result["seconds"], result["peak_memory_bytes"], costs = time_call(
+                        make_call(cost_function, mode, with_gradient=False), lib, state_horizon, inputs
+                    )
+                    if lib is TensorFlowLibrary:
+                        result["seconds_with_gradient"], _, _ = time_call(
+                            make_call(cost_function, mode, with_gradient=True), lib, state_horizon, inputs
+                        )
+                except Exception as e:
+                    issues.append({**result, "issue": f"Evaluation failed: {e!r}"})
+                    continue
+
+                result["nanoseconds_per_stage"] = 1e9 * result["seconds"] / (batch_size * horizon)
+                if not np.all(np.isfinite(costs)):
+                    issues.append({**result, "issue": "Non-finite costs"})
+                if max_nanoseconds_per_stage is not None and result["nanoseconds_per_stage"] > max_nanoseconds_per_stage:
+                    issues.append({**result, "issue": f"Slow: {result['nanoseconds_per_stage']:.1f} ns per stage"})
+                if reference is None:
+                    reference = (mode, costs)
+                else:
+                    result["max_abs_deviation"] = float(np.max(np.abs(costs - reference[1])))
+                    if not np.allclose(costs, reference[1], rtol=rtol, atol=atol, equal_nan=True):
+                        issues.append({**result, "issue": f"Deviates from {reference[0]} by up to {result['max_abs_deviation']:.3e}"})
+                results.append(result)
+                logger.info(
+                    f"{specification} {mode} batch={batch_size} horizon={horizon}: "
+                    f"{1e3 * result['seconds']:.3f} ms, {result['nanoseconds_per_stage']:.1f} ns per stage"
+                )
+
+    for env, _ in cost_functions.values():
+        env.close()
+    return results, issues
+
+
+if __name__ == "__main__":
+    register_envs()
+    config_manager = ConfigManager(".", "Environments")
+    timestamp_str = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    all_cost_functions = find_cost_functions()
+    results, issues = [], []
+    for specification in cost_function_names or list(all_cost_functions.keys()):
+        environment_name = all_cost_functions[specification]
+        CurrentRunMemory.current_environment_name = environment_name
+        config_environment = dict(config_manager("config_environments")[environment_name])
+        config_environment.update({"seed": seed, "scenario_bank": None})
+        r, i = benchmark_cost_function(specification, environment_name, config_environment)
+        results.extend(r)
+        issues.extend(i)
+
+    for issue in issues:
+        logger.warning(f"{issue['cost_function']} {issue['mode']}: {issue['issue']}")
+    if len(issues) == 0:
+        logger.info("No issues found.")
+
+    report = {
+        "timestamp": timestamp_str,
+        "machine": get_machine_info(),
+        "results": results,
+        "issues": issues,
+    }
+    output_path = output_path or os.path.join("Output", "benchmarks", f"cost_functions_{timestamp_str}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Saved benchmark results to {output_path}")
@@ -0,0 +1,223 @@
+"""
+Measure the throughput (states per second) of `step_dynamics` for every registered environment.
+
+Each environment is run with every computation library it supports (see `Environments.ENV_METADATA`).
+TensorFlow is measured in eager mode, as tf.function and as XLA-compiled tf.function.
+A measurement rolls out a batch of `batch_size` states for `horizon` steps and counts batch_size * horizon states.
+
+Results are written to JSON together with information about the machine.
+If `baseline_path` points to an earlier result file, every measurement is compared to it and
+slowdowns larger than `regression_tolerance` are reported as regressions.
+
+Usage:
+    python -m Utilities.benchmark_dynamics
+"""
+# Specify the sweep. Leave environment_names as None to benchmark all registered environments
+environment_names = None
+batch_sizes = [1, 10, 100, 1000, 10000, 100000]
+horizons = [1, 10, 100]
+num_repeats = 5  # Median over this many timed rollouts, after one untimed warm-up rollout
+baseline_path = None  # e.g. "Output/benchmarks/dynamics_20240101-120000.json"
+regression_tolerance = 0.2  # Flag measurements more than 20% slower than the baseline
+output_path = None  # Defaults to Output/benchmarks/dynamics_<timestamp>.json
+
+### ------------------------------------------------------------------------------------ ###
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from typing import Callable
+
+import gymnasium as gym
+import numpy as np
+import tensorflow as tf
+from SI_Toolkit.computation_library import NumpyLibrary, TensorFlowLibrary
+
+from Environments import ENV_METADATA, get_env_metadata, register_envs
+from Utilities.utils import ConfigManager, get_logger
+
+logger = get_logger(__name__)
+
+
+def get_machine_info() -> dict:
+    info = {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "tensorflow": tf.__version__,
+        "gpus": [device.name for device in tf.config.list_physical_devices("GPU")],
+    }
+    try:
+        import torch
+
+        info["torch"] = torch.__version__
+    except ImportError:
+        info["torch"] = None
+    return info
+
+
+def get_modes(environment_name: str) -> "dict[str, type]":
+    """Map each benchmark mode which the environment supports to the computation library it runs with."""
+    metadata = get_env_metadata(environment_name)
+    modes = {}
+    if "numpy" in metadata["backends"]:
+        modes["numpy"] = NumpyLibrary
+    if "tensorflow" in metadata["backends"]:
+        modes["tf-eager"] = TensorFlowLibrary
+        if metadata["compile_safe"]:
+            modes["tf-function"] = TensorFlowLibrary
+            modes["tf-xla"] = TensorFlowLibrary
+    if "pytorch" in metadata["backends"]:
+        try:
+            from SI_Toolkit.computation_library import PyTorchLibrary
+
+            modes["pytorch"] = PyTorchLibrary
+        except ImportError:
+            logger.info("PyTorch is not available, skipping the pytorch mode.")
+    return modes
+
+
+def make_rollout(env, mode: str) -> Callable:
+    step_dynamics, dt = env.step_dynamics, env.dt
+
+    def rollout(state, action, horizon):
+        for _ in range(horizon):
+            state = step_dynamics(state, action, dt)
+        return state
+
+    if mode in ["tf-function", "tf-xla"]:
+
+        def rollout_tf(state, action, horizon):
+            for _ in tf.range(horizon):
+                state = step_dynamics(state, action, dt)
+            return state
+
+        return tf.function(rollout_tf, jit_compile=(mode == "tf-xla"))
+    if mode == "pytorch":
+        import torch
+
+        return torch.no_grad()(rollout)
+    return rollout
+
+
+def benchmark_environment(environment_name: str, config_environment: dict) -> "list[dict]":
+    metadata = get_env_metadata(environment_name)
+    if metadata["batched_real_env"]:
+        logger.info(f"Skipping {environment_name}: its batch consists of simulator instances fixed at construction.")
+        return []
+
+    results = []
+    rng = np.random.default_rng(config_environment["seed"])
+    for mode, computation_lib in get_modes(environment_name).items():
+        env = gym.make(
+            environment_name,
+            **config_environment,
+            computation_lib=computation_lib,
+            render_mode=None,
+        ).unwrapped
+        env.reset(seed=config_environment["seed"])
+        lib = env.lib
+        rollout = make_rollout(env, mode)
+        initial_state = np.reshape(lib.to_numpy(env.state), (-1, metadata["num_states"]))[:1]
+
+        for batch_size in batch_sizes:
+            state = np.repeat(initial_state, batch_size, axis=0).astype(np.float32)
+            state += 1e-3 * rng.standard_normal(state.shape, dtype=np.float32)
+            action = rng.uniform(
+                env.action_space.low, env.action_space.high, (batch_size, metadata["num_actions"])
+            ).astype(np.float32)
+            state, action = lib.to_tensor(state, lib.float32), lib.to_tensor(action, lib.float32)
+
+            for horizon in horizons:
+                h = tf.constant(horizon) if mode in ["tf-function", "tf-xla"] else horizon
+                lib.to_numpy(rollout(state, action, h))  # Warm-up, includes tracing and compilation
+                durations = []
+                for _ in range(num_repeats):
+                    start = time.perf_counter()
+                    lib.to_numpy(rollout(state, action, h))
+                    durations.append(time.perf_counter() - start)
+                duration = float(np.median(durations))
+                results.append(
+                    {
+                        "environment": environment_name,
+                        "mode": mode,
+                        "batch_size": batch_size,
+                        "horizon": horizon,
+                        "seconds": duration,
+                        "states_per_second": batch_size * horizon / duration,
+                    }
+                )
+                logger.info(
+                    f"{environment_name} {mode} batch={batch_size} horizon={horizon}: "
+                    f"{results[-1]['states_per_second']:.3e} states/s"
+                )
+        env.close()
+    return results
+
+
+def find_regressions(results: "list[dict]", baseline: "list[dict]", tolerance: float) -> "list[dict]":
+    def key(r):
+        return (r["environment"], r["mode"], r["batch_size"], r["horizon"])
+
+    baseline_by_key = {key(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        if key(r) not in baseline_by_key:
+            continue
+        ratio = r["states_per_second"] / baseline_by_key[key(r)]["states_per_second"]
+        if ratio < 1.0 - tolerance:
+            regressions.append({**r, "baseline_states_per_second": baseline_by_key[key(r)]["states_per_second"], "ratio": ratio})
+    return regressions
+
+
+def best_configurations(results: "list[dict]") -> "dict[str, dict]":
+    """Fastest mode and batch size per environment and horizon, as a starting point for num_rollouts and backend."""
+    best = {}
+    for r in results:
+        k = f"{r['environment']} horizon={r['horizon']}"
+        if k not in best or r["states_per_second"] > best[k]["states_per_second"]:
+            best[k] = {"mode": r["mode"], "batch_size": r["batch_size"], "states_per_second": r["states_per_second"]}
+    return best
+
+
+if __name__ == "__main__":
+    register_envs()
+    config_manager = ConfigManager(".", "Environments")
+    timestamp_str = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    results = []
+    for environment_name in environment_names or list(ENV_METADATA.keys()):
+        config_environment = dict(config_manager("config_environments")[environment_name])
+        config_environment.update({"seed": config_manager("config")["seed_entropy"], "scenario_bank": None})
+        results.extend(benchmark_environment(environment_name, config_environment))
+
+    report = {
+        "timestamp": timestamp_str,
+        "machine": get_machine_info(),
+        "results": results,
+        "best_configurations": best_configurations(results),
+    }
+
+    if baseline_path is not None:
+        with open(baseline_path, "r") as f:
+            baseline = json.load(f)
+        report["baseline"] = baseline_path
+        report["regressions"] = find_regressions(results, baseline["results"], regression_tolerance)
+        if baseline["machine"] != report["machine"]:
+            logger.warning("Baseline was recorded on a different machine, comparison may be meaningless.")
+        for r in report["regressions"]:
+            logger.warning(
+                f"Regression: {r['environment']} {r['mode']} batch={r['batch_size']} horizon={r['horizon']} "
+                f"runs at {r['ratio']:.0%} of baseline throughput"
+            )
+        if len(report["regressions"]) == 0:
+            logger.info("No regressions against baseline.")
+
+    output_path = output_path or os.path.join("Output", "benchmarks", f"dynamics_{timestamp_str}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Saved benchmark results to {output_path}")
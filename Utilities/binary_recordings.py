@@ -0,0 +1,112 @@
+"""
+Binary recording format, an alternative to the Experiment-*.csv files of `csv_helpers`.
+
+An episode is stored as one contiguous float32 array of shape (time steps, columns) in `Experiment-<i>.npy`.
+A sidecar `Experiment-<i>.yml` holds the column names, dt, controller and environment.
+The columns are the same as in the CSV format: time, x_*, u_*.
+A shard may also hold many equally long episodes as one array (episodes, time steps, columns),
+with `episodes` in the sidecar (see `SI_Toolkit_ASF/run_sysid_data_generator.py`).
+`load_recording` memory-maps the array, so reading an episode does not copy it into memory.
+
+Select the format with `recording_format` in config.yml. Convert existing CSV recordings with
+    python -m Utilities.binary_recordings <folder>
+"""
+import csv
+import os
+import sys
+from glob import glob
+from typing import Optional
+
+import numpy as np
+import yaml
+from Control_Toolkit.Controllers import template_controller
+
+from Utilities.dataset_writer import atomic_write, write_shard
+from Utilities.utils import ConfigManager, CurrentRunMemory, get_logger
+
+log = get_logger(__name__)
+
+config_manager = ConfigManager("Environments")
+
+
+def write_recording(filename: str, data: np.ndarray, metadata: dict):
+    """Write `data` (time steps, columns) to `<filename>.npy` and `metadata` to the `<filename>.yml` sidecar.
+
+    The sidecar is written first and both files are moved into place atomically, so an existing .npy always has its sidecar.
+    """
+    filename = os.path.splitext(filename)[0]
+
+    def write_sidecar(temporary_path: str):
+        with open(temporary_path, "w") as f:
+            yaml.dump(metadata, f, sort_keys=False)
+
+    def write_array(temporary_path: str):
+        with open(temporary_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(data, dtype=np.float32))
+
+    atomic_write(f"{filename}.yml", write_sidecar)
+    atomic_write(f"{filename}.npy", write_array)
+
+
+def load_recording(filename: str, mmap: bool = True) -> "tuple[np.ndarray, dict]":
+    """Return the episode array (memory-mapped and read-only if `mmap`) and its metadata."""
+    filename = os.path.splitext(filename)[0]
+    data = np.load(f"{filename}.npy", mmap_mode="r" if mmap else None)
+    with open(f"{filename}.yml", "r") as f:
+        metadata = yaml.safe_load(f)
+    return data, metadata
+
+
+def save_to_binary(config, controller: template_controller, environment_name: str, path: str, experiment_index: Optional[int] = None):
+    """Same as `csv_helpers.save_to_csv`, in the binary format."""
+    controller_outputs = controller.get_outputs()
+    states = controller_outputs["s_logged"]
+    inputs = controller_outputs["u_logged"]
+
+    dt = config_manager("config_environments")[environment_name]["dt"]
+    time = dt * np.arange(states.shape[0])
+    data = np.column_stack([time, states, inputs])
+    columns = ["time"] + [f"x_{k}" for k in range(states.shape[1])] + [f"u_{k}" for k in range(inputs.shape[1])]
+    metadata = {
+        "columns": columns,
+        "dt": float(dt),
+        "controller_name": CurrentRunMemory.current_controller_name,
+        "environment_name": environment_name,
+    }
+    filename = write_shard(
+        path, ".npy", lambda p: write_recording(p, data, metadata), data, columns, index=experiment_index,
+        stats_sample_size=config.get("normalization_sample_size", 0), controller_name=CurrentRunMemory.current_controller_name,
+    )
+    log.info(f"Saved to the file {filename}")
+
+
+def convert_csv_recording(csv_filename: str):
+    """Convert one Experiment-*.csv file to the binary format next to it."""
+    metadata = {}
+    num_header_lines = 0
+    with open(csv_filename, "r", newline="") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            num_header_lines += 1
+            if not row[0].startswith("#"):
+                columns = row
+                break
+            comment = row[0].lstrip("# ")
+            if comment.startswith("Saving:"):
+                metadata["dt"] = float(comment.split()[1])
+            elif comment != "Gym Log":
+                metadata["controller_name"] = comment
+    data = np.loadtxt(csv_filename, delimiter=",", skiprows=num_header_lines, dtype=np.float32, ndmin=2)
+    write_recording(csv_filename, data, {"columns": columns, **metadata})
+
+
+def convert_csv_folder(folder: str):
+    """Convert all Experiment-*.csv files in `folder` and its subfolders (e.g. Train/Validate/Test)."""
+    filenames = sorted(glob(os.path.join(folder, "**", "Experiment-*.csv"), recursive=True))
+    for filename in filenames:
+        convert_csv_recording(filename)
+    log.info(f"Converted {len(filenames)} recordings in {folder}")
+
+
+if __name__ == "__main__":
+    convert_csv_folder(sys.argv[1])
@@ -0,0 +1,104 @@
+"""
+Precompute the randomized scenarios (initial state, obstacles, terrain, target schedule) of N episodes
+and write them into one memory-mapped scenario bank.
+
+The environment is instantiated with the same seeds that `main.run_data_generator` derives from `seed_entropy`,
+so the initial state, obstacles, terrain and first target of episode i of the bank equal those episode i would have
+drawn itself. The target schedule is drawn from the same generator right after reset and replaces the draws inside
+`step`. Without a bank, these draws are interleaved with the actuator noise, so the shuffled targets of a bank are
+a different, but equally distributed and reproducible sample. The schedule covers `num_iterations` steps, a run with
+more iterations is rejected by `check_scenario_bank`.
+
+Usage:
+    python -m Utilities.build_scenario_bank
+Then set `scenario_bank: <path>` for the environment in `Environments/config_environments.yml`.
+"""
+# Specify the bank to build. Leave values as None to use the ones from config.yml
+environment_name = None
+num_episodes = None
+seed_entropy = None
+output_path = None
+
+### ------------------------------------------------------------------------------------ ###
+import os
+
+import gymnasium as gym
+import numpy as np
+from numpy.random import SeedSequence
+from SI_Toolkit.computation_library import TensorFlowLibrary
+from yaml import dump
+
+from Environments import register_envs
+from Environments.scenario_bank import get_target_schedule_length, write_scenario_bank
+from Utilities.utils import ConfigManager, get_logger
+
+logger = get_logger(__name__)
+
+
+def build_scenario_bank(
+    environment_name: str,
+    config_environment: dict,
+    seed_entropy: int,
+    num_episodes: int,
+    num_iterations: int,
+    path: str,
+):
+    seed_sequences = SeedSequence(entropy=seed_entropy).spawn(num_episodes)
+    scenarios = []
+    for i in range(num_episodes):
+        seeds = seed_sequences[i].generate_state(3)
+        config = dict(config_environment)
+        config.update({"seed": int(seeds[0]), "scenario_bank": None})
+        env = gym.make(
+            environment_name,
+            **config,
+            computation_lib=TensorFlowLibrary,
+            render_mode=None,
+        ).unwrapped
+        if not hasattr(env, "get_scenario"):
+            raise NotImplementedError(f"{environment_name} does not support scenario banks.")
+        env.reset(seed=config["seed"])
+
+        scenario = env.get_scenario()
+        if hasattr(env, "shuffle_target_every"):
+            num_shuffles = max(get_target_schedule_length(num_iterations, env.shuffle_target_every), 1)  # At least one, to keep the field
+            scenario["target_schedule"] = np.stack(
+                [env.lib.to_numpy(env.sample_target()) for _ in range(num_shuffles)]
+            )
+        scenarios.append(scenario)
+        env.close()
+
+    write_scenario_bank(path, scenarios)
+    with open(os.path.splitext(path)[0] + ".yml", "w") as f:
+        dump(
+            {
+                "environment_name": environment_name,
+                "seed_entropy": seed_entropy,
+                "num_episodes": num_episodes,
+                "num_iterations": num_iterations,
+                "config_environment": config_environment,
+            },
+            f,
+        )
+    logger.info(f"Saved scenario bank with {num_episodes} episodes to {path}")
+
+
+if __name__ == "__main__":
+    register_envs()
+    config_manager = ConfigManager(".", "Environments")
+
+    environment_name = environment_name or config_manager("config")["environment_name"]
+    num_episodes = num_episodes or config_manager("config")["num_experiments"]
+    seed_entropy = seed_entropy or config_manager("config")["seed_entropy"]
+    output_path = output_path or os.path.join(
+        "Output", "scenario_banks", f"{environment_name}_{seed_entropy}_{num_episodes}.npy"
+    )
+
+    build_scenario_bank(
+        environment_name=environment_name,
+        config_environment=dict(config_manager("config_environments")[environment_name]),
+        seed_entropy=seed_entropy,
+        num_episodes=num_episodes,
+        num_iterations=config_manager("config")["num_iterations"],
+        path=output_path,
+    )
@@ -1,23 +1,20 @@
 import csv
 import os
+from glob import glob
+from typing import Optional
 
 import pandas as pd
 from Control_Toolkit.Controllers import template_controller
 
+from Utilities.dataset_writer import atomic_write, read_manifest, write_shard
 from Utilities.utils import ConfigManager, CurrentRunMemory, get_logger
 
 log = get_logger(__name__)
 
 config_manager = ConfigManager("Environments")
 
-def save_to_csv(config, controller: template_controller, environment_name: str, path: str):
-    os.makedirs(path, exist_ok=True)
-    i = 0
-    while os.path.isfile(os.path.join(path, f"Experiment-{i}.csv")):
-        i += 1
-    filename = os.path.join(path, f"Experiment-{i}.csv")
-    log.info(f"Saving to the file {filename}")
-
+def save_to_csv(config, controller: template_controller, environment_name: str, path: str, experiment_index: Optional[int] = None):
+    # Without experiment_index, the next free Experiment-<i>.csv is allocated atomically (see Utilities.dataset_writer)
     controller_outputs = controller.get_outputs()
     states = controller_outputs["s_logged"]
     inputs = controller_outputs["u_logged"]
@@ -28,15 +25,31 @@ def save_to_csv(config, controller: template_controller, environment_name: str,
         **{f"x_{k}": states[:, k] for k in range(states.shape[1])},
         **{f"u_{k}": inputs[:, k] for k in range(inputs.shape[1])}
     })
+    columns = list(df.columns)
+    data = df.to_numpy()
     df = df.set_index("time")
 
-    with open(filename, "a", newline='') as outfile:
-        writer = csv.writer(outfile)
-        writer.writerow([f"# Gym Log"])
-        writer.writerow([f"# {CurrentRunMemory.current_controller_name}"])
-        writer.writerow([f"# Saving: {dt} s"])
+    def write(temporary_path: str):
+        with open(temporary_path, "w", newline='') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow([f"# Gym Log"])
+            writer.writerow([f"# {CurrentRunMemory.current_controller_name}"])
+            writer.writerow([f"# Saving: {dt} s"])
+            df.to_csv(outfile, header=True)
 
-    df.to_csv(filename, mode="a", header=True)
+    filename = write_shard(
+        path, ".csv", lambda p: atomic_write(p, write), data, columns, index=experiment_index,
+        stats_sample_size=config.get("normalization_sample_size", 0), controller_name=CurrentRunMemory.current_controller_name,
+    )
+    log.info(f"Saved to the file {filename}")
 
 def load_from_csv(path):
     return pd.read_csv(path).to_numpy()
+
+
+def list_recordings(folder: str) -> "list[str]":
+    """Paths of the recordings in folder, from its manifest if it has one."""
+    manifest = read_manifest(folder)
+    if len(manifest) > 0:
+        return [os.path.join(folder, entry["file"]) for entry in manifest]
+    return sorted(glob(os.path.join(folder, "Experiment-*.csv")))
@@ -0,0 +1,117 @@
+"""
+Concurrency-safe writing of recordings into a dataset folder.
+
+- Shard files are allocated with O_CREAT | O_EXCL, so two writers can never get the same index.
+- Content is written to a temporary file in the same folder and renamed onto the shard with os.replace,
+  so readers never see a partially written shard.
+- Every finished shard appends one line to `manifest.jsonl` in the folder, with a single O_APPEND write.
+  Loaders enumerate the dataset from the manifest instead of globbing the folder.
+  A shard written again under the same index (rerun with explicit indices) appends a new line,
+  `read_manifest` keeps only the last entry per index.
+  The line holds mergeable per-column statistics of the shard (see `Utilities.normalization_stats`).
+"""
+import json
+import os
+from typing import Callable, Optional
+
+import numpy as np
+
+from Utilities.normalization_stats import RunningStats
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def allocate_shard(folder: str, suffix: str, prefix: str = "Experiment", index: Optional[int] = None) -> "tuple[int, str]":
+    """Reserve `<prefix>-<index><suffix>` in folder and return (index, path).
+
+    With `index` given, exactly this shard is reserved (an existing one is overwritten later).
+    Otherwise the first free index is taken, starting the search after the shards listed in the manifest.
+    """
+    os.makedirs(folder, exist_ok=True)
+    if index is not None:
+        return index, os.path.join(folder, f"{prefix}-{index}{suffix}")
+    i = len(read_manifest(folder))
+    while True:
+        path = os.path.join(folder, f"{prefix}-{i}{suffix}")
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return i, path
+        except FileExistsError:
+            i += 1
+
+
+def atomic_write(path: str, write: "Callable[[str], None]"):
+    """Call `write(temporary_path)` and move the result onto `path` in one rename."""
+    folder, name = os.path.split(path)
+    temporary_path = os.path.join(folder, f".{name}.{os.getpid()}.tmp")
+    try:
+        write(temporary_path)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def append_manifest(folder: str, entry: dict):
+    line = (json.dumps(entry) + "\n").encode()
+    fd = os.open(os.path.join(folder, MANIFEST_NAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def read_manifest(folder: str) -> "list[dict]":
+    """Entries of the manifest in folder, one per shard index. Of repeated entries for an index the last one is kept."""
+    path = os.path.join(folder, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return []
+    entries = {}
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["index"]] = entry
+    return list(entries.values())
+
+
+def write_shard(
+    folder: str,
+    suffix: str,
+    write: "Callable[[str], None]",
+    data: np.ndarray,
+    columns: "list[str]",
+    index: Optional[int] = None,
+    stats_sample_size: int = 0,
+    **metadata,
+) -> str:
+    """Allocate a shard, write it with `write(path)` and record it in the manifest. Returns the shard path.
+
+    `write` should go through `atomic_write`, such that the shard only appears once it is complete.
+    """
+    index, path = allocate_shard(folder, suffix, index=index)
+    write(path)
+    append_manifest(
+        folder,
+        {
+            "file": os.path.basename(path),
+            "index": index,
+            "rows": int(data.shape[0]),
+            "columns": list(columns),
+            "stats": RunningStats(columns, sample_size=stats_sample_size).update(data).to_dict(),
+            **metadata,
+        },
+    )
+    return path
+
+
+def make_folder_exclusive(parent: str, prefix: str = "Experiment") -> str:
+    """Create and return the first free `<parent>/<prefix>-<i>`, atomically."""
+    i = 1
+    while True:
+        path = os.path.join(parent, f"{prefix}-{i}")
+        try:
+            os.makedirs(path, exist_ok=False)
+            return path
+        except FileExistsError:
+            i += 1
@@ -0,0 +1,151 @@
+"""
+Per-column statistics which are accumulated while episodes are recorded and can be merged across workers.
+
+Mean and variance use the parallel form of Welford's algorithm (Chan et al.), so merging the statistics of two shards
+gives the same result as computing them over the concatenated data. `std` is the sample standard deviation (ddof=1),
+as pandas computes it for the normalization info of SI_Toolkit. Optionally a uniform random sample of rows
+is kept, from which approximate quantiles are computed.
+
+The statistics of every shard are stored in the dataset manifest (see `Utilities.dataset_writer`).
+`write_normalization_info` merges them into the normalization info file which SI_Toolkit training reads,
+so no extra pass over the recordings is needed.
+"""
+import os
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+
+class RunningStats:
+    def __init__(self, columns: "list[str]", sample_size: int = 0, seed: Optional[int] = None) -> None:
+        self.columns = list(columns)
+        self.count = 0
+        self.mean = np.zeros(len(self.columns))
+        self.m2 = np.zeros(len(self.columns))
+        self.min = np.full(len(self.columns), np.inf)
+        self.max = np.full(len(self.columns), -np.inf)
+        self.sample_size = sample_size
+        self.sample = np.zeros((0, len(self.columns)))
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / max(self.count - 1, 1))
+
+    def update(self, data: np.ndarray) -> "RunningStats":
+        """Add the rows of data (rows, columns)."""
+        data = np.asarray(data, dtype=np.float64)
+        if data.shape[0] == 0:
+            return self
+        other = RunningStats(self.columns, self.sample_size)
+        other.count = data.shape[0]
+        other.mean = np.mean(data, axis=0)
+        other.m2 = np.sum((data - other.mean) ** 2, axis=0)
+        other.min = np.min(data, axis=0)
+        other.max = np.max(data, axis=0)
+        if self.sample_size > 0:
+            other.sample = data[self._rng.permutation(data.shape[0])[: self.sample_size]]
+        return self.merge(other)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Merge the statistics of other into these, in place."""
+        if other.columns != self.columns:
+            raise ValueError(f"Cannot merge statistics of columns {other.columns} into {self.columns}.")
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        if self.sample_size > 0:
+            # Each row of the merged sample comes from either side with probability proportional to its row count
+            num_from_self = self._rng.binomial(self.sample_size, self.count / count)
+            num_from_self = min(num_from_self, len(self.sample))
+            num_from_other = min(self.sample_size - num_from_self, len(other.sample))
+            self.sample = np.concatenate([
+                self.sample[self._rng.permutation(len(self.sample))[:num_from_self]],
+                other.sample[self._rng.permutation(len(other.sample))[:num_from_other]],
+            ])
+        self.count = count
+        return self
+
+    def quantiles(self, q: "list[float]") -> "dict[str, list[float]]":
+        if len(self.sample) == 0:
+            raise ValueError("No sample kept, set sample_size > 0 to estimate quantiles.")
+        values = np.quantile(self.sample, q, axis=0)
+        return {column: values[:, k].tolist() for k, column in enumerate(self.columns)}
+
+    def to_dict(self) -> dict:
+        stats = {
+            "count": int(self.count),
+            "sample_size": int(self.sample_size),
+            "columns": {
+                column: {
+                    "mean": float(self.mean[k]),
+                    "std": float(self.std[k]),
+                    "m2": float(self.m2[k]),
+                    "min": float(self.min[k]),
+                    "max": float(self.max[k]),
+                }
+                for k, column in enumerate(self.columns)
+            },
+        }
+        if self.sample_size > 0:
+            stats["sample"] = self.sample.tolist()
+        return stats
+
+    @classmethod
+    def from_dict(cls, stats: dict) -> "RunningStats":
+        columns = list(stats["columns"].keys())
+        sample = np.asarray(stats.get("sample", []), dtype=np.float64).reshape(-1, len(columns))
+        running_stats = cls(columns, sample_size=stats.get("sample_size", len(sample)))
+        running_stats.count = stats["count"]
+        for key in ["mean", "m2", "min", "max"]:
+            setattr(running_stats, key, np.array([stats["columns"][c][key] for c in columns], dtype=np.float64))
+        running_stats.sample = sample
+        return running_stats
+
+
+def merge_manifest_stats(folder: str) -> RunningStats:
+    """Merge the statistics of all shards in the manifest of folder."""
+    from Utilities.dataset_writer import read_manifest
+
+    manifest = read_manifest(folder)
+    if len(manifest) == 0:
+        raise FileNotFoundError(f"No shards listed in the manifest of {folder}.")
+    stats = RunningStats.from_dict(manifest[0]["stats"])
+    for entry in manifest[1:]:
+        stats.merge(RunningStats.from_dict(entry["stats"]))
+    return stats
+
+
+def write_normalization_info(record_path: str, split: str = "Train") -> str:
+    """Write the normalization info of the `split` recordings into the experiment folder, as SI_Toolkit training expects it.
+
+    Returns the path of the written NI_<timestamp>.csv.
+    """
+    import pandas as pd
+    from SI_Toolkit_ASF.user_defined_normalization_correction import apply_user_defined_normalization_correction
+
+    stats = merge_manifest_stats(os.path.join(record_path, split))
+    df_norm_info = pd.DataFrame(
+        [stats.mean, stats.std, stats.max, stats.min],
+        index=["mean", "std", "max", "min"],
+        columns=stats.columns,
+    )
+    df_norm_info = apply_user_defined_normalization_correction(df_norm_info)
+
+    experiment_folder = os.path.dirname(os.path.normpath(record_path))
+    filename = os.path.join(experiment_folder, f"NI_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv")
+    with open(filename, "w", newline="") as f:
+        f.write(f"# Normalization info computed from streaming statistics of {stats.count} rows in {os.path.join(record_path, split)}\n")
+        df_norm_info.to_csv(f)
+
+    if len(stats.sample) > 0:
+        quantiles = [0.01, 0.05, 0.5, 0.95, 0.99]
+        df_quantiles = pd.DataFrame(stats.quantiles(quantiles), index=[f"q{q}" for q in quantiles])
+        df_quantiles.to_csv(os.path.splitext(filename)[0] + "_quantiles.csv")
+    return filename
@@ -1,4 +1,5 @@
 from collections import OrderedDict
+import csv
 from glob import glob
 import logging
 import os
@@ -7,6 +8,7 @@ from importlib.util import find_spec
 from pathlib import Path
 import platform
 from typing import Any, Optional
+import numpy as np
 import tensorflow as tf
 import torch
 
@@ -79,6 +81,33 @@ class OutputPath:
         return os.path.join(folder, fn)
 
 
+def get_split_name(episode_index: int, num_experiments: int, frac_train: float, frac_val: float) -> str:
+    """Dataset split of an episode, determined by its index only."""
+    if episode_index < int(frac_train * num_experiments):
+        return "Train"
+    elif episode_index < int((frac_train + frac_val) * num_experiments):
+        return "Validate"
+    return "Test"
+
+
+def write_output_scalars(path: str, metrics: "dict[str, list]") -> None:
+    """Write per-episode scalar metrics as csv, one column per metric."""
+    with open(path, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(metrics.keys())
+        writer.writerows(zip(*metrics.values()))
+
+
+def print_output_metrics(metrics: "dict[str, list]") -> None:
+    # These output metrics are detected by GUILD AI and follow a "key: value" format
+    print("Output metrics:")
+    print(f"Mean total reward: {np.mean(metrics['total_rewards'])}")
+    print(f"Stdev of reward: {np.std(metrics['total_rewards'])}")
+    print(f"Timeout rate: {np.mean(metrics['timeout'])}")
+    print(f"Terminated rate: {np.mean(metrics['terminated'])}")
+    print(f"Truncated rate: {np.mean(metrics['truncated'])}")
+
+
 class SeedMemory:
     seeds = []
 
@@ -100,6 +129,7 @@ class CurrentRunMemory:
     current_optimizer_name: str
     current_environment_name: str
     current_environment: EnvironmentBatched
+    stage_durations = None  # Time span of each MPC horizon stage, set by predictors with non-uniform steps
     
 
 class ConfigManager:
@@ -1,12 +1,11 @@
 import os
 import sys
 import time
-import csv
 from datetime import datetime
 from importlib import import_module
-from tqdm import trange
+from tqdm import tqdm
 
-from typing import Any
+from typing import Any, Optional
 import gymnasium as gym
 import numpy as np
 import tensorflow as tf
@@ -16,11 +15,16 @@ from yaml import dump
 from Control_Toolkit.Controllers import template_controller
 from Control_Toolkit.Cost_Functions.cost_function_wrapper import CostFunctionWrapper
 from Control_Toolkit.others.environment import EnvironmentBatched
+from Control_Toolkit_ASF.Cost_Functions.cost_function_cache import get_cache_info, use_cached_cost_function
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import reload_cost_parameters
 from Environments import ENV_REGISTRY, register_envs
+from Environments.scenario_bank import check_scenario_bank
 from SI_Toolkit.computation_library import TensorFlowLibrary
+from Utilities.binary_recordings import save_to_binary
 from Utilities.csv_helpers import save_to_csv
 from Utilities.generate_plots import generate_experiment_plots
-from Utilities.utils import ConfigManager, CurrentRunMemory, OutputPath, SeedMemory, get_logger, nested_assignment_to_ordereddict
+from Utilities.utils import (ConfigManager, CurrentRunMemory, OutputPath, SeedMemory, get_logger, get_split_name,
+                             nested_assignment_to_ordereddict, print_output_metrics, write_output_scalars)
 
 
 sys.path.append(os.path.join(os.path.abspath("."), "CartPoleSimulation"))  # Keep allowing absolute imports within CartPoleSimulation subgit
@@ -34,7 +38,18 @@ def run_data_generator(
     config_manager: ConfigManager,
     run_for_ML_Pipeline=False,
     record_path=None,
+    episode_indices: "Optional[list[int]]" = None,
 ):
+    """Run `num_experiments` episodes, or only those in `episode_indices`.
+
+    Episode i always uses the seeds spawned for index i of `num_experiments`, so any subset of episodes
+    can be run in a separate process and reproduces exactly the same data as a full serial run.
+    Returns the scalar metrics of the episodes. They are written to `output_scalars.csv` of the run's output folder,
+    except for the ML pipeline, which merges the metrics of its parallel shards itself.
+    """
+    # Pick up edits of config_cost_function.yml without re-importing or retracing the cost functions
+    reload_cost_parameters()
+
     # Generate seeds and set timestamp
     timestamp = datetime.now()
     seed_entropy = config_manager("config")["seed_entropy"]
@@ -56,14 +71,21 @@ def run_data_generator(
     optimizer_name = "optimizer_" + optimizer_short_name.replace("-", "_")
     CurrentRunMemory.current_optimizer_name = optimizer_name
     all_metrics = dict(
+        episode_index = [],
         total_rewards = [],
         timeout = [],
         terminated = [],
         truncated = [],
     )
     
+    if episode_indices is None:
+        episode_indices = range(num_experiments)
+    check_scenario_bank(
+        config_manager("config_environments")[environment_name], num_experiments, config_manager("config")["num_iterations"]
+    )
+
     # Loop through independent experiments
-    for i in trange(num_experiments):
+    for i in tqdm(episode_indices):
         # Generate new seeds for environment and controller
         seeds = seed_sequences[i].generate_state(3)
         SeedMemory.set_seeds(seeds)
@@ -72,7 +94,7 @@ def run_data_generator(
         config_optimizer = dict(config_manager("config_optimizers")[optimizer_short_name])
         config_optimizer.update({"seed": int(seeds[1])})
         config_environment = dict(config_manager("config_environments")[environment_name])
-        config_environment.update({"seed": int(seeds[0])})
+        config_environment.update({"seed": int(seeds[0]), "episode_index": i})
         all_rewards = []
 
         ##### ----------------------------------------------- #####
@@ -109,6 +131,12 @@ def run_data_generator(
             initial_environment_attributes=env.environment_attributes,
         )
         controller.configure(optimizer_name=optimizer_short_name, predictor_specification=config_controller["predictor_specification"])
+        # Reuse the cost function compiled in an earlier episode with the same shapes
+        use_cached_cost_function(controller)
+        # Predict the horizon in the environment's compiled rollout instead of one predictor call per stage.
+        # Imported here, the module reads the environment of the run at import
+        from SI_Toolkit_ASF.predictors_customization import use_whole_horizon_rollout
+        use_whole_horizon_rollout(controller)
 
         ##### ----------------------------------------------------- #####
         ##### ----------------- MAIN CONTROL LOOP ----------------- #####
@@ -163,6 +191,7 @@ def run_data_generator(
         ##### ----------------- LOGGING AND PLOTS ----------------- #####
         OutputPath.RUN_NUM = i + 1
         controller_output = controller.get_outputs()
+        all_metrics["episode_index"].append(i)
         all_metrics["total_rewards"].append(np.mean(all_rewards))
         all_metrics["timeout"].append(float(not(terminated or truncated)))
         all_metrics["terminated"].append(float(terminated))
@@ -170,14 +199,12 @@ def run_data_generator(
 
         if run_for_ML_Pipeline:
             # Save data as csv
-            if i < int(frac_train * num_experiments):
-                csv_path = os.path.join(record_path, "Train")
-            elif i < int((frac_train + frac_val) * num_experiments):
-                csv_path = os.path.join(record_path, "Validate")
-            else:
-                csv_path = os.path.join(record_path, "Test")
+            csv_path = os.path.join(record_path, get_split_name(i, num_experiments, frac_train, frac_val))
             os.makedirs(csv_path, exist_ok=True)
-            save_to_csv(config_manager("config"), controller, environment_name, csv_path)
+            if config_manager("config").get("recording_format", "csv") == "npy":
+                save_to_binary(config_manager("config"), controller, environment_name, csv_path, experiment_index=i)
+            else:
+                save_to_csv(config_manager("config"), controller, environment_name, csv_path, experiment_index=i)
         elif config_controller.get("controller_logging", False):
             if config_manager("config")["save_plots_to_file"]:
                 # Generate and save plots in default location
@@ -202,21 +229,16 @@ def run_data_generator(
                 ) as f:
                     dump(loader.config, f)
     
+    logger.debug(f"Cost function cache: {get_cache_info()}")
+
+    if run_for_ML_Pipeline:
+        # Shards of one dataset run in parallel under the same timestamp, the pipeline merges their metrics into record_path
+        return all_metrics
+
     # Dump all saved scalar metrics as csv
-    with open(
-        OutputPath.get_output_path(timestamp_str, f"output_scalars.csv"),
-        "w",
-    ) as f:
-        writer = csv.writer(f)
-        writer.writerow(all_metrics.keys())
-        writer.writerows(zip(*all_metrics.values()))
-    # These output metrics are detected by GUILD AI and follow a "key: value" format
-    print("Output metrics:")
-    print(f"Mean total reward: {np.mean(all_metrics['total_rewards'])}")
-    print(f"Stdev of reward: {np.std(all_metrics['total_rewards'])}")
-    print(f"Timeout rate: {np.mean(all_metrics['timeout'])}")
-    print(f"Terminated rate: {np.mean(all_metrics['terminated'])}")
-    print(f"Truncated rate: {np.mean(all_metrics['truncated'])}")
+    write_output_scalars(OutputPath.get_output_path(timestamp_str, "output_scalars.csv"), all_metrics)
+    print_output_metrics(all_metrics)
+    return all_metrics
 
 
 def prepare_and_run():
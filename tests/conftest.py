@@ -0,0 +1,8 @@
+import os
+import sys
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+# Configs are loaded at import relative to the repository root, as when running main.py
+os.chdir(REPOSITORY_ROOT)
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+casadi = pytest.importorskip("casadi")
+
+from Control_Toolkit_ASF.Forces_interfaces import casadi_functions
+from Control_Toolkit_ASF.Forces_interfaces.casadi_functions import evaluate, get_compiled_function, get_function
+
+
+def quadratic(z, p):
+    return casadi.sumsqr(z - p)
+
+
+def test_function_is_built_once():
+    assert get_function(quadratic, (3, 3)) is get_function(quadratic, (3, 3))
+    assert get_function(quadratic, (3, 3)) is not get_function(quadratic, (3, 3), parameters=(1.0,))
+
+
+def test_compiled_function_matches_symbolic(tmp_path, monkeypatch):
+    monkeypatch.setattr(casadi_functions, "CACHE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(casadi_functions, "_compiled_functions", {})
+    z, p = np.array([1.0, 2.0, 3.0]), np.array([0.5, 0.0, -1.0])
+
+    compiled = get_compiled_function(quadratic, (3, 3))
+    assert float(compiled(z, p)) == pytest.approx(float(get_function(quadratic, (3, 3))(z, p)))
+    # Only the finished library is left in the shared cache, no sources or partial files
+    assert all(name.endswith(".so") and not name.startswith(".") for name in os.listdir(tmp_path))
+
+
+def test_evaluate_symbolic_and_numeric(tmp_path, monkeypatch):
+    monkeypatch.setattr(casadi_functions, "CACHE_FOLDER", str(tmp_path))
+    z, p = casadi.SX.sym("z", 3, 1), casadi.SX.sym("p", 3, 1)
+    assert isinstance(evaluate(quadratic, (z, p)), casadi.SX)
+
+    value = evaluate(quadratic, (np.array([1.0, 2.0, 3.0]), np.zeros(3)))
+    assert float(value) == pytest.approx(14.0)
+
+
+def test_cartpole_cost_matches_formula(tmp_path, monkeypatch):
+    pytest.importorskip("tensorflow")
+    pytest.importorskip("SI_Toolkit.computation_library")
+    from Control_Toolkit_ASF.Forces_interfaces.cost_forces_interface import cartpole_simulator1, cartpole_weights
+
+    monkeypatch.setattr(casadi_functions, "CACHE_FOLDER", str(tmp_path))
+    angle_weight, position_weight = cartpole_weights()
+    z, p = np.array([0.0, 0.3, 0.0, 0.1, 0.0]), np.array([0.0, 0.0, 0.0, -0.2])
+    expected = -angle_weight * np.cos(0.3) + position_weight * 0.3**2
+    assert float(cartpole_simulator1(z, p)) == pytest.approx(expected)
+
+
+def test_dynamics_are_built_once(tmp_path, monkeypatch):
+    pytest.importorskip("tensorflow")
+    pytest.importorskip("gymnasium")
+    pytest.importorskip("CartPoleSimulation")
+    pytest.importorskip("Control_Toolkit.others.environment")
+    from Control_Toolkit_ASF.Forces_interfaces.dynamics_forces_interface import pendulum_dynamics
+
+    monkeypatch.setattr(casadi_functions, "CACHE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(casadi_functions, "_functions", {})
+    s, u, p = casadi.SX.sym("s", 4, 1), casadi.SX.sym("u", 1, 1), casadi.SX.sym("p", 1, 1)
+    assert isinstance(pendulum_dynamics(s, u, p), casadi.SX)
+    pendulum_dynamics(s, u, p)
+    assert len(casadi_functions._functions) == 1
+
+    state = np.array([0.3, -1.0, np.sin(0.3), np.cos(0.3)])
+    derivative = np.asarray(pendulum_dynamics(state, np.array([0.5]), np.zeros(1))).ravel()
+    np.testing.assert_allclose(derivative, [-1.0, 15.0 * np.sin(0.3) + 3.0 * 0.5], rtol=1e-6)
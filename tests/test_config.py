@@ -0,0 +1,11 @@
+import yaml
+
+
+def test_config_top_level_keys():
+    with open("config.yml", "r") as f:
+        config = yaml.load(f, Loader=yaml.FullLoader)
+
+    frac_train, frac_val = config["split"]
+    assert isinstance(frac_train, float) and isinstance(frac_val, float)
+    assert config["recording_format"] in ["csv", "npy"]
+    assert isinstance(config["normalization_sample_size"], int)
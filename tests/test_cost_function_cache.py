@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("Control_Toolkit.Cost_Functions")
+
+from SI_Toolkit.computation_library import TensorFlowLibrary
+
+from Control_Toolkit_ASF.Cost_Functions.cost_function_cache import (
+    clear_cost_function_cache,
+    get_cache_info,
+    get_cost_function,
+    use_cached_cost_function,
+)
+
+
+class terrain:
+    def __init__(self, heights):
+        self.lib = TensorFlowLibrary
+        self.heights = tf.Variable(heights, dtype=tf.float32)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cost_function_cache()
+    yield
+    clear_cost_function_cache()
+
+
+def make_variable_parameters(target, heights):
+    return SimpleNamespace(target_point=tf.Variable(target, dtype=tf.float32), terrain=terrain(heights))
+
+
+def test_hit_hands_cached_variables_to_the_new_parameters():
+    first = make_variable_parameters([0.0, 0.0], [0.0, 0.0, 0.0])
+    second = make_variable_parameters([1.0, 2.0], [1.0, 1.0, 1.0])
+    cost_function = get_cost_function("pendulum_batched", "default", first, TensorFlowLibrary, 10, 4)
+
+    assert get_cost_function("pendulum_batched", "default", second, TensorFlowLibrary, 10, 4) is cost_function
+    assert get_cache_info() == {"hits": 1, "misses": 1, "size": 1}
+    assert second.target_point is cost_function.variable_parameters.target_point
+    np.testing.assert_allclose(cost_function.variable_parameters.target_point.numpy(), [1.0, 2.0])
+    np.testing.assert_allclose(cost_function.variable_parameters.terrain.heights.numpy(), [1.0, 1.0, 1.0])
+
+    # Updates during the episode are written into the parameters of the new controller
+    second.target_point.assign([3.0, 4.0])
+    np.testing.assert_allclose(cost_function.variable_parameters.target_point.numpy(), [3.0, 4.0])
+
+
+def test_changed_shape_rebuilds():
+    get_cost_function("pendulum_batched", "default", make_variable_parameters([0.0, 0.0], [0.0]), TensorFlowLibrary, 10, 4)
+    get_cost_function("pendulum_batched", "default", make_variable_parameters([0.0, 0.0, 0.0], [0.0]), TensorFlowLibrary, 10, 4)
+    assert get_cache_info() == {"hits": 0, "misses": 2, "size": 1}
+
+
+def test_controller_gets_the_cached_cost_function():
+    controllers = []
+    for target in ([0.0, 0.0], [1.0, 2.0]):
+        variable_parameters = make_variable_parameters(target, [0.0])
+        cost_function = get_cost_function("pendulum_batched", "default", variable_parameters, TensorFlowLibrary, 10, 4)
+        clear_cost_function_cache()  # Each controller builds its own cost function
+        controllers.append(
+            SimpleNamespace(
+                cost_function=SimpleNamespace(cost_function=cost_function),
+                optimizer=SimpleNamespace(mpc_horizon=10, num_rollouts=4),
+                variable_parameters=variable_parameters,
+            )
+        )
+
+    for controller in controllers:
+        use_cached_cost_function(controller)
+    assert controllers[1].cost_function.cost_function is controllers[0].cost_function.cost_function
+    assert controllers[1].variable_parameters.target_point is controllers[0].variable_parameters.target_point
+    assert get_cache_info()["hits"] == 1
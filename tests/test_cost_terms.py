@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("gymnasium")
+pytest.importorskip("matplotlib")
+pytest.importorskip("Control_Toolkit.Cost_Functions")
+
+from SI_Toolkit.computation_library import TensorFlowLibrary
+
+from Control_Toolkit_ASF.Cost_Functions.cost_parameters import get_cost_parameters
+from Control_Toolkit_ASF.Cost_Functions.dubins_car_batched.default import default
+from Environments.dubins_car_batched import THRESHOLD_DISTANCE_2_GOAL
+
+TARGET = np.array([0.5, -0.2, 0.0], dtype=np.float32)
+OBSTACLES = np.array([[0.0, 0.0, 0.3], [-0.4, 0.5, 0.2]], dtype=np.float32)
+
+
+def make_cost_function():
+    variable_parameters = SimpleNamespace(target_point=tf.Variable(TARGET), obstacle_positions=tf.constant(OBSTACLES))
+    return default(variable_parameters=variable_parameters, ComputationLib=TensorFlowLibrary)
+
+
+def make_trajectories():
+    rng = np.random.default_rng(0)
+    states = rng.uniform([-1.2, -1.2, -np.pi, -1.0], [1.2, 1.2, np.pi, 1.0], (16, 10, 4)).astype(np.float32)
+    states[0, :3, :2] = TARGET[:2]  # Some stages at the target
+    inputs = rng.uniform(-1.0, 1.0, (16, 10, 2)).astype(np.float32)
+    return states, inputs
+
+
+def hand_written_stage_cost(states: np.ndarray) -> np.ndarray:
+    """The dubins car stage cost as it was written before it was composed from terms."""
+    w = get_cost_parameters("dubins_car_batched", "default")
+    x, y = states[..., 0], states[..., 1]
+    in_bounds = (np.abs(x) < 1.0) & (np.abs(y) < 1.0)
+    at_target = (np.abs(x - TARGET[0]) < THRESHOLD_DISTANCE_2_GOAL) & (np.abs(y - TARGET[1]) < THRESHOLD_DISTANCE_2_GOAL)
+    squared_distance_to_obstacles = (x[..., None] - OBSTACLES[:, 0]) ** 2 + (y[..., None] - OBSTACLES[:, 1]) ** 2
+    obstacle_proximity = np.max(1.0 - np.minimum(1.0, squared_distance_to_obstacles / OBSTACLES[:, 2] ** 2), -1)
+    return (
+        -w["goal_bonus"] * (in_bounds & at_target)
+        + (in_bounds & ~at_target) * (
+            w["squared_distance_to_target"] * ((x - TARGET[0]) ** 2 + (y - TARGET[1]) ** 2)
+            + w["obstacle_proximity"] * obstacle_proximity
+        )
+        + w["out_of_bounds"] * ~in_bounds
+    )
+
+
+def test_composed_cost_matches_hand_written_cost():
+    states, inputs = make_trajectories()
+    cost = make_cost_function()._get_stage_cost(tf.constant(states), tf.constant(inputs), tf.constant(inputs[:, 0, :]))
+    np.testing.assert_allclose(cost.numpy(), hand_written_stage_cost(states), rtol=1e-5, atol=1e-6)
+
+
+def test_zero_weight_terms_and_shared_intermediates_are_computed_once(monkeypatch):
+    cost_function = make_cost_function()
+    calls = []
+
+    def get_positions(states):
+        calls.append("positions")
+        return [states[..., 0], states[..., 1]]
+
+    def get_heading(states):
+        raise AssertionError("The heading terms have weight 0 and must not be computed.")
+
+    monkeypatch.setattr(cost_function, "get_positions", get_positions)
+    monkeypatch.setattr(cost_function, "get_heading", get_heading)
+    states, inputs = make_trajectories()
+    cost_function._get_stage_cost(tf.constant(states), tf.constant(inputs), tf.constant(inputs[:, 0, :]))
+    assert calls == ["positions"]
+
+
+def test_term_statistics_add_up():
+    states, inputs = make_trajectories()
+    statistics = make_cost_function().get_term_statistics(tf.constant(states), tf.constant(inputs[:, :-1, :]))
+    assert set(statistics) == {"goal_bonus", "squared_distance_to_target", "obstacle_proximity", "out_of_bounds"}
+    assert sum(s["share"] for s in statistics.values()) == pytest.approx(1.0)
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Utilities.dataset_writer import allocate_shard, atomic_write, read_manifest, write_shard
+
+COLUMNS = ["x_0", "u_0"]
+
+
+def write_text(path: str):
+    atomic_write(path, lambda temporary_path: open(temporary_path, "w").write("data\n"))
+
+
+def test_allocated_shards_are_distinct(tmp_path):
+    folder = str(tmp_path)
+    indices = [allocate_shard(folder, ".csv")[0] for _ in range(3)]
+    assert indices == [0, 1, 2]
+
+    # A shard file which is not in the manifest yet (writer still running) is not handed out again
+    open(os.path.join(folder, "Experiment-3.csv"), "w").close()
+    assert allocate_shard(folder, ".csv")[0] == 4
+
+
+def test_shards_are_listed_in_manifest(tmp_path):
+    folder = str(tmp_path)
+    paths = [write_shard(folder, ".csv", write_text, np.ones((2, 2)), COLUMNS) for _ in range(2)]
+
+    manifest = read_manifest(folder)
+    assert [entry["file"] for entry in manifest] == [os.path.basename(p) for p in paths]
+    assert [entry["index"] for entry in manifest] == [0, 1]
+    assert not any(name.endswith(".tmp") for name in os.listdir(folder))
+
+
+def test_rewritten_shard_keeps_last_manifest_entry(tmp_path):
+    folder = str(tmp_path)
+    write_shard(folder, ".csv", write_text, np.ones((2, 2)), COLUMNS, index=0)
+    write_shard(folder, ".csv", write_text, np.ones((2, 2)), COLUMNS, index=1)
+    write_shard(folder, ".csv", write_text, np.zeros((5, 2)), COLUMNS, index=0)
+
+    manifest = read_manifest(folder)
+    assert [entry["index"] for entry in manifest] == [0, 1]
+    assert manifest[0]["rows"] == 5
+    assert manifest[0]["stats"]["columns"]["x_0"]["mean"] == 0.0
@@ -0,0 +1,39 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("tensorflow")
+pytest.importorskip("Control_Toolkit.Cost_Functions")
+
+from SI_Toolkit.computation_library import NumpyLibrary
+
+from Control_Toolkit_ASF.Cost_Functions.discounted_cost import discounted_cost_function_base
+from Utilities.utils import CurrentRunMemory
+
+
+class squared_state_cost(discounted_cost_function_base):
+    def _get_stage_cost(self, states, inputs, previous_input):
+        return self.lib.sum(states**2, -1)
+
+    def get_terminal_cost(self, terminal_states):
+        return self.lib.sum(terminal_states, -1)
+
+
+@pytest.fixture
+def stage_durations():
+    CurrentRunMemory.stage_durations = np.array([0.02, 0.02, 0.04, 0.08], dtype=np.float32)
+    yield CurrentRunMemory.stage_durations
+    CurrentRunMemory.stage_durations = None
+
+
+@pytest.mark.parametrize("discount_factor", [None, 0.9])
+def test_trajectory_cost_weights_stages_by_duration(stage_durations, discount_factor):
+    cost_function = squared_state_cost(variable_parameters=None, ComputationLib=NumpyLibrary)
+    cost_function.discount_factor = discount_factor
+    rng = np.random.default_rng(0)
+    state_horizon = rng.normal(size=(3, 5, 2)).astype(np.float32)
+    inputs = rng.normal(size=(3, 4, 1)).astype(np.float32)
+
+    discount = 1.0 if discount_factor is None else discount_factor
+    weights = discount ** np.arange(1, 5) * stage_durations / stage_durations[0]
+    expected = np.sum(state_horizon[:, :-1, :] ** 2, -1) @ weights + np.sum(state_horizon[:, -1, :], -1)
+    np.testing.assert_allclose(cost_function.get_trajectory_cost(state_horizon, inputs), expected, rtol=1e-5)
@@ -0,0 +1,16 @@
+import pytest
+
+from Environments import ENV_METADATA, get_env_class
+
+
+@pytest.mark.parametrize("identifier", list(ENV_METADATA))
+def test_metadata_matches_environment_class(identifier):
+    metadata = ENV_METADATA[identifier]
+    for dependency in ("numpy", "tensorflow", "gymnasium", "Control_Toolkit.others.environment") + metadata["heavy_dependencies"]:
+        pytest.importorskip(dependency)
+    try:
+        cls = get_env_class(identifier)
+    except ImportError as error:
+        pytest.skip(f"{metadata['entry_point']} cannot be imported: {error}")
+
+    assert (metadata["num_states"], metadata["num_actions"]) == (cls.num_states, cls.num_actions)
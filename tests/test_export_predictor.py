@@ -0,0 +1,59 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("SI_Toolkit.Functions.General.Initialization")
+
+from SI_Toolkit_ASF import export_predictor
+from SI_Toolkit_ASF.export_predictor import FEATURES_FILE, export_features, export_saved_model, frozen_predictor, load_exported_predictor
+
+NET_INFO = SimpleNamespace(inputs=["u_0", "x_1"], outputs=["x_1"], normalize=True, normalization_type="minmax_sym")
+NORMALIZATION_INFO = pd.DataFrame(
+    {"u_0": [0.0, 1.0, 1.0, -1.0], "x_1": [0.5, 2.0, 3.0, -2.0]}, index=["mean", "std", "max", "min"]
+)
+
+
+def make_predictor():
+    tf.random.set_seed(0)
+    net = tf.keras.Sequential([
+        tf.keras.Input((None, 2)),
+        tf.keras.layers.GRU(8, return_sequences=True),
+        tf.keras.layers.Dense(1),
+    ])
+    return net, frozen_predictor(net, NET_INFO, NORMALIZATION_INFO)
+
+
+def test_recurrent_state_is_carried_between_calls():
+    net, predictor = make_predictor()
+    net_input = np.random.default_rng(0).uniform(-1.0, 1.0, (4, 2, 2)).astype(np.float32)
+
+    # Raw outputs of the Keras network over the whole sequence, with minmax_sym normalization
+    expected = net((net_input - [0.0, 0.5]) / [1.0, 2.5]).numpy() * 2.5 + 0.5
+
+    states = [np.zeros((4, 8), dtype=np.float32)]
+    first, states = predictor.predict(net_input[:, :1], states)
+    second, _ = predictor.predict(net_input[:, 1:], states)
+    np.testing.assert_allclose(np.concatenate([first, second], 1), expected, rtol=1e-5, atol=1e-5)
+
+
+def test_exported_predictor_matches_frozen_network(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_predictor, "time_series_length", 1)
+    _, predictor = make_predictor()
+    export_features(NET_INFO, predictor, os.path.join(tmp_path, FEATURES_FILE))
+    export_saved_model(predictor, os.path.join(tmp_path, "saved_model"))
+    exported = load_exported_predictor(os.path.join(tmp_path, "saved_model"), state_names=["x_1"])
+
+    exported.update(np.array([0.3], dtype=np.float32), np.array([1.0], dtype=np.float32))
+    _, states = predictor.predict(np.array([[[0.3, 1.0]]], dtype=np.float32), [np.zeros((1, 8), dtype=np.float32)])
+    Q = np.full((3, 2, 1), 0.5, dtype=np.float32)
+    prediction = exported.predict(np.array([1.5], dtype=np.float32), Q)
+
+    s, states = np.full((3, 1), 1.5, dtype=np.float32), [np.repeat(states[0].numpy(), 3, 0)]
+    for k in range(2):
+        output, states = predictor.predict(np.concatenate([Q[:, k:k + 1, :], s[:, np.newaxis, :]], -1), states)
+        s = output.numpy()[:, -1, :]
+        np.testing.assert_allclose(prediction[:, k + 1, :], s, rtol=1e-4, atol=1e-4)
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("SI_Toolkit.Functions.TF.Compile")
+
+from SI_Toolkit_ASF.predictors_customization_tf import FEATURE_AUGMENTATION, STATE_VARIABLES, predictor_output_augmentation_tf
+
+if len(STATE_VARIABLES) < 4:
+    pytest.skip("The environment of config.yml has too few state variables", allow_module_level=True)
+
+OUTPUTS = list(STATE_VARIABLES[:2])
+AUGMENTED = list(STATE_VARIABLES[2:4])
+
+
+def test_unknown_operand_is_rejected():
+    with pytest.raises(ValueError, match=f"{OUTPUTS[0]} - target"):
+        predictor_output_augmentation_tf(
+            SimpleNamespace(outputs=OUTPUTS), feature_augmentation={AUGMENTED[0]: f"{OUTPUTS[0]} - target"}
+        )
+    with pytest.raises(ValueError, match=f"sin\\({AUGMENTED[1]}\\)"):
+        predictor_output_augmentation_tf(
+            SimpleNamespace(outputs=OUTPUTS), feature_augmentation={AUGMENTED[0]: f"sin({AUGMENTED[1]})"}
+        )
+
+
+def test_unparseable_expression_is_rejected():
+    with pytest.raises(ValueError, match="tan"):
+        predictor_output_augmentation_tf(
+            SimpleNamespace(outputs=OUTPUTS), feature_augmentation={AUGMENTED[0]: f"tan({OUTPUTS[0]})"}
+        )
+
+
+def test_augment_matches_direct_computation():
+    a, b = OUTPUTS
+    augmentation = predictor_output_augmentation_tf(
+        SimpleNamespace(outputs=OUTPUTS), feature_augmentation={AUGMENTED[0]: f"{a} * 2.0", AUGMENTED[1]: f"cos({b})"}
+    )
+    assert augmentation.get_features_augmentation() == AUGMENTED
+
+    net_output = tf.random.uniform([3, 5, 2], dtype=tf.float32)
+    augmented = augmentation.augment(net_output).numpy()
+    expected = np.concatenate(
+        [net_output.numpy(), 2.0 * net_output.numpy()[..., :1], np.cos(net_output.numpy()[..., 1:])], axis=-1
+    )
+    np.testing.assert_allclose(augmented, expected, rtol=1e-6)
+
+
+def test_pendulum_spec_matches_pendulum_states():
+    pytest.importorskip("gymnasium")
+    pytest.importorskip("torch")
+    from SI_Toolkit.computation_library import NumpyLibrary
+
+    from Environments.pendulum_batched import pendulum_batched
+
+    env = pendulum_batched(batch_size=6, computation_lib=NumpyLibrary, dt=0.05, actuator_noise=[0.0], seed=0)
+    env.reset()
+    rng = np.random.default_rng(0)
+    states = env.step_dynamics(env.state, rng.uniform(-2.0, 2.0, (6, 1)).astype(np.float32), env.dt)
+
+    # A network predicting [th, thdot], the columns x_0, x_1 of the recordings
+    augmentation = predictor_output_augmentation_tf(
+        SimpleNamespace(outputs=["x_0", "x_1"]), feature_augmentation=FEATURE_AUGMENTATION["Pendulum-v0"]
+    )
+    assert augmentation.get_features_augmentation() == ["x_2", "x_3"]
+    assert list(augmentation.get_indices_augmentation()) == [2, 3]
+    augmented = augmentation.augment(tf.constant(states[:, :2], dtype=tf.float32)).numpy()
+    np.testing.assert_allclose(augmented, states, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("torch")
+pytest.importorskip("gymnasium")
+pytest.importorskip("Control_Toolkit.others.environment")
+
+from SI_Toolkit import computation_library
+
+from Environments.continuous_cartpole_batched import continuous_cartpole_batched
+from Environments.continuous_mountaincar_batched import continuous_mountaincar_batched
+from Environments.pendulum_batched import pendulum_batched
+
+LIBRARY_NAMES = ["NumpyLibrary", "TensorFlowLibrary"]
+BATCH_SIZE, HORIZON = 4, 7
+
+
+def get_reward(env, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+    """Reward of (B, H) states and actions, checking that get_reward leaves the environment unchanged."""
+    attributes = dict(vars(env))
+    lib = env.lib
+    reward = lib.to_numpy(env.get_reward(lib.to_tensor(states, lib.float32), lib.to_tensor(actions, lib.float32)))
+    assert all(vars(env)[name] is value for name, value in attributes.items())
+    assert reward.shape == (BATCH_SIZE, HORIZON)
+    return reward
+
+
+@pytest.mark.parametrize("library_name", LIBRARY_NAMES)
+def test_pendulum_reward(library_name):
+    env = pendulum_batched(computation_lib=getattr(computation_library, library_name), dt=0.05, actuator_noise=[0.0], seed=0)
+    rng = np.random.default_rng(0)
+    th, thdot = rng.uniform(-3 * np.pi, 3 * np.pi, (BATCH_SIZE, HORIZON)), rng.uniform(-8.0, 8.0, (BATCH_SIZE, HORIZON))
+    u = rng.uniform(-2.0, 2.0, (BATCH_SIZE, HORIZON, 1))
+
+    reward = get_reward(env, np.stack([th, thdot, np.sin(th), np.cos(th)], -1), u)
+    th_normalized = ((th + np.pi) % (2 * np.pi)) - np.pi
+    np.testing.assert_allclose(reward, -(th_normalized**2 + 0.1 * thdot**2 + 0.001 * u[..., 0] ** 2), rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize("library_name", LIBRARY_NAMES)
+def test_mountaincar_reward(library_name):
+    env = continuous_mountaincar_batched(computation_lib=getattr(computation_library, library_name), dt=1.0, actuator_noise=[0.0], seed=0)
+    rng = np.random.default_rng(1)
+    position, velocity = rng.uniform(0.3, 0.6, (BATCH_SIZE, HORIZON)), rng.uniform(-0.02, 0.02, (BATCH_SIZE, HORIZON))
+    u = rng.uniform(-1.0, 1.0, (BATCH_SIZE, HORIZON, 1))
+
+    reward = get_reward(env, np.stack([position, velocity], -1), u)
+    at_goal = (position >= env.goal_position) & (velocity >= env.goal_velocity)
+    np.testing.assert_allclose(reward, 100.0 * at_goal - 0.1 * u[..., 0] ** 2, rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("library_name", LIBRARY_NAMES)
+def test_cartpole_reward(library_name):
+    env = continuous_cartpole_batched(computation_lib=getattr(computation_library, library_name), dt=0.02, actuator_noise=[0.0], seed=0)
+    rng = np.random.default_rng(2)
+    states = rng.uniform([-3.0, -1.0, -0.3, -1.0], [3.0, 1.0, 0.3, 1.0], (BATCH_SIZE, HORIZON, 4))
+    states[0, 0] = [env.x_threshold + 0.1, 0.0, 0.0, 0.0]  # Cart off the track
+
+    reward = get_reward(env, states, np.zeros((BATCH_SIZE, HORIZON, 1)))
+    upright = (np.abs(states[..., 0]) <= env.x_threshold) & (np.abs(states[..., 2]) <= env.theta_threshold_radians)
+    np.testing.assert_array_equal(reward, upright.astype(np.float32))
+    # Unlike gymnasium, which pays 1 on the terminating step, a terminal state is worth 0
+    assert reward[0, 0] == 0.0
+
+
+def test_cartpole_simulator_reward_is_negative_cost():
+    pytest.importorskip("CartPoleSimulation")
+    from SI_Toolkit.computation_library import TensorFlowLibrary
+
+    from Control_Toolkit_ASF.Cost_Functions.cartpole_simulator_batched.default import default
+    from Environments.cartpole_simulator_batched import cartpole_simulator_batched
+
+    env = cartpole_simulator_batched(
+        computation_lib=TensorFlowLibrary, render_mode=None, actuator_noise=[0.0], dt=0.02, mode="stabilization",
+        cart_length=4.4e-2, usable_track_length=44.0e-2, u_max=2.62, seed=0, shuffle_target_every=100,
+    )
+    env.reset()
+    cost_function = default(variable_parameters=SimpleNamespace(target_position=env.target_position), ComputationLib=TensorFlowLibrary)
+    rng = np.random.default_rng(3)
+    angle, position = rng.uniform(-np.pi, np.pi, (BATCH_SIZE, HORIZON)), rng.uniform(-0.2, 0.2, (BATCH_SIZE, HORIZON))
+    zeros = np.zeros_like(angle)
+    states = np.stack([angle, zeros, np.cos(angle), np.sin(angle), position, zeros], -1).astype(np.float32)
+    inputs = np.zeros((BATCH_SIZE, HORIZON, 1), dtype=np.float32)
+
+    reward = get_reward(env, states, inputs)
+    cost = cost_function._get_stage_cost(tf.constant(states), tf.constant(inputs), tf.constant(inputs[:, 0, :])).numpy()
+    np.testing.assert_allclose(reward, -cost, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,20 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("tensorflow")
+pytest.importorskip("yaml")
+pytest.importorskip("Control_Toolkit.others.environment")
+
+from SI_Toolkit_ASF.run_data_generator_for_ML_Pipeline import merge_output_scalars
+
+
+def test_shard_metrics_are_merged_by_episode():
+    shard_metrics = [
+        {"episode_index": [2, 3], "total_rewards": [-2.0, -3.0], "terminated": [0.0, 1.0]},
+        {"episode_index": [0, 1], "total_rewards": [0.0, -1.0], "terminated": [1.0, 0.0]},
+    ]
+    assert merge_output_scalars(shard_metrics) == {
+        "episode_index": [0, 1, 2, 3],
+        "total_rewards": [0.0, -1.0, -2.0, -3.0],
+        "terminated": [1.0, 0.0, 0.0, 1.0],
+    }
@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Utilities.normalization_stats import RunningStats
+
+COLUMNS = ["x_0", "x_1", "u_0"]
+
+
+def make_data(rows: int, seed: int):
+    return np.random.default_rng(seed).normal(loc=[0.0, 3.0, -1.0], scale=[1.0, 0.1, 5.0], size=(rows, len(COLUMNS)))
+
+
+def test_merged_shards_equal_whole():
+    shards = [make_data(rows, seed) for seed, rows in enumerate([7, 1, 30, 12])]
+    data = np.concatenate(shards)
+
+    merged = RunningStats.from_dict(RunningStats(COLUMNS).update(shards[0]).to_dict())
+    for shard in shards[1:]:
+        merged.merge(RunningStats.from_dict(RunningStats(COLUMNS).update(shard).to_dict()))
+
+    assert merged.count == len(data)
+    np.testing.assert_allclose(merged.mean, data.mean(axis=0))
+    np.testing.assert_allclose(merged.std, data.std(axis=0, ddof=1))
+    np.testing.assert_array_equal(merged.min, data.min(axis=0))
+    np.testing.assert_array_equal(merged.max, data.max(axis=0))
+
+
+def test_sample_size_survives_round_trip():
+    # The shard has fewer rows than the configured sample size, the merged sample may still grow up to it
+    stats = RunningStats(COLUMNS, sample_size=50, seed=0).update(make_data(10, 0))
+    restored = RunningStats.from_dict(stats.to_dict())
+    assert restored.sample_size == 50
+    np.testing.assert_array_equal(restored.sample, stats.sample)
+
+    restored.merge(RunningStats(COLUMNS, sample_size=50, seed=1).update(make_data(100, 1)))
+    assert len(restored.sample) == 50
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("tensorflow")
+pytest.importorskip("Control_Toolkit.others.environment")
+
+from SI_Toolkit.computation_library import NumpyLibrary
+
+from Environments.rollout import RolloutMixin
+from SI_Toolkit_ASF.predictors_customization import next_state_predictor_ODE
+from Utilities.utils import CurrentRunMemory
+
+
+class integrator(RolloutMixin):
+    lib = NumpyLibrary
+    dt = 0.1
+
+    def __init__(self):
+        self.unwrapped = self
+
+    def step_dynamics(self, state, action, dt):
+        return state + action * dt
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    env = integrator()
+    monkeypatch.setattr(CurrentRunMemory, "current_environment", env, raising=False)
+    monkeypatch.setattr(CurrentRunMemory, "stage_durations", None, raising=False)
+    return env
+
+
+def test_multi_fidelity_horizon_is_not_run_stage_by_stage(environment):
+    predictor = next_state_predictor_ODE(dt=0.1, intermediate_steps=1, batch_size=2, fine_horizon=2)
+    with pytest.raises(ValueError, match="fine_horizon"):
+        predictor.step(np.zeros((2, 1), dtype=np.float32), np.ones((2, 1), dtype=np.float32))
+
+    states = predictor.predict_horizon(np.zeros((2, 1), dtype=np.float32), np.ones((2, 4, 1), dtype=np.float32))
+    np.testing.assert_allclose(CurrentRunMemory.stage_durations, [0.1, 0.1, 0.15, 0.225], rtol=1e-6)
+    np.testing.assert_allclose(states[0, :, 0], np.cumsum([0.0, 0.1, 0.1, 0.15, 0.225]), rtol=1e-6)
+
+
+def test_multi_fidelity_horizon_needs_rollout(monkeypatch):
+    env = SimpleNamespace(step_dynamics=lambda s, a, dt: s + a * dt, unwrapped=SimpleNamespace(), lib=NumpyLibrary)
+    monkeypatch.setattr(CurrentRunMemory, "current_environment", env, raising=False)
+    with pytest.raises(ValueError, match="multi-fidelity"):
+        next_state_predictor_ODE(dt=0.1, intermediate_steps=1, batch_size=2, fine_horizon=2)
+
+
+def test_controller_predicts_whole_horizons(environment):
+    from SI_Toolkit_ASF.predictors_customization import use_whole_horizon_rollout
+
+    next_step_predictor = next_state_predictor_ODE(dt=0.1, intermediate_steps=2, batch_size=2)
+    predictor = SimpleNamespace(next_step_predictor=next_step_predictor, predict_tf=None)
+    controller = SimpleNamespace(optimizer=SimpleNamespace(predictor=SimpleNamespace(predictor=predictor)))
+    assert use_whole_horizon_rollout(controller)
+
+    s, Q = np.zeros((2, 1), dtype=np.float32), np.ones((2, 3, 1), dtype=np.float32)
+    expected = [s]
+    for k in range(3):
+        expected.append(next_step_predictor.step(expected[-1], Q[:, k, :]))
+    np.testing.assert_allclose(predictor.predict_tf(s, Q), np.stack(expected, 1), rtol=1e-6)
+
+    assert not use_whole_horizon_rollout(SimpleNamespace(optimizer=SimpleNamespace(predictor=None)))
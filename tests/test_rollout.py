@@ -0,0 +1,107 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("tensorflow")
+
+from SI_Toolkit.computation_library import NumpyLibrary
+
+from Environments.rollout import RolloutMixin
+
+
+class integrator(RolloutMixin):
+    """Single integrator s' = s + a * dt, which ends at s >= 1."""
+
+    lib = NumpyLibrary
+    dt = 1.0
+
+    def step_dynamics(self, state, action, dt):
+        return state + action * dt
+
+    def get_terminal_mask(self, states):
+        return states[:, 0] >= 1.0
+
+
+class squared_state_cost:
+    supports_stagewise_cost = True
+
+    def get_stage_weights(self, horizon, dtype):
+        return np.linspace(1.0, 2.0, horizon, dtype=np.float32)[:, np.newaxis]
+
+    def get_weighted_single_stage_cost(self, states, inputs, previous_input, stage_weight, stage_weights_sum):
+        return stage_weight * np.sum(states**2, -1)
+
+    def finish_trajectory_cost(self, weighted_stage_costs, terminal_states, horizon):
+        return weighted_stage_costs + 10.0 * np.sum(terminal_states**2, -1)
+
+
+def test_compaction_without_terminations_matches_full_rollout():
+    rng = np.random.default_rng(0)
+    initial_states = rng.uniform(-0.5, 0.0, (16, 1)).astype(np.float32)
+    actions = rng.uniform(-0.05, 0.05, (16, 6, 1)).astype(np.float32)
+    env, cost_function = integrator(), squared_state_cost()
+
+    np.testing.assert_allclose(
+        env.rollout_with_cost(initial_states, actions, cost_function, compaction_threshold=0.5),
+        env.rollout_with_cost(initial_states, actions, cost_function),
+        rtol=1e-6,
+    )
+
+
+def test_terminated_lane_is_not_cheaper_than_surviving_in_its_state():
+    initial_states = np.zeros((4, 1), dtype=np.float32)
+    actions = np.zeros((4, 6, 1), dtype=np.float32)
+    actions[:3, 0, 0] = 2.0  # Three lanes end after the first step, which also triggers a compaction
+    actions[3, :, 0] = 0.1
+    env, cost_function = integrator(), squared_state_cost()
+
+    # Without compaction the lanes keep their final state under zero actions, as a terminated lane is assumed to
+    compacted = env.rollout_with_cost(initial_states, actions, cost_function, compaction_threshold=0.5)
+    surviving = env.rollout_with_cost(initial_states, actions, cost_function)
+    assert np.all(compacted >= surviving - 1e-5)
+    np.testing.assert_allclose(compacted, surviving, rtol=1e-6)
+
+
+def test_rollout_with_cost_matches_cost_of_rollout():
+    rng = np.random.default_rng(1)
+    initial_states = rng.uniform(-1.0, 0.0, (8, 1)).astype(np.float32)
+    actions = rng.uniform(-0.1, 0.1, (8, 5, 1)).astype(np.float32)
+    env, cost_function = integrator(), squared_state_cost()
+
+    states = env.rollout(initial_states, actions)
+    stage_weights = cost_function.get_stage_weights(5, np.float32)[:, 0]
+    expected = np.sum(stage_weights * np.sum(states[:, :-1, :] ** 2, -1), -1) + 10.0 * np.sum(states[:, -1, :] ** 2, -1)
+    np.testing.assert_allclose(env.rollout_with_cost(initial_states, actions, cost_function), expected, rtol=1e-6)
+
+
+def test_rollout_with_stage_durations():
+    initial_states = np.zeros((2, 1), dtype=np.float32)
+    actions = np.ones((2, 3, 1), dtype=np.float32)
+    states = integrator().rollout(initial_states, actions, dt=np.array([0.5, 1.0, 2.0]), intermediate_steps=4)
+    np.testing.assert_allclose(states[:, :, 0], [[0.0, 0.5, 1.5, 3.5]] * 2, rtol=1e-6)
+
+
+@pytest.mark.parametrize("library_name", ["NumpyLibrary", "TensorFlowLibrary"])
+def test_rollout_matches_step_loop(library_name):
+    pytest.importorskip("gymnasium")
+    pytest.importorskip("torch")
+    from SI_Toolkit import computation_library
+
+    from Environments.pendulum_batched import pendulum_batched
+
+    lib = getattr(computation_library, library_name)
+    env = pendulum_batched(batch_size=8, computation_lib=lib, dt=0.05, actuator_noise=[0.0], seed=0)
+    rng = np.random.default_rng(2)
+    th, thdot = rng.uniform(-np.pi, np.pi, 8), rng.uniform(-1.0, 1.0, 8)
+    initial_states = np.stack([th, thdot, np.sin(th), np.cos(th)], 1).astype(np.float32)
+    actions = rng.uniform(-2.0, 2.0, (8, 6, 1)).astype(np.float32)
+
+    # With TensorFlow this runs the compiled while_loop, which must agree with stepping one call at a time
+    states = env.rollout(lib.to_tensor(initial_states, lib.float32), lib.to_tensor(actions, lib.float32), intermediate_steps=2)
+
+    s = lib.to_tensor(initial_states, lib.float32)
+    expected = [initial_states]
+    for k in range(actions.shape[1]):
+        for _ in range(2):
+            s = env.step_dynamics(s, lib.to_tensor(actions[:, k, :], lib.float32), 0.025)
+        expected.append(lib.to_numpy(s))
+    np.testing.assert_allclose(lib.to_numpy(states), np.stack(expected, 1), rtol=1e-5, atol=1e-6)
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Environments.scenario_bank import ScenarioBank, check_scenario_bank, get_target_schedule_length, write_scenario_bank
+
+
+def make_bank(tmp_path, num_shuffles: int) -> str:
+    path = os.path.join(tmp_path, "bank.npy")
+    scenarios = [
+        {
+            "initial_state": np.full(4, i, dtype=np.float32),
+            "obstacle_positions": np.full((2 + i, 3), i, dtype=np.float32),
+            "target_schedule": np.arange(3 * num_shuffles, dtype=np.float32).reshape(num_shuffles, 3) + 100 * i,
+        }
+        for i in range(3)
+    ]
+    write_scenario_bank(path, scenarios)
+    return path
+
+
+def test_scenarios_round_trip(tmp_path):
+    bank = ScenarioBank(make_bank(tmp_path, 4))
+    assert len(bank) == 3 and bank.target_schedule_length == 4
+    scenario = bank[2]
+    np.testing.assert_array_equal(scenario["initial_state"], np.full(4, 2.0))
+    assert scenario["obstacle_positions"].shape == (4, 3)  # Padding to the largest obstacle set is removed
+    np.testing.assert_array_equal(scenario["target_schedule"][0], [200.0, 201.0, 202.0])
+    with pytest.raises(IndexError):
+        bank[3]
+
+
+def test_every_schedule_entry_is_used():
+    # Steps count from 1 and shuffle at multiples of shuffle_target_every, reading entry count // every - 1
+    num_iterations, shuffle_target_every = 200, 50
+    indices = [count // shuffle_target_every - 1 for count in range(1, num_iterations + 1) if count % shuffle_target_every == 0]
+    assert indices == list(range(get_target_schedule_length(num_iterations, shuffle_target_every)))
+
+
+def test_check_rejects_runs_the_bank_does_not_cover(tmp_path):
+    config_environment = {"scenario_bank": make_bank(tmp_path, 4), "shuffle_target_every": 50}
+    check_scenario_bank(config_environment, num_episodes=3, num_iterations=200)
+    with pytest.raises(ValueError, match="target shuffles"):
+        check_scenario_bank(config_environment, num_episodes=3, num_iterations=250)
+    with pytest.raises(ValueError, match="episodes"):
+        check_scenario_bank(config_environment, num_episodes=4, num_iterations=200)
+
+
+def test_cartpole_uses_schedule_for_non_divisible_horizon(tmp_path):
+    pytest.importorskip("tensorflow")
+    pytest.importorskip("gymnasium")
+    pytest.importorskip("CartPoleSimulation")
+    pytest.importorskip("Control_Toolkit.others.environment")
+    from SI_Toolkit.computation_library import TensorFlowLibrary
+
+    from Environments.cartpole_simulator_batched import cartpole_simulator_batched
+
+    num_iterations, shuffle_target_every = 250, 100
+    num_shuffles = get_target_schedule_length(num_iterations, shuffle_target_every)
+    path = os.path.join(tmp_path, "cartpole.npy")
+    initial_state = np.array([np.pi, 0.0, -1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+    write_scenario_bank(path, [{
+        "initial_state": initial_state,
+        "target_position": np.float32(0.05),
+        "target_schedule": np.array([0.1, -0.1], dtype=np.float32)[:num_shuffles],
+    }])
+    env = cartpole_simulator_batched(
+        computation_lib=TensorFlowLibrary, render_mode=None, actuator_noise=[0.0], dt=0.02, mode="stabilization",
+        cart_length=4.4e-2, usable_track_length=44.0e-2, u_max=2.62, seed=0,
+        shuffle_target_every=shuffle_target_every, scenario_bank=path, episode_index=0,
+    )
+    check_scenario_bank({"scenario_bank": path, "shuffle_target_every": shuffle_target_every}, 1, num_iterations)
+
+    env.reset()
+    targets = []
+    for _ in range(num_iterations):
+        env.step(np.zeros(1, dtype=np.float32))
+        targets.append(float(env.target_position.numpy()))
+    np.testing.assert_allclose(targets[:99], 0.05)
+    np.testing.assert_allclose(targets[99:199], 0.1)
+    np.testing.assert_allclose(targets[199:], -0.1)
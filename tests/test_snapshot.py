@@ -0,0 +1,60 @@
+import pickle
+
+import pytest
+
+np = pytest.importorskip("numpy")
+tf = pytest.importorskip("tensorflow")
+
+from SI_Toolkit.computation_library import NumpyLibrary, TensorFlowLibrary
+
+from Environments.snapshot import SnapshotMixin
+
+
+class counter(SnapshotMixin):
+    snapshot_attributes = ("count", "offsets", "target_point")
+
+    def __init__(self, lib, to_tensor):
+        self.lib = lib
+        self.rng = np.random.default_rng(0)
+        self.count = 0
+        self.state = to_tensor(np.zeros((2, 3), dtype=np.float32))
+        self.offsets = to_tensor(np.arange(3, dtype=np.float32))
+        self.target_point = tf.Variable([1.0, 2.0])
+
+    def step(self):
+        self.count += 1
+        self.state = self.state + self.rng.uniform(size=(2, 3)).astype(np.float32)
+        self.offsets = self.offsets * 2.0
+        self.target_point.assign_add([1.0, 1.0])
+
+
+def assert_branches_agree(env, tensor_type):
+    env.step()
+    snapshot = pickle.loads(pickle.dumps(env.get_snapshot()))
+    target_point = env.target_point
+    env.step()
+    expected = (env.count, np.array(env.state), np.array(env.offsets), env.target_point.numpy())
+
+    env.restore_snapshot(snapshot)
+    assert isinstance(env.offsets, tensor_type)
+    assert env.target_point is target_point
+    env.step()
+    np.testing.assert_equal((env.count, np.array(env.state), np.array(env.offsets), env.target_point.numpy()), expected)
+
+
+def test_numpy_snapshot():
+    assert_branches_agree(counter(NumpyLibrary, np.array), np.ndarray)
+
+
+def test_tensorflow_tensors_stay_tensors():
+    assert_branches_agree(counter(TensorFlowLibrary, tf.convert_to_tensor), tf.Tensor)
+
+
+def test_torch_tensors_stay_tensors():
+    torch = pytest.importorskip("torch")
+    from SI_Toolkit.computation_library import PyTorchLibrary
+
+    env = counter(PyTorchLibrary, torch.from_numpy)
+    env.offsets = env.offsets.to(torch.float64)
+    env.restore_snapshot(env.get_snapshot())
+    assert isinstance(env.offsets, torch.Tensor) and env.offsets.dtype == torch.float64
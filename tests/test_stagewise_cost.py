@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("tensorflow")
+pytest.importorskip("gymnasium")
+pytest.importorskip("Control_Toolkit.Cost_Functions")
+
+from SI_Toolkit.computation_library import NumpyLibrary
+
+from Control_Toolkit_ASF.Cost_Functions.obstacle_avoidance_batched.default import default as obstacle_avoidance_cost
+
+
+def stagewise_trajectory_cost(cost_function, state_horizon, inputs, previous_input):
+    horizon = inputs.shape[1]
+    stage_weights = cost_function.get_stage_weights(horizon, np.float32)
+    stage_weights_sum = np.sum(stage_weights)
+    cost = np.zeros(state_horizon.shape[0], dtype=np.float32)
+    for k in range(horizon):
+        cost = cost + cost_function.get_weighted_single_stage_cost(
+            state_horizon[:, k, :], inputs[:, k, :], previous_input if k == 0 else inputs[:, k - 1, :], stage_weights[k, 0], stage_weights_sum
+        )
+    return cost_function.finish_trajectory_cost(cost, state_horizon[:, -1, :], horizon)
+
+
+def test_obstacle_avoidance_stagewise_cost_matches_trajectory_cost():
+    target_point = np.array([0.5, 0.5, 0.5], dtype=np.float32)
+    variable_parameters = SimpleNamespace(
+        target_point=target_point, obstacle_positions=np.array([[0.0, 0.0, 0.0, 0.3]], dtype=np.float32)
+    )
+    cost_function = obstacle_avoidance_cost(variable_parameters=variable_parameters, ComputationLib=NumpyLibrary)
+
+    rng = np.random.default_rng(0)
+    state_horizon = rng.uniform(-1.2, 1.2, (8, 6, 6)).astype(np.float32)
+    state_horizon[:4, 2:, :3] = target_point  # Half of the rollouts reach the target, which couples the stages through the goal reward
+    inputs = rng.uniform(-1.0, 1.0, (8, 5, 3)).astype(np.float32)
+    previous_input = inputs[:, 0, :]
+
+    np.testing.assert_allclose(
+        stagewise_trajectory_cost(cost_function, state_horizon, inputs, previous_input),
+        cost_function.get_trajectory_cost(state_horizon, inputs, previous_input),
+        rtol=1e-5,
+        atol=1e-3,
+    )